@@ -0,0 +1,4 @@
+"""Benchmarks of the gateway's hot paths.
+
+Run from the project root: `python -m benchmarks.micro --help`.
+"""
@@ -0,0 +1,34 @@
+"""Deterministic test data for benchmarks."""
+
+import random
+import uuid
+from typing import Any
+
+
+def make_person(rnd: random.Random) -> dict[str, Any]:
+    return {"id": str(uuid.UUID(int=rnd.getrandbits(128))), "name": f"Person {rnd.random():.8f}"}
+
+
+def make_film(cast_size: int = 10, seed: int = 0) -> dict[str, Any]:
+    """Film document as stored in the search engine, with `cast_size` actors."""
+    rnd = random.Random(seed)  # noqa: S311
+    actors = [make_person(rnd) for _ in range(cast_size)]
+    directors = [make_person(rnd) for _ in range(max(1, cast_size // 20))]
+    writers = [make_person(rnd) for _ in range(max(1, cast_size // 10))]
+    return {
+        "id": str(uuid.UUID(int=rnd.getrandbits(128))),
+        "title": f"Film {seed}",
+        "description": "Lorem ipsum dolor sit amet " * 20,
+        "imdb_rating": round(rnd.uniform(1, 10), 1),
+        "genres": "Action, Drama",
+        "actors_names": ", ".join(person["name"] for person in actors),
+        "directors_names": ", ".join(person["name"] for person in directors),
+        "writers_names": ", ".join(person["name"] for person in writers),
+        "actors": actors,
+        "directors": directors,
+        "writers": writers,
+    }
+
+
+def make_films(count: int, cast_size: int = 10) -> list[dict[str, Any]]:
+    return [make_film(cast_size, seed) for seed in range(count)]
@@ -0,0 +1,297 @@
+"""In-memory stand-ins for the key value database and the search engine."""
+
+import asyncio
+import fnmatch
+import random
+import time
+from collections.abc import AsyncIterator, Callable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig
+from elasticsearch import exceptions as es_exceptions
+
+from src.common.key_value_database import IKeyValueDatabase
+from src.common.search_engine import ISearchEngine, SearchPage
+
+
+@dataclass
+class Faults:
+    """Latency and errors injected into every call of a fake back end.
+
+    :param latency: base latency of a call in seconds
+    :param jitter: upper bound of uniformly distributed extra latency in seconds
+    :param error_rate: probability of a call to fail
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    seed: int | None = None
+
+    def __post_init__(self) -> None:
+        self._random = random.Random(self.seed)  # noqa: S311
+
+    async def inject(self, error: Callable[[], Exception]) -> None:
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise error()
+
+
+class InMemoryKeyValueDatabase(IKeyValueDatabase):
+    def __init__(
+        self, faults: Faults | None = None, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.faults = faults or Faults()
+        self._clock = clock
+        self._data: dict[str, tuple[bytes, float | None]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        await self._inject()
+        return self._with_ttl(key)
+
+    async def get(self, key: str) -> bytes | None:
+        await self._inject()
+        entry = self._alive(key)
+        return None if entry is None else entry[0]
+
+    async def set(self, key: str, value: str | bytes, expire: int | None = None) -> None:
+        await self._inject()
+        self._put(key, value, expire)
+
+    async def set_if_not_exists(
+        self, key: str, value: str | bytes, expire: int | None = None
+    ) -> bool:
+        await self._inject()
+        if self._alive(key) is not None:
+            return False
+        self._put(key, value, expire)
+        return True
+
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        await self._inject()
+        entries = [self._alive(key) for key in keys]
+        return [None if entry is None else entry[0] for entry in entries]
+
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[tuple[int, bytes | None]]:
+        await self._inject()
+        return [self._with_ttl(key) for key in keys]
+
+    async def set_many(self, values: Mapping[str, str | bytes], expire: int | None = None) -> None:
+        await self._inject()
+        for key, value in values.items():
+            self._put(key, value, expire)
+
+    async def delete(self, key: str) -> int:
+        await self._inject()
+        return int(self._data.pop(key, None) is not None)
+
+    async def incr(self, key: str) -> int:
+        await self._inject()
+        entry = self._alive(key)
+        value = int(entry[0]) + 1 if entry else 1
+        self._data[key] = (str(value).encode(), None)
+        return value
+
+    async def clear(self, pattern: str, exclude: str | None = None) -> int:
+        await self._inject()
+        keys = [
+            key
+            for key in self._data
+            if fnmatch.fnmatchcase(key, pattern)
+            and not (exclude and fnmatch.fnmatchcase(key, exclude))
+        ]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    async def _inject(self) -> None:
+        await self.faults.inject(lambda: ConnectionError("injected key value database error"))
+
+    def _alive(self, key: str) -> tuple[bytes, float | None] | None:
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= self._clock():
+            del self._data[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def _with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        entry = self._alive(key)
+        if entry is None:
+            return -2, None
+        value, expires_at = entry
+        return (-1 if expires_at is None else int(expires_at - self._clock())), value
+
+    def _put(self, key: str, value: str | bytes, expire: int | None) -> None:
+        if isinstance(value, str):
+            value = value.encode()
+        self._data[key] = (value, None if expire is None else self._clock() + expire)
+
+
+class InMemorySearchEngine(ISearchEngine):
+    """Search engine over a list of documents.
+
+    Queries are not evaluated: search returns the first `size` documents starting
+    at `from`, honouring `source_includes`.
+    """
+
+    def __init__(self, documents: Sequence[dict[str, Any]], faults: Faults | None = None) -> None:
+        self.faults = faults or Faults()
+        self.documents = list(documents)
+        self._by_id = {str(document["id"]): document for document in self.documents}
+
+    async def search(self, index: str, params: dict[str, Any]) -> list[dict[str, Any]]:
+        await self._inject()
+        start = params.get("from", 0)
+        documents = self.documents[start : start + params.get("size", 10)]
+        return [project(document, params.get("source_includes")) for document in documents]
+
+    async def search_page(self, index: str, params: dict[str, Any]) -> SearchPage:
+        documents = await self.search(index, params)
+        return SearchPage(documents=documents)
+
+    async def iter_search(
+        self, index: str, params: dict[str, Any], batch_size: int = 500
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        for start in range(0, len(self.documents), batch_size):
+            yield await self.search(index, {**params, "from": start, "size": batch_size})
+
+    async def get_document(
+        self, index: str, doc_id: str, source_includes: Sequence[str] | None = None
+    ) -> dict | None:
+        await self._inject()
+        document = self._by_id.get(str(doc_id))
+        return None if document is None else project(document, source_includes)
+
+    async def get_documents(
+        self, index: str, doc_ids: Sequence[str], source_includes: Sequence[str] | None = None
+    ) -> dict[str, dict]:
+        await self._inject()
+        return {
+            str(doc_id): project(self._by_id[str(doc_id)], source_includes)
+            for doc_id in doc_ids
+            if str(doc_id) in self._by_id
+        }
+
+    async def _inject(self) -> None:
+        await self.faults.inject(lambda: ConnectionError("injected search engine error"))
+
+
+def project(document: dict[str, Any], source_includes: Sequence[str] | None) -> dict[str, Any]:
+    """Keep top-level fields of document named in `source_includes`."""
+    if source_includes is None:
+        return document
+    fields = {field.split(".", 1)[0] for field in source_includes}
+    return {key: value for key, value in document.items() if key in fields}
+
+
+class FakeElasticsearch:
+    """Stand-in for `ElasticDatabase` client, answering like Elasticsearch 8 does.
+
+    Sits below `ElasticSearchEngine`, so its error handling, retries and circuit breaker
+    take part. Queries are not evaluated, hits are sorted by position in `documents`.
+    Injected errors are 503 responses.
+    """
+
+    def __init__(self, documents: Sequence[dict[str, Any]], faults: Faults | None = None) -> None:
+        self.faults = faults or Faults()
+        self.documents = list(documents)
+        self._by_id = {str(document["id"]): document for document in self.documents}
+        self.calls = 0
+        self.errors = 0
+
+    async def get(
+        self,
+        index: str,
+        id: str,
+        source_includes: Sequence[str] | None = None,
+        preference: str | None = None,
+    ) -> dict[str, Any]:
+        await self._inject()
+        document = self._by_id.get(str(id))
+        if document is None:
+            raise es_exceptions.NotFoundError(
+                "not found", _meta(404), {"_index": index, "_id": id, "found": False}
+            )
+        return {
+            "_index": index,
+            "_id": id,
+            "found": True,
+            "_source": project(document, source_includes),
+        }
+
+    async def mget(
+        self, index: str, ids: Sequence[str], source_includes: Sequence[str] | None = None
+    ) -> dict[str, Any]:
+        await self._inject()
+        docs = []
+        for doc_id in ids:
+            document = self._by_id.get(str(doc_id))
+            if document is None:
+                docs.append({"_index": index, "_id": doc_id, "found": False})
+            else:
+                docs.append(
+                    {
+                        "_index": index,
+                        "_id": doc_id,
+                        "found": True,
+                        "_source": project(document, source_includes),
+                    }
+                )
+        return {"docs": docs}
+
+    async def search(self, **params: Any) -> dict[str, Any]:
+        await self._inject()
+        start = params.get("from", params.get("from_")) or 0
+        if params.get("search_after"):
+            start = params["search_after"][0] + 1
+        size = params.get("size", 10)
+        hits = [
+            {
+                "_id": str(document["id"]),
+                "_source": project(document, params.get("source_includes")),
+                "sort": [position],
+            }
+            for position, document in enumerate(self.documents[start : start + size], start)
+        ]
+        result: dict[str, Any] = {"hits": {"total": {"value": len(self.documents)}, "hits": hits}}
+        if "pit" in params:
+            result["pit_id"] = params["pit"]["id"]
+        return result
+
+    async def open_point_in_time(self, index: str, keep_alive: str) -> dict[str, Any]:
+        await self._inject()
+        return {"id": f"pit-{index}"}
+
+    async def close(self) -> None: ...
+
+    async def _inject(self) -> None:
+        self.calls += 1
+        try:
+            await self.faults.inject(
+                lambda: es_exceptions.ApiError("injected error", _meta(503), {"error": "injected"})
+            )
+        except es_exceptions.ApiError:
+            self.errors += 1
+            raise
+
+
+def _meta(status: int) -> ApiResponseMeta:
+    return ApiResponseMeta(
+        status=status,
+        http_version="1.1",
+        headers=HttpHeaders(),
+        duration=0.0,
+        node=NodeConfig("http", "localhost", 9200),
+    )
@@ -0,0 +1,317 @@
+"""In-process load harness of the whole application.
+
+Drives `create_app()` through an ASGI transport with fake Redis and Elasticsearch back ends,
+which inject latency and errors, and reports throughput, latency percentiles per route
+and cache hit ratio.
+
+Usage:
+    python -m benchmarks.load --requests 5000 --concurrency 64
+    python -m benchmarks.load --es-latency 5 --es-error-rate 0.05 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+from loguru import logger
+
+from src.common.concurrency import AdaptiveConcurrencyLimiter
+from src.common.hedging import HedgePolicy
+from src.common.key_value_database import LocalCache
+from src.common.metrics import HEDGED_REQUESTS
+from src.common.search_engine import ElasticSearchEngine
+from src.main import create_app
+from src.providers.cache import CACHE_STATUS_HEADER
+from src.providers.key_value_database import get_key_value_database, get_local_cache
+from src.providers.search_engine import get_search_engine
+from src.providers.settings import app_settings
+
+from .data import make_films
+from .fakes import FakeElasticsearch, Faults, InMemoryKeyValueDatabase
+
+TITLE_WORDS = ("Film", "1", "2", "3", "star", "war")
+ORDERINGS = ("-imdb_rating", "imdb_rating", "title")
+PERCENTILES = (50, 95, 99)
+
+URLFactory = Callable[[random.Random], str]
+
+
+@dataclass
+class Config:
+    requests: int = 2000
+    duration: float | None = None
+    concurrency: int = 32
+    mix: dict[str, float] = field(
+        default_factory=lambda: {"detail": 0.6, "list": 0.2, "filtered": 0.2}
+    )
+    films: int = 1000
+    cast_size: int = 20
+    hot_skew: float = 3.0
+    kv_faults: Faults = field(default_factory=Faults)
+    es_faults: Faults = field(default_factory=Faults)
+    local_cache: bool = True
+    hedging: bool = False
+    es_concurrency: int | None = None
+    seed: int = 0
+
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    cache: Counter = field(default_factory=Counter)
+
+    def summary(self, elapsed: float) -> dict[str, Any]:
+        return {
+            "requests": len(self.latencies),
+            "rps": len(self.latencies) / elapsed if elapsed else 0.0,
+            **{f"p{p}_ms": percentile(self.latencies, p) * 1000 for p in PERCENTILES},
+            "max_ms": max(self.latencies, default=0.0) * 1000,
+            "statuses": dict(self.statuses),
+            "cache": dict(self.cache),
+        }
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def url_factories(film_ids: Sequence[str], hot_skew: float) -> dict[str, URLFactory]:
+    def detail(rnd: random.Random) -> str:
+        # power law over ids: a small hot set gets most of the requests
+        return f"/v1/films/{film_ids[int(len(film_ids) * rnd.random() ** hot_skew)]}"
+
+    def list_(rnd: random.Random) -> str:
+        offset = rnd.randrange(10) * 50
+        return f"/v1/films/?pagination={offset}&pagination=50"
+
+    def filtered(rnd: random.Random) -> str:
+        low = rnd.randrange(1, 9)
+        return (
+            f"/v1/films/?title={rnd.choice(TITLE_WORDS)}&imdb_rating={low}&imdb_rating={low + 1}"
+            f"&order={rnd.choice(ORDERINGS)}&page_size=50"
+        )
+
+    return {"detail": detail, "list": list_, "filtered": filtered}
+
+
+async def run(config: Config) -> dict[str, Any]:
+    documents = make_films(config.films, config.cast_size)
+    kv = InMemoryKeyValueDatabase(faults=config.kv_faults)
+    es_client = FakeElasticsearch(documents, faults=config.es_faults)
+    search_engine = ElasticSearchEngine(
+        client=es_client,
+        hedging=HedgePolicy() if config.hedging else None,
+        limiter=(
+            AdaptiveConcurrencyLimiter(initial_limit=config.es_concurrency, name="load")
+            if config.es_concurrency
+            else None
+        ),
+    )
+    local_cache = (
+        LocalCache(
+            max_entries=app_settings.local_cache.max_entries, ttl=app_settings.local_cache.ttl
+        )
+        if config.local_cache
+        else None
+    )
+
+    app = create_app()
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+    app.dependency_overrides[get_key_value_database] = lambda: kv
+    app.dependency_overrides[get_search_engine] = lambda: search_engine
+    app.dependency_overrides[get_local_cache] = lambda: local_cache
+
+    factories = url_factories([str(document["id"]) for document in documents], config.hot_skew)
+    routes = [route for route in config.mix if config.mix[route] > 0]
+    weights = [config.mix[route] for route in routes]
+    stats: dict[str, RouteStats] = defaultdict(RouteStats)
+    issued = 0
+    deadline = None if config.duration is None else time.perf_counter() + config.duration
+
+    def next_request(rnd: random.Random) -> tuple[str, str] | None:
+        nonlocal issued
+        if deadline is None and issued >= config.requests:
+            return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        issued += 1
+        route = rnd.choices(routes, weights)[0]
+        return route, factories[route](rnd)
+
+    async def worker(client: httpx.AsyncClient, rnd: random.Random) -> None:
+        while (request := next_request(rnd)) is not None:
+            route, url = request
+            start = time.perf_counter()
+            response = await client.get(url)
+            stats[route].latencies.append(time.perf_counter() - start)
+            stats[route].statuses[int(response.status_code)] += 1
+            stats[route].cache[response.headers.get(CACHE_STATUS_HEADER, "-")] += 1
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                worker(client, random.Random(config.seed + number))  # noqa: S311
+                for number in range(config.concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+    total = RouteStats()
+    for route_stats in stats.values():
+        total.latencies.extend(route_stats.latencies)
+        total.statuses.update(route_stats.statuses)
+        total.cache.update(route_stats.cache)
+    cached = total.cache["HIT"] + total.cache["STALE"]
+    return {
+        "elapsed_s": elapsed,
+        "total": total.summary(elapsed),
+        "routes": {route: stats[route].summary(elapsed) for route in sorted(stats)},
+        "api_cache_hit_ratio": _ratio(cached, cached + total.cache["MISS"]),
+        "key_value_database": {
+            "hits": kv.hits,
+            "misses": kv.misses,
+            "hit_ratio": _ratio(kv.hits, kv.hits + kv.misses),
+        },
+        "local_cache": local_cache.stats if local_cache is not None else None,
+        "search_engine": {
+            "calls": es_client.calls,
+            "injected_errors": es_client.errors,
+            "circuit_breaker": search_engine.breaker.state,
+            "hedges": {
+                outcome: sum(
+                    HEDGED_REQUESTS.get(operation, outcome) for operation in ("get", "search")
+                )
+                for outcome in ("sent", "won", "throttled")
+            },
+            "concurrency_limit": (
+                search_engine.limiter.limit if search_engine.limiter is not None else None
+            ),
+        },
+    }
+
+
+def _ratio(part: int, whole: int) -> float:
+    return part / whole if whole else 0.0
+
+
+def format_report(report: dict[str, Any]) -> str:
+    lines = [
+        f"{'route':<10} {'requests':>9} {'rps':>9} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses"
+    ]
+    for route, summary in [*report["routes"].items(), ("total", report["total"])]:
+        lines.append(
+            f"{route:<10} {summary['requests']:>9} {summary['rps']:>9.0f} "
+            f"{summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f}  "
+            f"{summary['statuses']}"
+        )
+    kv = report["key_value_database"]
+    search_engine = report["search_engine"]
+    lines.extend(
+        [
+            "",
+            f"api_cache hit ratio: {report['api_cache_hit_ratio']:.1%}",
+            f"key value database hit ratio: {kv['hit_ratio']:.1%} "
+            f"({kv['hits']}/{kv['hits'] + kv['misses']})",
+            f"local cache: {report['local_cache']}",
+            f"search engine calls: {search_engine['calls']}, "
+            f"injected errors: {search_engine['injected_errors']}, "
+            f"circuit breaker: {search_engine['circuit_breaker']}, "
+            f"hedges: {search_engine['hedges']}, "
+            f"concurrency limit: {search_engine['concurrency_limit']}",
+        ]
+    )
+    return "\n".join(lines)
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parse request mix like `detail=6,list=2,filtered=2`."""
+    mix = {}
+    for item in value.split(","):
+        route, _, weight = item.partition("=")
+        if route not in ("detail", "list", "filtered"):
+            raise argparse.ArgumentTypeError(f"unknown route '{route}'")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=Config.requests)
+    parser.add_argument("--duration", type=float, help="run for seconds instead of --requests")
+    parser.add_argument("--concurrency", type=int, default=Config.concurrency)
+    parser.add_argument("--mix", type=parse_mix, default="detail=6,list=2,filtered=2")
+    parser.add_argument("--films", type=int, default=Config.films, help="size of the film index")
+    parser.add_argument("--cast-size", type=int, default=Config.cast_size)
+    parser.add_argument(
+        "--hot-skew", type=float, default=Config.hot_skew, help="1 is uniform, higher is hotter"
+    )
+    for backend in ("kv", "es"):
+        parser.add_argument(f"--{backend}-latency", type=float, default=0.0, help="ms")
+        parser.add_argument(f"--{backend}-jitter", type=float, default=0.0, help="ms")
+        parser.add_argument(f"--{backend}-error-rate", type=float, default=0.0)
+    parser.add_argument("--no-local-cache", action="store_true")
+    parser.add_argument("--hedging", action="store_true", help="hedge slow search engine calls")
+    parser.add_argument(
+        "--es-concurrency", type=int, help="initial adaptive limit of search engine calls"
+    )
+    parser.add_argument("--seed", type=int, default=Config.seed)
+    parser.add_argument("--output", type=Path, help="write report as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def config_from_args(args: argparse.Namespace) -> Config:
+    def faults(backend: str) -> Faults:
+        return Faults(
+            latency=getattr(args, f"{backend}_latency") / 1000,
+            jitter=getattr(args, f"{backend}_jitter") / 1000,
+            error_rate=getattr(args, f"{backend}_error_rate"),
+            seed=args.seed,
+        )
+
+    return Config(
+        requests=args.requests,
+        duration=args.duration,
+        concurrency=args.concurrency,
+        mix=args.mix,
+        films=args.films,
+        cast_size=args.cast_size,
+        hot_skew=args.hot_skew,
+        kv_faults=faults("kv"),
+        es_faults=faults("es"),
+        local_cache=not args.no_local_cache,
+        hedging=args.hedging,
+        es_concurrency=args.es_concurrency,
+        seed=args.seed,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run(config_from_args(args)))
+    sys.stdout.write(format_report(report) + "\n")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Microbenchmarks of per-request CPU work of the gateway.
+
+Usage:
+    python -m benchmarks.micro --output bench.json
+    python -m benchmarks.micro --baseline bench.json --threshold 0.1
+"""
+
+import argparse
+import dataclasses
+import json
+import sys
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import orjson
+from loguru import logger
+from pydantic import parse_raw_as
+
+from src.api.v1.film import FilmQuery, film_list
+from src.api.v1.schemas.film import FilmOutSchema, FilmsResultSchema
+from src.common.coder import NoDecodeJsonCoder, OrjsonCoder
+from src.models.film import Film, FilmFilterSchema
+from src.providers.cache import build_key
+from src.services.film import FilmFilterSet, FilmService
+
+from . import runner
+from .data import make_film, make_films
+from .fakes import InMemoryKeyValueDatabase, InMemorySearchEngine
+
+CAST_SIZES = (10, 100, 1000)
+PAYLOAD_SIZES = (1, 10, 100)
+FILTER_PARAMS = {
+    "title": "star",
+    "imdb_rating": (5.0, None),
+    "excluded_ids": ["5b3c6b2a-3e22-4a4f-a6d1-2d2f6a3c7f11"],
+    "order": ["-imdb_rating"],
+    "page_size": 50,
+}
+
+Benchmark = tuple[str, Callable[[], runner.Result]]
+
+
+def film_query(**params: Any) -> FilmQuery:
+    defaults = {field.name: None for field in dataclasses.fields(FilmQuery)}
+    return FilmQuery(**{**defaults, **params})
+
+
+def benchmarks(rounds: int) -> Iterator[Benchmark]:
+    def sync(name: str, func: Callable[[], Any]) -> Benchmark:
+        return name, lambda: runner.measure(name, func, rounds=rounds)
+
+    def async_(name: str, func: Callable[[], Any]) -> Benchmark:
+        return name, lambda: runner.measure_async(name, func, rounds=rounds)
+
+    query = film_query(title="star", order=["-imdb_rating"], page_size=50)
+    yield sync("cache.build_key", lambda: build_key(film_list, "", (), {"params": query}))
+
+    yield sync("filterset.filter_query", lambda: FilmFilterSet().filter_query(FILTER_PARAMS))
+    yield sync("filterset.build_query[memoized]", lambda: FilmFilterSet.build_query(FILTER_PARAMS))
+
+    for cast_size in CAST_SIZES:
+        raw = orjson.dumps(make_film(cast_size))
+        film = parse_raw_as(Film, raw)
+        yield sync(f"parse_raw_as(Film)[cast={cast_size}]", lambda raw=raw: parse_raw_as(Film, raw))
+        yield sync(
+            f"FilmOutSchema.from_entity[cast={cast_size}]",
+            lambda film=film: FilmOutSchema.from_entity(film),
+        )
+
+    for size in PAYLOAD_SIZES:
+        films = [FilmOutSchema.from_entity(Film(**doc)) for doc in make_films(size, cast_size=20)]
+        payload = FilmsResultSchema(results=films)
+        yield sync(
+            f"NoDecodeJsonCoder.encode[films={size}]",
+            lambda payload=payload: NoDecodeJsonCoder.encode(payload),
+        )
+        yield sync(
+            f"OrjsonCoder.encode[films={size}]", lambda payload=payload: OrjsonCoder.encode(payload)
+        )
+
+    for size in PAYLOAD_SIZES:
+        entities = [Film(**doc) for doc in make_films(size, cast_size=20)]
+        yield sync(
+            f"render film page[films={size}]",
+            lambda entities=entities: OrjsonCoder.encode(
+                FilmsResultSchema.construct(
+                    results=[FilmOutSchema.from_entity(film) for film in entities]
+                )
+            ),
+        )
+
+    documents = make_films(100, cast_size=20)
+    service = FilmService(
+        InMemoryKeyValueDatabase(),
+        InMemorySearchEngine(documents),
+        projection=FilmOutSchema.source_fields(),
+    )
+    film_id = documents[0]["id"]
+    filters = FilmFilterSchema(page_size=50, order=["-imdb_rating"])
+    yield async_("FilmService.get_by_id[cache hit]", lambda: service.get_by_id(film_id))
+    detail_service = FilmService(
+        InMemoryKeyValueDatabase(),
+        InMemorySearchEngine(documents),
+        projection=FilmOutSchema.source_fields(),
+        renderer=FilmOutSchema.render,
+    )
+    yield async_("FilmService.get_detail[cache hit]", lambda: detail_service.get_detail(film_id))
+    yield async_("FilmService.get_page[50]", lambda: service.get_page(filters))
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="compare results with this JSON file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown of median reported as regression (default: 0.1)",
+    )
+    parser.add_argument("--rounds", type=int, default=7, help="rounds per benchmark")
+    parser.add_argument("-k", "--filter", default="", help="run benchmarks containing substring")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    logger.remove()
+    results = [measure() for name, measure in benchmarks(args.rounds) if args.filter in name]
+    sys.stdout.write(runner.format_results(results) + "\n")
+    if args.output:
+        runner.save(results, args.output)
+    if args.baseline:
+        comparisons = runner.compare(results, json.loads(args.baseline.read_text()))
+        sys.stdout.write("\n" + runner.format_comparisons(comparisons, args.threshold) + "\n")
+        if any(comparison.is_regression(args.threshold) for comparison in comparisons):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Timing, reporting and baseline comparison of benchmarks."""
+
+import asyncio
+import datetime
+import json
+import platform
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+MIN_ROUND_SECS = 0.05
+
+
+@dataclass
+class Result:
+    name: str
+    rounds: int
+    loops: int
+    median_ns: float
+    mean_ns: float
+    stdev_ns: float
+    min_ns: float
+
+    @property
+    def ops_per_sec(self) -> float:
+        return 1e9 / self.median_ns if self.median_ns else float("inf")
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline_ns: float
+    current_ns: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_ns / self.baseline_ns
+
+    def is_regression(self, threshold: float) -> bool:
+        return self.ratio > 1 + threshold
+
+
+def measure(
+    name: str, func: Callable[[], Any], rounds: int = 7, min_round_secs: float = MIN_ROUND_SECS
+) -> Result:
+    """Time `func`, calibrating the number of loops per round to last at least `min_round_secs`.
+
+    Timings are per call, the median of rounds is the headline number.
+    """
+    loops = 1
+    while True:
+        elapsed = _time_loops(func, loops)
+        if elapsed >= min_round_secs * 1e9 or loops >= 1 << 24:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_round_secs * 1e9 / elapsed))
+    timings = [_time_loops(func, loops) / loops for _ in range(rounds)]
+    return Result(
+        name=name,
+        rounds=rounds,
+        loops=loops,
+        median_ns=statistics.median(timings),
+        mean_ns=statistics.fmean(timings),
+        stdev_ns=statistics.stdev(timings) if rounds > 1 else 0.0,
+        min_ns=min(timings),
+    )
+
+
+def measure_async(
+    name: str, func: Callable[[], Awaitable[Any]], rounds: int = 7, **kwargs: Any
+) -> Result:
+    """Time a coroutine function, awaiting it in a loop within a single running event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return measure(name, lambda: loop.run_until_complete(func()), rounds=rounds, **kwargs)
+    finally:
+        loop.close()
+
+
+def _time_loops(func: Callable[[], Any], loops: int) -> int:
+    start = time.perf_counter_ns()
+    for _ in range(loops):
+        func()
+    return time.perf_counter_ns() - start
+
+
+def to_json(results: list[Result]) -> dict[str, Any]:
+    return {
+        "meta": {
+            "created_at": datetime.datetime.now(datetime.UTC).isoformat(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+        },
+        "results": {
+            result.name: {**asdict(result), "ops_per_sec": result.ops_per_sec} for result in results
+        },
+    }
+
+
+def save(results: list[Result], path: Path) -> None:
+    path.write_text(json.dumps(to_json(results), indent=2, sort_keys=True) + "\n")
+
+
+def compare(results: list[Result], baseline: dict[str, Any]) -> list[Comparison]:
+    """Compare medians with a baseline saved by `save`, benchmarks missing in it are skipped."""
+    saved = baseline["results"]
+    return [
+        Comparison(result.name, saved[result.name]["median_ns"], result.median_ns)
+        for result in results
+        if result.name in saved
+    ]
+
+
+def format_results(results: list[Result]) -> str:
+    lines = [f"{'benchmark':<48} {'median':>12} {'stdev':>10} {'ops/s':>12}"]
+    lines.extend(
+        f"{result.name:<48} {_format_ns(result.median_ns):>12} "
+        f"{_format_ns(result.stdev_ns):>10} {result.ops_per_sec:>12,.0f}"
+        for result in results
+    )
+    return "\n".join(lines)
+
+
+def format_comparisons(comparisons: list[Comparison], threshold: float) -> str:
+    lines = [f"{'benchmark':<48} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for comparison in comparisons:
+        mark = "  REGRESSION" if comparison.is_regression(threshold) else ""
+        lines.append(
+            f"{comparison.name:<48} {_format_ns(comparison.baseline_ns):>12} "
+            f"{_format_ns(comparison.current_ns):>12} {comparison.ratio - 1:>+8.1%}{mark}"
+        )
+    return "\n".join(lines)
+
+
+def _format_ns(value: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if value >= scale:
+            return f"{value / scale:.2f} {unit}"
+    return f"{value:.0f} ns"
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from src.common.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Метрики приложения в текстовом формате Prometheus."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,49 @@
+import hmac
+from http import HTTPStatus
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+
+from src.common.profiler import SamplingProfiler
+from src.providers.profiler import get_profiler
+from src.providers.settings import app_settings
+
+router = APIRouter()
+
+
+async def verify_profiler_token(
+    x_profiler_token: Annotated[str, Header()] = "",
+) -> None:
+    """Доступ к профилю только с токеном `PROFILER_TOKEN`, без токена в настройках доступа нет."""
+    token = app_settings.profiler.token
+    if not token or not hmac.compare_digest(x_profiler_token.encode(), token.encode()):
+        raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail="invalid profiler token")
+
+
+@router.get("/profile", dependencies=[Depends(verify_profiler_token)])
+async def profile_stacks(
+    profiler: Annotated[SamplingProfiler, Depends(get_profiler)],
+) -> Response:
+    """Стеки сэмплированных запросов в формате folded для flamegraph.pl или speedscope."""
+    return Response(content=profiler.folded(), media_type="text/plain")
+
+
+@router.get("/profile/routes", dependencies=[Depends(verify_profiler_token)])
+async def profile_routes(
+    profiler: Annotated[SamplingProfiler, Depends(get_profiler)],
+) -> dict[str, dict[str, Any]]:
+    """Время сэмплированных запросов по маршрутам: полное, на CPU и в ожидании."""
+    return profiler.summary()
+
+
+@router.delete(
+    "/profile",
+    dependencies=[Depends(verify_profiler_token)],
+    status_code=HTTPStatus.NO_CONTENT,
+)
+async def profile_reset(
+    profiler: Annotated[SamplingProfiler, Depends(get_profiler)],
+) -> Response:
+    """Сбросить накопленный профиль."""
+    profiler.reset()
+    return Response(status_code=HTTPStatus.NO_CONTENT)
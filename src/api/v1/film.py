@@ -3,16 +3,25 @@ from dataclasses import asdict, dataclass
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from pydantic import BaseModel, parse_obj_as
 
+from src.common.responses import (
+    NDJSONResponse,
+    TrustedJSONResponse,
+    etag_matches,
+    json_bytes_response,
+    not_modified_response,
+)
 from src.providers.cache import api_cache
 from src.providers.services import get_film_service
+from src.providers.settings import app_settings
 from src.services.film import FilmFilterSchema, FilmService
 
-from .schemas.film import FilmOutSchema, FilmsResultSchema
+from .schemas.film import FilmOutSchema, FilmsBatchResultSchema, FilmsResultSchema
 
 router = APIRouter()
+api_settings = app_settings.api
 
 
 @dataclass
@@ -25,25 +34,62 @@ class FilmQuery:
     imdb_rating: tuple[float | None, float | None] | None = Query(None)
     pagination: tuple[int, int] | None = Query(None)
     order: list[str] | None = Query(None)
+    page_size: int | None = Query(None, ge=1, le=api_settings.page_size_max)
+    cursor: str | None = Query(None)
+
+
+@router.get("/batch")
+async def film_batch(
+    ids: Annotated[list[uuid.UUID], Query(min_items=1, max_items=api_settings.batch_max_ids)],
+    film_service: Annotated[FilmService, Depends(get_film_service)],
+) -> FilmsBatchResultSchema:
+    films = await film_service.get_many(ids)
+    return TrustedJSONResponse(
+        FilmsBatchResultSchema.construct(
+            results=[FilmOutSchema.from_entity(film) for film in films if film],
+            not_found=[entity_id for entity_id, film in zip(ids, films, strict=True) if not film],
+        )
+    )
+
+
+@router.get("/stream")
+async def film_stream(
+    params: Annotated[FilmQuery, Depends(FilmQuery)],
+    film_service: Annotated[FilmService, Depends(get_film_service)],
+) -> NDJSONResponse:
+    """Все найденные записи построчно в формате NDJSON, без пагинации."""
+    filter_params = parse_obj_as(FilmFilterSchema, asdict(params))
+    batches = film_service.stream_multi(filter_params, batch_size=api_settings.stream_batch_size)
+    return NDJSONResponse(
+        [FilmOutSchema.from_entity(film) for film in batch] async for batch in batches
+    )
 
 
 @router.get("/{film_id}")
 async def film_details(
     film_id: uuid.UUID,
     film_service: Annotated[FilmService, Depends(get_film_service)],
+    if_none_match: Annotated[str | None, Header()] = None,
 ) -> FilmOutSchema:
-    film = await film_service.get_by_id(film_id)
-    if not film:
+    if if_none_match:
+        etag = await film_service.get_detail_etag(film_id)
+        if etag is not None and etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+    detail = await film_service.get_detail(film_id)
+    if detail is None:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
-    return FilmOutSchema.from_entity(film)
+    return json_bytes_response(detail.content, if_none_match, etag=detail.etag)
 
 
 @router.get("/")
-@api_cache(namespace="v1")
+@api_cache(namespace=api_settings.list_cache_namespace, soft_ttl=api_settings.list_cache_soft_ttl)
 async def film_list(
     params: Annotated[FilmQuery, Depends(FilmQuery)],
     film_service: Annotated[FilmService, Depends(get_film_service)],
 ) -> FilmsResultSchema:
     filter_params = parse_obj_as(FilmFilterSchema, asdict(params))
-    films = await film_service.get_multi(filter_params)
-    return FilmsResultSchema(results=[FilmOutSchema.from_entity(film) for film in films])
+    page = await film_service.get_page(filter_params)
+    return FilmsResultSchema.construct(
+        results=[FilmOutSchema.from_entity(film) for film in page.items],
+        next_cursor=page.next_cursor,
+    )
@@ -3,16 +3,25 @@ from dataclasses import asdict, dataclass
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from pydantic import BaseModel, parse_obj_as
 
+from src.common.responses import (
+    NDJSONResponse,
+    TrustedJSONResponse,
+    etag_matches,
+    json_bytes_response,
+    not_modified_response,
+)
 from src.providers.cache import api_cache
 from src.providers.services import get_genre_service
+from src.providers.settings import app_settings
 from src.services.genre import GenreFilterSchema, GenreService
 
-from .schemas.genre import GenreMultiOutSchema, GenreOutSchema
+from .schemas.genre import GenreBatchOutSchema, GenreMultiOutSchema, GenreOutSchema
 
 router = APIRouter()
+api_settings = app_settings.api
 
 
 @dataclass
@@ -24,25 +33,64 @@ class GenreQuery:
     description: str | None = Query(None)
     pagination: tuple[int, int] | None = Query(None)
     order: list[str] | None = Query(None)
+    page_size: int | None = Query(None, ge=1, le=api_settings.page_size_max)
+    cursor: str | None = Query(None)
+
+
+@router.get("/batch")
+async def genre_batch(
+    ids: Annotated[list[uuid.UUID], Query(min_items=1, max_items=api_settings.batch_max_ids)],
+    genre_service: Annotated[GenreService, Depends(get_genre_service)],
+) -> GenreBatchOutSchema:
+    genres = await genre_service.get_many(ids)
+    return TrustedJSONResponse(
+        GenreBatchOutSchema.construct(
+            results=[GenreOutSchema.from_entity(genre) for genre in genres if genre],
+            not_found=[
+                entity_id for entity_id, genre in zip(ids, genres, strict=True) if not genre
+            ],
+        )
+    )
+
+
+@router.get("/stream")
+async def genre_stream(
+    params: Annotated[GenreQuery, Depends(GenreQuery)],
+    genre_service: Annotated[GenreService, Depends(get_genre_service)],
+) -> NDJSONResponse:
+    """Все найденные записи построчно в формате NDJSON, без пагинации."""
+    filter_params = parse_obj_as(GenreFilterSchema, asdict(params))
+    batches = genre_service.stream_multi(filter_params, batch_size=api_settings.stream_batch_size)
+    return NDJSONResponse(
+        [GenreOutSchema.from_entity(genre) for genre in batch] async for batch in batches
+    )
 
 
 @router.get("/{genre_id}")
 async def genre_details(
     genre_id: uuid.UUID,
     genre_service: Annotated[GenreService, Depends(get_genre_service)],
+    if_none_match: Annotated[str | None, Header()] = None,
 ) -> GenreOutSchema:
-    genre = await genre_service.get_by_id(genre_id)
-    if not genre:
+    if if_none_match:
+        etag = await genre_service.get_detail_etag(genre_id)
+        if etag is not None and etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+    detail = await genre_service.get_detail(genre_id)
+    if detail is None:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="genre not found")
-    return GenreOutSchema.from_entity(genre)
+    return json_bytes_response(detail.content, if_none_match, etag=detail.etag)
 
 
 @router.get("/")
-@api_cache(namespace="v1")
+@api_cache(namespace=api_settings.list_cache_namespace, soft_ttl=api_settings.list_cache_soft_ttl)
 async def genre_list(
     params: Annotated[GenreQuery, Depends(GenreQuery)],
     genre_service: Annotated[GenreService, Depends(get_genre_service)],
 ) -> GenreMultiOutSchema:
     filter_params = parse_obj_as(GenreFilterSchema, asdict(params))
-    genres = await genre_service.get_multi(filter_params)
-    return GenreMultiOutSchema(results=[GenreOutSchema.from_entity(genre) for genre in genres])
+    page = await genre_service.get_page(filter_params)
+    return GenreMultiOutSchema.construct(
+        results=[GenreOutSchema.from_entity(genre) for genre in page.items],
+        next_cursor=page.next_cursor,
+    )
@@ -3,16 +3,25 @@ from dataclasses import asdict, dataclass
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from pydantic import BaseModel, parse_obj_as
 
+from src.common.responses import (
+    NDJSONResponse,
+    TrustedJSONResponse,
+    etag_matches,
+    json_bytes_response,
+    not_modified_response,
+)
 from src.providers.cache import api_cache
 from src.providers.services.person import get_person_service
+from src.providers.settings import app_settings
 from src.services.person import PersonFilterSchema, PersonService
 
-from .schemas.person import PersonMultiOutSchema, PersonOutSchema
+from .schemas.person import PersonBatchOutSchema, PersonMultiOutSchema, PersonOutSchema
 
 router = APIRouter()
+api_settings = app_settings.api
 
 
 @dataclass
@@ -23,25 +32,64 @@ class PersonQuery:
     name: str | None = Query(None)
     pagination: tuple[int, int] | None = Query(None)
     order: list[str] | None = Query(None)
+    page_size: int | None = Query(None, ge=1, le=api_settings.page_size_max)
+    cursor: str | None = Query(None)
+
+
+@router.get("/batch")
+async def person_batch(
+    ids: Annotated[list[uuid.UUID], Query(min_items=1, max_items=api_settings.batch_max_ids)],
+    person_service: Annotated[PersonService, Depends(get_person_service)],
+) -> PersonBatchOutSchema:
+    persons = await person_service.get_many(ids)
+    return TrustedJSONResponse(
+        PersonBatchOutSchema.construct(
+            results=[PersonOutSchema.from_entity(person) for person in persons if person],
+            not_found=[
+                entity_id for entity_id, person in zip(ids, persons, strict=True) if not person
+            ],
+        )
+    )
+
+
+@router.get("/stream")
+async def person_stream(
+    params: Annotated[PersonQuery, Depends(PersonQuery)],
+    person_service: Annotated[PersonService, Depends(get_person_service)],
+) -> NDJSONResponse:
+    """Все найденные записи построчно в формате NDJSON, без пагинации."""
+    filter_params = parse_obj_as(PersonFilterSchema, asdict(params))
+    batches = person_service.stream_multi(filter_params, batch_size=api_settings.stream_batch_size)
+    return NDJSONResponse(
+        [PersonOutSchema.from_entity(person) for person in batch] async for batch in batches
+    )
 
 
 @router.get("/{person_id}")
 async def person_details(
     person_id: uuid.UUID,
     person_service: Annotated[PersonService, Depends(get_person_service)],
+    if_none_match: Annotated[str | None, Header()] = None,
 ) -> PersonOutSchema:
-    person = await person_service.get_by_id(person_id)
-    if not person:
+    if if_none_match:
+        etag = await person_service.get_detail_etag(person_id)
+        if etag is not None and etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+    detail = await person_service.get_detail(person_id)
+    if detail is None:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
-    return PersonOutSchema.from_entity(person)
+    return json_bytes_response(detail.content, if_none_match, etag=detail.etag)
 
 
 @router.get("/")
-@api_cache(namespace="v1")
+@api_cache(namespace=api_settings.list_cache_namespace, soft_ttl=api_settings.list_cache_soft_ttl)
 async def person_list(
     params: Annotated[PersonQuery, Depends(PersonQuery)],
     person_service: Annotated[PersonService, Depends(get_person_service)],
 ) -> PersonMultiOutSchema:
     filter_params = parse_obj_as(PersonFilterSchema, asdict(params))
-    persons = await person_service.get_multi(filter_params)
-    return PersonMultiOutSchema(results=[PersonOutSchema.from_entity(person) for person in persons])
+    page = await person_service.get_page(filter_params)
+    return PersonMultiOutSchema.construct(
+        results=[PersonOutSchema.from_entity(person) for person in page.items],
+        next_cursor=page.next_cursor,
+    )
@@ -10,7 +10,7 @@ class ActorOutSchema(BaseOutSchema):
 
     @classmethod
     def from_entity(cls, actor: Actor) -> "ActorOutSchema":
-        return ActorOutSchema(
+        return cls.construct(
             id=actor.id,
             name=actor.name,
         )
@@ -10,7 +10,7 @@ class DirectorOutSchema(BaseOutSchema):
 
     @classmethod
     def from_entity(cls, director: Director) -> "DirectorOutSchema":
-        return DirectorOutSchema(
+        return cls.construct(
             id=director.id,
             name=director.name,
         )
@@ -23,7 +23,7 @@ class FilmOutSchema(BaseOutSchema):
 
     @classmethod
     def from_entity(cls, film: Film) -> "FilmOutSchema":
-        return FilmOutSchema(
+        return cls.construct(
             id=film.id,
             title=film.title,
             description=film.description,
@@ -37,3 +37,9 @@ class FilmOutSchema(BaseOutSchema):
 
 class FilmsResultSchema(BaseModel):
     results: list[FilmOutSchema]
+    next_cursor: str | None = Field(description="Курсор следующей страницы", default=None)
+
+
+class FilmsBatchResultSchema(BaseModel):
+    results: list[FilmOutSchema]
+    not_found: list[uuid.UUID] = Field(description="ID, которые не найдены", default_factory=list)
@@ -18,7 +18,7 @@ class GenreOutSchema(BaseOutSchema):
 
     @classmethod
     def from_entity(cls, genre: Genre) -> "GenreOutSchema":
-        return GenreOutSchema(
+        return cls.construct(
             id=genre.id,
             name=genre.name,
             description=genre.description,
@@ -27,3 +27,9 @@ class GenreOutSchema(BaseOutSchema):
 
 class GenreMultiOutSchema(BaseModel):
     results: list[GenreOutSchema]
+    next_cursor: str | None = Field(description="Курсор следующей страницы", default=None)
+
+
+class GenreBatchOutSchema(BaseModel):
+    results: list[GenreOutSchema]
+    not_found: list[uuid.UUID] = Field(description="ID, которые не найдены", default_factory=list)
@@ -12,7 +12,7 @@ class PersonOutSchema(BaseOutSchema):
 
     @classmethod
     def from_entity(cls, person: Person) -> "PersonOutSchema":
-        return PersonOutSchema(
+        return cls.construct(
             id=person.id,
             name=person.name,
         )
@@ -20,3 +20,9 @@ class PersonOutSchema(BaseOutSchema):
 
 class PersonMultiOutSchema(BaseModel):
     results: list[PersonOutSchema]
+    next_cursor: str | None = Field(description="Курсор следующей страницы", default=None)
+
+
+class PersonBatchOutSchema(BaseModel):
+    results: list[PersonOutSchema]
+    not_found: list[uuid.UUID] = Field(description="ID, которые не найдены", default_factory=list)
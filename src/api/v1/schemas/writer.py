@@ -10,7 +10,7 @@ class WriterOutSchema(BaseOutSchema):
 
     @classmethod
     def from_entity(cls, writer: Writer) -> "WriterOutSchema":
-        return WriterOutSchema(
+        return cls.construct(
             id=writer.id,
             name=writer.name,
         )
@@ -0,0 +1,137 @@
+"""Bloom filters of ids known to exist in search engine indexes.
+
+A Bloom filter answers "definitely absent" or "maybe present" in a few hashes, so
+requests for ids which never existed (scrapers, typos) are answered without touching
+the key value database or the search engine. Filters are rebuilt from the search
+engine periodically; until the first build of an index every id is "maybe present".
+"""
+
+import asyncio
+import hashlib
+import math
+import time
+from collections.abc import Callable, Iterable
+
+from loguru import logger
+
+from src.common.search_engine import ISearchEngine
+
+ID_FIELD = "id"
+
+
+class BloomFilter:
+    """Set of strings answering membership with false positives but no false negatives.
+
+    :param capacity: expected number of items
+    :param error_rate: false positive rate at `capacity` items
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @classmethod
+    def from_items(cls, items: Iterable[str], error_rate: float = 0.01) -> "BloomFilter":
+        items = list(items)
+        bloom = cls(len(items), error_rate)
+        for item in items:
+            bloom.add(item)
+        return bloom
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item)
+        )
+
+    def _positions(self, item: str) -> list[int]:
+        # double hashing: positions h1 + i * h2 of two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+
+class KnownIds:
+    """Bloom filters of document ids per index, rebuilt from the search engine.
+
+    Indexes are tracked once a service asks about them, `refresh_forever` then
+    (re)builds filters of tracked indexes every `refresh_secs`. Documents added after
+    the last build are reported absent until the next one.
+    """
+
+    def __init__(
+        self,
+        search_engine: ISearchEngine,
+        refresh_secs: float = 300,
+        error_rate: float = 0.01,
+        batch_size: int = 5000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.search_engine = search_engine
+        self.refresh_secs = refresh_secs
+        self.error_rate = error_rate
+        self.batch_size = batch_size
+        self._clock = clock
+        self._filters: dict[str, BloomFilter] = {}
+        # next (re)build time of each tracked index
+        self._due: dict[str, float] = {}
+
+    def track(self, index: str) -> None:
+        self._due.setdefault(index, self._clock())
+
+    def might_contain(self, index: str, doc_id: str) -> bool:
+        """False only when the document is definitely absent from the index."""
+        bloom = self._filters.get(index)
+        if bloom is None:
+            self.track(index)
+            return True
+        return str(doc_id) in bloom
+
+    def add(self, index: str, doc_id: str) -> None:
+        """Register a document created after the last build."""
+        bloom = self._filters.get(index)
+        if bloom is not None:
+            bloom.add(str(doc_id))
+
+    async def rebuild(self, index: str) -> int:
+        """Build filter of the index from ids of all its documents.
+
+        :returns: number of ids in the filter
+        """
+        params = {"sort": [{ID_FIELD: "asc"}], "source_includes": [ID_FIELD]}
+        ids = []
+        async for batch in self.search_engine.iter_search(index, params, self.batch_size):
+            ids.extend(str(doc[ID_FIELD]) for doc in batch)
+        self._filters[index] = BloomFilter.from_items(ids, self.error_rate)
+        self._due[index] = self._clock() + self.refresh_secs
+        logger.info("Known ids filter of index '{}' rebuilt with {} ids", index, len(ids))
+        return len(ids)
+
+    async def refresh_forever(self, poll_secs: float = 1.0, retry_secs: float = 30) -> None:
+        """Rebuild filters of tracked indexes once they are older than `refresh_secs`.
+
+        A failed build is retried in `retry_secs`, meanwhile the previous filter is used.
+        """
+        while True:
+            for index, due in sorted(self._due.items()):
+                if due > self._clock():
+                    continue
+                try:
+                    await self.rebuild(index)
+                except Exception as error:
+                    logger.warning("Failed to rebuild known ids of index '{}': {}", index, error)
+                    self._due[index] = self._clock() + min(retry_secs, self.refresh_secs)
+            await asyncio.sleep(poll_secs)
+
+    @property
+    def indexes(self) -> list[str]:
+        return sorted(self._filters)
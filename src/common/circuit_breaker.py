@@ -1,60 +1,182 @@
-import asyncio
 import time
 from collections.abc import Callable, Coroutine
 from functools import wraps
 from typing import Any
 
 from src.common.exceptions import CircuitBreakerOpenError
+from src.common.metrics import CIRCUIT_BREAKER_STATE, CIRCUIT_BREAKER_TRANSITIONS
+
+STATE_VALUES = {"CLOSED": 0, "HALF_OPEN": 1, "OPEN": 2}
+
+
+class SlidingWindow:
+    """Counts of calls, failures and slow calls over the last `window_secs` seconds.
+
+    The window is a ring of `buckets` time slices, a slice is reset when reused.
+    """
+
+    def __init__(self, window_secs: float = 10, buckets: int = 10) -> None:
+        self.bucket_secs = window_secs / buckets
+        self._epochs = [-1] * buckets
+        self._calls = [0] * buckets
+        self._failures = [0] * buckets
+        self._slow = [0] * buckets
+
+    def add(self, now: float, failed: bool, slow: bool) -> None:
+        epoch = int(now / self.bucket_secs)
+        index = epoch % len(self._epochs)
+        if self._epochs[index] != epoch:
+            self._epochs[index] = epoch
+            self._calls[index] = self._failures[index] = self._slow[index] = 0
+        self._calls[index] += 1
+        self._failures[index] += failed
+        self._slow[index] += slow
+
+    def totals(self, now: float) -> tuple[int, int, int]:
+        """Calls, failures and slow calls within the window."""
+        oldest = int(now / self.bucket_secs) - len(self._epochs)
+        calls = failures = slow = 0
+        for index, epoch in enumerate(self._epochs):
+            if epoch > oldest:
+                calls += self._calls[index]
+                failures += self._failures[index]
+                slow += self._slow[index]
+        return calls, failures, slow
+
+    def reset(self) -> None:
+        self._epochs = [-1] * len(self._epochs)
 
 
 class AsyncCircuitBreaker:
-    def __init__(self, max_failures: int = 5, reset_timeout: int = 30):
-        self.max_failures = max_failures
+    """Circuit breaker tripping on failure rate or slow call rate over a rolling window.
+
+    CLOSED: calls pass, outcomes are counted in the window. Once the window holds at least
+    `minimum_calls`, the breaker opens when failures or slow calls reach their rate thresholds.
+    OPEN: calls are rejected for `reset_timeout` seconds.
+    HALF_OPEN: only `half_open_max_calls` probe calls pass; the breaker closes when all of
+    them succeed and opens again on the first failed or slow probe.
+
+    State is changed synchronously on the event loop, without locks: no `await` happens
+    between reading and updating it.
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 1.0,
+        slow_call_secs: float | None = None,
+        minimum_calls: int = 10,
+        window_secs: float = 10,
+        reset_timeout: float = 30,
+        half_open_max_calls: int = 3,
+        name: str = "default",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_secs = slow_call_secs
+        self.minimum_calls = minimum_calls
         self.reset_timeout = reset_timeout
-        self.failure_count = 0
-        self.last_failure_time = None
+        self.half_open_max_calls = half_open_max_calls
+        self.name = name
+        self.window = SlidingWindow(window_secs)
         self.state = "CLOSED"
-        self._lock = asyncio.Lock()
-
-    async def allow(self) -> bool:
-        async with self._lock:
-            if self.state == "OPEN":
-                if time.time() - self.last_failure_time >= self.reset_timeout:
-                    self.state = "HALF_OPEN"
-                    return True
-                return False
-            return True
-
-    async def record_failure(self):
-        async with self._lock:
-            self.failure_count += 1
-            self.last_failure_time = time.time()
-            if self.failure_count >= self.max_failures:
-                self.state = "OPEN"
-
-    async def record_success(self):
-        async with self._lock:
-            self.failure_count = 0
-            self.state = "CLOSED"
+        self.opened_at = 0.0
+        self._clock = clock
+        # epoch tells outcomes of calls admitted in the current state from stale ones
+        self._epoch = 0
+        self._probes = 0
+        self._probe_successes = 0
+        CIRCUIT_BREAKER_STATE.set(STATE_VALUES[self.state], self.name)
+
+    def acquire(self) -> int | None:
+        """Ask permission for a call.
+
+        :returns: permit to pass to `record`, None when the call is rejected
+        """
+        if self.state == "OPEN":
+            if self._clock() - self.opened_at < self.reset_timeout:
+                return None
+            self._transition("HALF_OPEN")
+        if self.state == "HALF_OPEN":
+            if self._probes >= self.half_open_max_calls:
+                return None
+            self._probes += 1
+        return self._epoch
+
+    def record(self, permit: int, failed: bool, duration: float = 0.0) -> None:
+        """Record outcome of a call admitted with `permit`."""
+        if permit != self._epoch:
+            return
+        slow = self.slow_call_secs is not None and duration >= self.slow_call_secs
+        if self.state == "HALF_OPEN":
+            if failed or slow:
+                self._transition("OPEN")
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_max_calls:
+                self._transition("CLOSED")
+            return
+        now = self._clock()
+        self.window.add(now, failed, slow)
+        calls, failures, slow_calls = self.window.totals(now)
+        if calls >= self.minimum_calls and (
+            failures >= self.failure_rate_threshold * calls
+            or slow_calls >= self.slow_call_rate_threshold * calls
+        ):
+            self._transition("OPEN")
+
+    def release(self, permit: int) -> None:
+        """Give back permit of a call which ended without outcome, e.g. was cancelled."""
+        if permit == self._epoch and self.state == "HALF_OPEN":
+            self._probes -= 1
+
+    def _transition(self, state: str) -> None:
+        CIRCUIT_BREAKER_TRANSITIONS.inc(self.name, self.state, state)
+        CIRCUIT_BREAKER_STATE.set(STATE_VALUES[state], self.name)
+        self.state = state
+        self._epoch += 1
+        self._probes = self._probe_successes = 0
+        if state == "OPEN":
+            self.opened_at = self._clock()
+        elif state == "CLOSED":
+            self.window.reset()
 
 
 def circuit_breaker(
     cb_getter: Callable,
     recorded_exceptions: tuple[BaseException, ...] = (Exception,),
+    ignored_exceptions: tuple[BaseException, ...] = (),
 ) -> Callable:
+    """Guard calls with the breaker returned by `cb_getter(self)`.
+
+    `recorded_exceptions` count as failures unless they are `ignored_exceptions`,
+    e.g. a malformed query says nothing about health of the service.
+    """
+
     def decorator(func: Coroutine) -> Coroutine:
         @wraps(func)
         async def wrapper(self, *args: tuple, **kwargs: dict) -> Any:
             cb: AsyncCircuitBreaker = cb_getter(self)
-            if not await cb.allow():
+            permit = cb.acquire()
+            if permit is None:
                 raise CircuitBreakerOpenError
+            start = time.monotonic()
             try:
                 result = await func(self, *args, **kwargs)
-                await cb.record_success()
-                return result
-            except recorded_exceptions:
-                await cb.record_failure()
+            except recorded_exceptions as error:
+                failed = not isinstance(error, ignored_exceptions)
+                cb.record(permit, failed=failed, duration=time.monotonic() - start)
+                raise
+            except Exception:
+                # service has answered, e.g. document not found
+                cb.record(permit, failed=False, duration=time.monotonic() - start)
+                raise
+            except BaseException:
+                cb.release(permit)
                 raise
+            cb.record(permit, failed=False, duration=time.monotonic() - start)
+            return result
 
         return wrapper
 
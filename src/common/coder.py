@@ -4,7 +4,9 @@ import decimal
 import json
 from typing import Any
 
+import orjson
 from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
 
 
 class JsonEncoder(json.JSONEncoder):
@@ -21,7 +23,7 @@ class JsonEncoder(json.JSONEncoder):
 
 class ICoder(abc.ABC):
     @abc.abstractclassmethod
-    def encode(cls, value: Any) -> str:
+    def encode(cls, value: Any) -> str | bytes:
         ...
 
     @abc.abstractclassmethod
@@ -39,3 +41,34 @@ class NoDecodeJsonCoder(ICoder):
     @classmethod
     def decode(cls, value: Any) -> str:
         return value
+
+
+def orjson_default(o: Any) -> Any:
+    """Serialize objects not supported by orjson natively."""
+    if isinstance(o, BaseModel):
+        # fields as `dict()` returns them, nested models are serialized by orjson in turn
+        return o.__dict__ if o.__exclude_fields__ is None else o.dict()
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if isinstance(o, set | frozenset):
+        return list(o)
+    return jsonable_encoder(o)
+
+
+class OrjsonCoder(ICoder):
+    """Json Coder working with bytes.
+
+    Encodes straight to bytes with orjson, which can be stored in key value database
+    and sent in response body as is. Decoding returns bytes untouched, so a cached
+    body is never parsed or re-encoded.
+    """
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        return orjson.dumps(value, default=orjson_default)
+
+    @classmethod
+    def decode(cls, value: str | bytes) -> bytes:
+        if isinstance(value, str):
+            return value.encode()
+        return value
@@ -0,0 +1,55 @@
+"""Content codings of responses which are compressed once and sent many times."""
+
+import gzip
+from collections.abc import Callable
+from functools import partial
+
+import brotli
+
+IDENTITY = "identity"
+
+
+class Compressor:
+    """Compress bodies with every available coding and pick one by `Accept-Encoding`.
+
+    :param gzip_level: compression level of gzip, 1-9
+    :param brotli_quality: quality of brotli, 0-11; high values are too slow for large bodies
+    """
+
+    def __init__(self, gzip_level: int = 6, brotli_quality: int = 5) -> None:
+        # in order of preference
+        self._codecs: dict[str, Callable[[bytes], bytes]] = {
+            "br": partial(brotli.compress, quality=brotli_quality),
+            # zero mtime keeps compressed bytes, and so their ETag, stable
+            "gzip": partial(gzip.compress, compresslevel=gzip_level, mtime=0),
+        }
+
+    @property
+    def encodings(self) -> list[str]:
+        return list(self._codecs)
+
+    def compress(self, content: bytes) -> dict[str, bytes]:
+        """Body in every available coding."""
+        return {encoding: codec(content) for encoding, codec in self._codecs.items()}
+
+    def negotiate(self, accept_encoding: str | None) -> str:
+        """Most preferred available coding accepted by the client, `identity` when none is."""
+        if not accept_encoding:
+            return IDENTITY
+        weights: dict[str, float] = {}
+        for item in accept_encoding.split(","):
+            coding, _, params = item.strip().partition(";")
+            weight = 1.0
+            name, _, value = params.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+            weights[coding.strip().lower()] = weight
+        best, best_weight = IDENTITY, 0.0
+        for encoding in self._codecs:
+            weight = weights.get(encoding, weights.get("*", 0.0))
+            if weight > best_weight:
+                best, best_weight = encoding, weight
+        return best
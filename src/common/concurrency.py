@@ -0,0 +1,181 @@
+"""Adaptive limit of concurrent calls to a back end, with a bounded wait queue.
+
+The limit follows AIMD on observed latency: it grows by one per limit of calls
+answered within `latency_tolerance` times the baseline (the long-term average latency
+of the same operation), and is multiplied by `backoff_ratio` when a call is slower
+or fails. Calls over the
+limit wait in a FIFO queue; when the queue is full or the wait is too long, they are
+rejected at once with `OverloadedError` instead of piling up in the client.
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Callable, Coroutine
+from functools import wraps
+from typing import Any
+
+from src.common.exceptions import OverloadedError
+from src.common.metrics import CONCURRENCY_LIMIT, CONCURRENCY_REJECTED
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit with a bounded queue.
+
+    All state is changed synchronously on the event loop, without locks.
+
+    :param initial_limit: limit before any latency is observed
+    :param min_limit: lower bound of the limit
+    :param max_limit: upper bound of the limit
+    :param max_queue: calls allowed to wait for a slot, further ones are rejected
+    :param queue_timeout: seconds a call may wait for a slot
+    :param latency_tolerance: latency over baseline times this is congestion
+    :param backoff_ratio: factor the limit is multiplied by on congestion
+    :param baseline_smoothing: weight of a call in the moving average of latency
+    :param retry_after: seconds clients are asked to wait after rejection
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 2,
+        max_limit: int = 200,
+        max_queue: int = 100,
+        queue_timeout: float = 1.0,
+        latency_tolerance: float = 2.0,
+        backoff_ratio: float = 0.9,
+        baseline_smoothing: float = 0.01,
+        retry_after: int = 1,
+        name: str = "default",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.baseline_smoothing = baseline_smoothing
+        self.retry_after = retry_after
+        self.name = name
+        self.in_flight = 0
+        self._clock = clock
+        self._limit = float(initial_limit)
+        self._waiters: deque[asyncio.Future] = deque()
+        self._baselines: dict[str, float] = {}
+        self._decreased_at = float("-inf")
+        CONCURRENCY_LIMIT.set(self.limit, self.name)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> float:
+        """Wait for a slot.
+
+        :returns: start time of the call to pass to `release`
+        :raises OverloadedError: when the queue is full or the wait times out
+        """
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return self._clock()
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (TimeoutError, asyncio.CancelledError) as error:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just before the wait ended
+                self._release_slot()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(error, TimeoutError):
+                raise self._reject("queue_timeout") from None
+            raise
+        return self._clock()
+
+    def release(self, started_at: float, failed: bool = False, operation: str = "") -> None:
+        """Free the slot of a call started at `started_at` and adapt the limit to its outcome.
+
+        Latency is compared with the baseline of the same `operation`, so that slow kinds
+        of calls are not taken for congestion.
+        """
+        latency = self._clock() - started_at
+        baseline = self._baselines.get(operation, latency)
+        self._baselines[operation] = baseline + (latency - baseline) * self.baseline_smoothing
+        congested = failed or latency > baseline * self.latency_tolerance
+        if congested:
+            # calls started before the last decrease report the same congestion
+            if started_at >= self._decreased_at:
+                self._set_limit(self._limit * self.backoff_ratio)
+                self._decreased_at = self._clock()
+        elif self.in_flight >= self.limit / 2:
+            # grow only while the limit is actually used
+            self._set_limit(self._limit + 1 / self._limit)
+        self._release_slot()
+
+    def cancel(self) -> None:
+        """Free the slot of a call which ended without outcome."""
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.in_flight += 1
+
+    def _set_limit(self, limit: float) -> None:
+        self._limit = min(self.max_limit, max(self.min_limit, limit))
+        CONCURRENCY_LIMIT.set(self.limit, self.name)
+
+    def _reject(self, reason: str) -> OverloadedError:
+        CONCURRENCY_REJECTED.inc(self.name, reason)
+        return OverloadedError(retry_after=self.retry_after)
+
+
+def concurrency_limit(
+    limiter_getter: Callable,
+    recorded_exceptions: tuple[BaseException, ...] = (Exception,),
+    ignored_exceptions: tuple[BaseException, ...] = (),
+    operation_getter: Callable[..., str] | None = None,
+) -> Callable:
+    """Run calls within the limiter returned by `limiter_getter(self)`, if any.
+
+    `recorded_exceptions` signal congestion unless they are `ignored_exceptions`.
+    `operation_getter(*args, **kwargs)` names the kind of call to compare latencies within.
+    """
+
+    def decorator(func: Coroutine) -> Coroutine:
+        @wraps(func)
+        async def wrapper(self, *args: tuple, **kwargs: dict) -> Any:
+            limiter: AdaptiveConcurrencyLimiter | None = limiter_getter(self)
+            if limiter is None:
+                return await func(self, *args, **kwargs)
+            operation = operation_getter(*args, **kwargs) if operation_getter else ""
+            started_at = await limiter.acquire()
+            try:
+                result = await func(self, *args, **kwargs)
+            except recorded_exceptions as error:
+                failed = not isinstance(error, ignored_exceptions)
+                limiter.release(started_at, failed=failed, operation=operation)
+                raise
+            except Exception:
+                limiter.release(started_at, operation=operation)
+                raise
+            except BaseException:
+                limiter.cancel()
+                raise
+            limiter.release(started_at, operation=operation)
+            return result
+
+        return wrapper
+
+    return decorator
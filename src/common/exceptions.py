@@ -51,6 +51,19 @@ class RepositoryError(BaseError):
     status: int = 500
 
 
+class OverloadedError(RepositoryError):
+    message: str = "Service is overloaded, retry later."
+    status: int = 503
+
+    def __init__(self, message: str | None = None, retry_after: int = 1, **kwargs: Any) -> None:
+        self.retry_after = retry_after
+        super().__init__(message, **kwargs)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Retry-After": str(self.retry_after)}
+
+
 class DocumentNotFoundError(RepositoryError):
     message_template: str = "Document with ID '{doc_id}' not found."
     status: int = 404
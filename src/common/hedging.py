@@ -0,0 +1,137 @@
+"""Hedged requests: when a call is slower than usual, race it against a second copy.
+
+Tail latency of a replicated back end mostly comes from one slow replica (a busy shard
+copy, a GC pause), so a duplicate sent after the usual response time, e.g. p95, most
+likely lands on a healthy replica. The first response wins and the other call is
+cancelled. A budget caps the duplicates to a share of calls.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from src.common.metrics import HEDGED_REQUESTS
+from src.common.retry import RetryBudget
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Percentile of recent latencies, recomputed every `refresh_every` observations."""
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        max_samples: int = 1000,
+        min_samples: int = 100,
+        refresh_every: int = 50,
+    ) -> None:
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.refresh_every = refresh_every
+        self._samples: deque[float] = deque(maxlen=max_samples)
+        self._since_refresh = 0
+        self._value: float | None = None
+
+    def observe(self, latency: float) -> None:
+        self._samples.append(latency)
+        self._since_refresh += 1
+        if self._since_refresh >= self.refresh_every and len(self._samples) >= self.min_samples:
+            ordered = sorted(self._samples)
+            self._value = ordered[max(0, math.ceil(self.percentile / 100 * len(ordered)) - 1)]
+            self._since_refresh = 0
+
+    @property
+    def value(self) -> float | None:
+        """Percentile of recent latencies, None until `min_samples` are observed."""
+        return self._value
+
+
+class HedgePolicy:
+    """Delay and budget of hedged calls, tracked per operation.
+
+    :param percentile: latency percentile of an operation after which a hedge is sent
+    :param default_delay: delay used until enough latencies are observed
+    :param min_delay: lower bound of the delay, so hedges never double a fast back end
+    :param preference: search engine `preference` of hedges, routing them to other replicas
+    :param budget: shared budget every hedge is taken from
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        default_delay: float = 0.05,
+        min_delay: float = 0.005,
+        preference: str | None = None,
+        budget: RetryBudget | None = None,
+    ) -> None:
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.preference = preference
+        self.budget = budget
+        self._trackers: dict[str, LatencyTracker] = {}
+
+    def delay(self, operation: str) -> float:
+        value = self._tracker(operation).value
+        return self.default_delay if value is None else max(self.min_delay, value)
+
+    async def call(
+        self,
+        operation: str,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[], Awaitable[T]],
+    ) -> T:
+        """Await `primary()`, racing it against `hedge()` when it takes longer than the delay.
+
+        The first successful result wins; when both calls fail, error of the primary is raised.
+        """
+        if self.budget is not None:
+            self.budget.record_call()
+        start = time.monotonic()
+        tasks = [asyncio.ensure_future(primary())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.delay(operation))
+            if not done:
+                if self.budget is None or self.budget.try_spend():
+                    HEDGED_REQUESTS.inc(operation, "sent")
+                    tasks.append(asyncio.ensure_future(hedge()))
+                else:
+                    HEDGED_REQUESTS.inc(operation, "throttled")
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            HEDGED_REQUESTS.inc(operation, "won")
+                        return task.result()
+            raise tasks[0].exception()
+        finally:
+            self._observe_primary(operation, tasks[0], start)
+            # losers are not awaited, they wind down in the background
+            for task in tasks:
+                task.cancel()
+            # errors of losing calls are already reported by the calls themselves
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    task.exception()
+
+    def _observe_primary(self, operation: str, task: asyncio.Future, start: float) -> None:
+        """Observe latency of the primary call, never of a hedge.
+
+        Latency of a winning hedge is short by design and would drag the delay down with
+        every hedge sent. A primary cancelled by its hedge is observed with the time it
+        had been running, a lower bound of its latency; a failed primary is not observed.
+        """
+        if not task.done() or (not task.cancelled() and task.exception() is None):
+            self._tracker(operation).observe(time.monotonic() - start)
+
+    def _tracker(self, operation: str) -> LatencyTracker:
+        tracker = self._trackers.get(operation)
+        if tracker is None:
+            tracker = self._trackers[operation] = LatencyTracker(self.percentile)
+        return tracker
@@ -1,3 +1,6 @@
+from .generations import CacheGenerations
 from .interfaces import IKeyValueDatabase
+from .local import LocalCache
 from .redis import RedisDatabase
 from .redis_key_value_database import RedisKeyValueDatabase
+from .write_behind import WriteBehindKeyValueDatabase
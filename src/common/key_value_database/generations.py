@@ -0,0 +1,88 @@
+import asyncio
+import time
+from collections.abc import Callable
+
+from loguru import logger
+
+from src.common.key_value_database.interfaces import IKeyValueDatabase
+
+GENERATION_COUNTER_KEY = "generation:{namespace}"
+
+
+class CacheGenerations:
+    """Generation counters of cache namespaces.
+
+    Current generation of a namespace is folded into its keys as
+    `{namespace}:{generation}:{key}`, so purging the namespace is a single INCR
+    of its counter. Keys of older generations are never read again and are
+    reclaimed by their TTL or by `sweep`.
+
+    Generations are cached in process for `refresh_secs`, so a purge made by
+    another worker is picked up with at most that delay.
+    """
+
+    def __init__(
+        self,
+        key_value_database: IKeyValueDatabase,
+        refresh_secs: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.key_value_database = key_value_database
+        self.refresh_secs = refresh_secs
+        self._clock = clock
+        self._generations: dict[str, tuple[float, int]] = {}
+
+    async def get(self, namespace: str) -> int:
+        cached = self._generations.get(namespace)
+        if cached is not None and cached[0] > self._clock():
+            return cached[1]
+        raw = await self.key_value_database.get(self._counter_key(namespace))
+        generation = int(raw) if raw else 0
+        self._remember(namespace, generation)
+        return generation
+
+    async def build_key(self, namespace: str, key: str) -> str:
+        return f"{namespace}:{await self.get(namespace)}:{key}"
+
+    async def purge(self, namespace: str) -> int:
+        """Invalidate all keys of the namespace by switching it to a new generation.
+
+        :returns: new generation of the namespace
+        """
+        generation = await self.key_value_database.incr(self._counter_key(namespace))
+        self._remember(namespace, generation)
+        logger.info("Cache namespace '{}' purged, generation: {}", namespace, generation)
+        return generation
+
+    async def sweep(self, namespace: str) -> int:
+        """Delete keys of stale generations of the namespace without blocking the server.
+
+        :returns: number of deleted keys
+        """
+        self._generations.pop(namespace, None)
+        generation = await self.get(namespace)
+        return await self.key_value_database.clear(
+            f"{namespace}:*", exclude=f"{namespace}:{generation}:*"
+        )
+
+    async def sweep_forever(self, interval: float) -> None:
+        """Periodically sweep every namespace used by this process."""
+        while True:
+            await asyncio.sleep(interval)
+            for namespace in list(self._generations):
+                try:
+                    count = await self.sweep(namespace)
+                    logger.debug("Swept {} stale keys of namespace '{}'", count, namespace)
+                except Exception as error:
+                    logger.warning("Failed to sweep namespace '{}': {}", namespace, error)
+
+    @property
+    def namespaces(self) -> list[str]:
+        return list(self._generations)
+
+    def _remember(self, namespace: str, generation: int) -> None:
+        self._generations[namespace] = (self._clock() + self.refresh_secs, generation)
+
+    @staticmethod
+    def _counter_key(namespace: str) -> str:
+        return GENERATION_COUNTER_KEY.format(namespace=namespace)
@@ -1,17 +1,40 @@
 import abc
+from collections.abc import Mapping, Sequence
 
 
 class IKeyValueDatabase(abc.ABC):
     @abc.abstractmethod
-    async def get_with_ttl(self, key: str) -> tuple[int, str | None]:
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
         ...
 
     @abc.abstractmethod
-    async def get(self, key: str) -> str | None:
+    async def get(self, key: str) -> bytes | None:
         ...
 
     @abc.abstractmethod
-    async def set(self, key: str, value: str, expire: int | None = None) -> None:
+    async def set(self, key: str, value: str | bytes, expire: int | None = None) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def set_if_not_exists(
+        self, key: str, value: str | bytes, expire: int | None = None
+    ) -> bool:
+        """Set key only if it does not exist, return whether it was set."""
+        ...
+
+    @abc.abstractmethod
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        """Get values of several keys in one round trip, in the order of `keys`."""
+        ...
+
+    @abc.abstractmethod
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[tuple[int, bytes | None]]:
+        """Get TTLs and values of several keys in one round trip, in the order of `keys`."""
+        ...
+
+    @abc.abstractmethod
+    async def set_many(self, values: Mapping[str, str | bytes], expire: int | None = None) -> None:
+        """Set several keys in one round trip."""
         ...
 
     @abc.abstractmethod
@@ -19,5 +42,11 @@ class IKeyValueDatabase(abc.ABC):
         ...
 
     @abc.abstractmethod
-    async def clear(self, pattern: str) -> int:
+    async def incr(self, key: str) -> int:
+        """Increment integer value of key by one, return the new value."""
+        ...
+
+    @abc.abstractmethod
+    async def clear(self, pattern: str, exclude: str | None = None) -> int:
+        """Delete keys matching `pattern`, except those matching `exclude`."""
         ...
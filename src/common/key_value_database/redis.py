@@ -1,6 +1,8 @@
+from fnmatch import fnmatchcase
 from typing import Any
 
 from redis.asyncio import ConnectionPool, Redis
+from src.common.metrics import MetricFamily, Sample
 
 
 class RedisDatabase(Redis):
@@ -13,7 +15,7 @@ class RedisDatabase(Redis):
         cls,
         config: dict,
         encoding: str = "utf8",
-        decode_responses: bool = True,
+        decode_responses: bool = False,
         **kwargs: Any,
     ) -> "RedisDatabase":
         if "dsn" not in config or "prefix" not in config:
@@ -27,17 +29,48 @@ class RedisDatabase(Redis):
         )
         return cls(prefix=config["prefix"], connection_pool=connection_pool)
 
-    async def clear(self, pattern: str) -> int:
-        script = f"""
-        local count = 0;
-        for i, name in ipairs(redis.call('KEYS', '{self.prefix}:{pattern}'))
-        do
-            redis.call('DEL', name);
-            count = count + 1;
-        end
-        return count
+    async def clear(self, pattern: str, exclude: str | None = None, batch_size: int = 500) -> int:
+        """Unlink keys matching pattern.
+
+        Keyspace is walked incrementally with SCAN and memory is reclaimed by UNLINK
+        in a background thread of Redis, so the server is never blocked for long.
+
+        :param pattern: glob-style pattern of keys to delete, without prefix
+        :param exclude: glob-style pattern of keys to keep, without prefix
+        :param batch_size: number of keys scanned and unlinked per round trip
+
+        :returns: number of unlinked keys
         """
-        return await self.eval(script, numkeys=0)  # type: ignore
+        excluded = self.build_key(exclude) if exclude else None
+        count = 0
+        batch: list[str | bytes] = []
+        async for name in self.scan_iter(match=self.build_key(pattern), count=batch_size):
+            key = name.decode() if isinstance(name, bytes) else name
+            if excluded and fnmatchcase(key, excluded):
+                continue
+            batch.append(name)
+            if len(batch) >= batch_size:
+                count += await self.unlink(*batch)
+                batch.clear()
+        if batch:
+            count += await self.unlink(*batch)
+        return count
+
+    def pool_stats(self) -> dict[str, int]:
+        """Connections of the pool in use and idle."""
+        pool = self.connection_pool
+        return {
+            "in_use": len(getattr(pool, "_in_use_connections", ())),
+            "idle": len(getattr(pool, "_available_connections", ())),
+        }
+
+    def collect_metrics(self) -> list[MetricFamily]:
+        """Pool gauges for `MetricsRegistry.register_collector`, read at scrape time."""
+        samples = [
+            Sample("redis_pool_connections", {"state": state}, count)
+            for state, count in self.pool_stats().items()
+        ]
+        return [MetricFamily("redis_pool_connections", "gauge", "Redis pool connections", samples)]
 
     def build_key(self, key: str) -> str:
         return f"{self.prefix}:{key}"
@@ -1,3 +1,5 @@
+from collections.abc import Mapping, Sequence
+
 from src.common.key_value_database.interfaces import IKeyValueDatabase
 from src.common.key_value_database.redis import RedisDatabase
 
@@ -6,19 +8,50 @@ class RedisKeyValueDatabase(IKeyValueDatabase):
     def __init__(self, redis: RedisDatabase):
         self.redis = redis
 
-    async def get_with_ttl(self, key: str) -> tuple[int, str]:
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
         key = self.redis.build_key(key)
         async with self.redis.pipeline(transaction=True) as pipe:
             return await pipe.ttl(key).get(key).execute()
 
-    async def get(self, key: str) -> str | None:
+    async def get(self, key: str) -> bytes | None:
         return await self.redis.get(self.redis.build_key(key))
 
-    async def set(self, key: str, value: str, expire: int | None = None) -> None:
+    async def set(self, key: str, value: str | bytes, expire: int | None = None) -> None:
         await self.redis.set(self.redis.build_key(key), value, ex=expire)
 
+    async def set_if_not_exists(
+        self, key: str, value: str | bytes, expire: int | None = None
+    ) -> bool:
+        return bool(await self.redis.set(self.redis.build_key(key), value, ex=expire, nx=True))
+
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        if not keys:
+            return []
+        return await self.redis.mget([self.redis.build_key(key) for key in keys])
+
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[tuple[int, bytes | None]]:
+        if not keys:
+            return []
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for key in keys:
+                key = self.redis.build_key(key)
+                pipe.ttl(key).get(key)
+            replies = await pipe.execute()
+        return list(zip(replies[::2], replies[1::2], strict=True))
+
+    async def set_many(self, values: Mapping[str, str | bytes], expire: int | None = None) -> None:
+        if not values:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.set(self.redis.build_key(key), value, ex=expire)
+            await pipe.execute()
+
     async def delete(self, key: str) -> int:
         return await self.redis.delete(self.redis.build_key(key))
 
-    async def clear(self, pattern: str) -> int:
-        return await self.redis.clear(pattern)
+    async def incr(self, key: str) -> int:
+        return await self.redis.incr(self.redis.build_key(key))
+
+    async def clear(self, pattern: str, exclude: str | None = None) -> int:
+        return await self.redis.clear(pattern, exclude=exclude)
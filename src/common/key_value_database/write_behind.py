@@ -0,0 +1,159 @@
+import asyncio
+import contextlib
+from collections.abc import Mapping, Sequence
+
+from loguru import logger
+
+from src.common.key_value_database.interfaces import IKeyValueDatabase
+from src.common.metrics import CACHE_WRITES
+
+
+class WriteBehindKeyValueDatabase(IKeyValueDatabase):
+    """Key value database whose plain SETs are queued and written in batches.
+
+    `set` and `set_many` return at once; a background task flushes queued values
+    every `flush_interval` seconds, or as soon as `batch_size` of them are queued,
+    with one pipelined `set_many` per expiration. Writes of the same key are merged,
+    the last one wins. When `max_pending` values are queued, further writes are dropped:
+    they only populate a cache, so losing them costs a later miss, not correctness.
+
+    Reads see queued values. Other commands go straight to the wrapped database.
+    Call `close` on shutdown to flush what is left.
+    """
+
+    def __init__(
+        self,
+        key_value_database: IKeyValueDatabase,
+        flush_interval: float = 0.05,
+        batch_size: int = 500,
+        max_pending: int = 10_000,
+    ) -> None:
+        self.key_value_database = key_value_database
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._pending: dict[str, tuple[str | bytes, int | None]] = {}
+        self._batch_ready: asyncio.Event | None = None
+        self._flusher: asyncio.Task | None = None
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        if key in self._pending:
+            return self._queued_with_ttl(key)
+        return await self.key_value_database.get_with_ttl(key)
+
+    async def get(self, key: str) -> bytes | None:
+        queued = self._pending.get(key)
+        if queued is not None:
+            return _to_bytes(queued[0])
+        return await self.key_value_database.get(key)
+
+    async def set(self, key: str, value: str | bytes, expire: int | None = None) -> None:
+        self._enqueue(key, value, expire)
+
+    async def set_if_not_exists(
+        self, key: str, value: str | bytes, expire: int | None = None
+    ) -> bool:
+        return await self.key_value_database.set_if_not_exists(key, value, expire=expire)
+
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        if not self._pending:
+            return await self.key_value_database.get_many(keys)
+        unqueued = [key for key in keys if key not in self._pending]
+        values = dict(zip(unqueued, await self.key_value_database.get_many(unqueued), strict=True))
+        return [
+            _to_bytes(self._pending[key][0]) if key in self._pending else values[key]
+            for key in keys
+        ]
+
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[tuple[int, bytes | None]]:
+        if not self._pending:
+            return await self.key_value_database.get_many_with_ttl(keys)
+        unqueued = [key for key in keys if key not in self._pending]
+        values = dict(
+            zip(unqueued, await self.key_value_database.get_many_with_ttl(unqueued), strict=True)
+        )
+        return [self._queued_with_ttl(key) if key in self._pending else values[key] for key in keys]
+
+    async def set_many(self, values: Mapping[str, str | bytes], expire: int | None = None) -> None:
+        for key, value in values.items():
+            self._enqueue(key, value, expire)
+
+    async def delete(self, key: str) -> int:
+        self._pending.pop(key, None)
+        return await self.key_value_database.delete(key)
+
+    async def incr(self, key: str) -> int:
+        return await self.key_value_database.incr(key)
+
+    async def clear(self, pattern: str, exclude: str | None = None) -> int:
+        return await self.key_value_database.clear(pattern, exclude=exclude)
+
+    async def flush(self) -> int:
+        """Write all queued values now.
+
+        :returns: number of written values
+        """
+        batch, self._pending = self._pending, {}
+        if self._batch_ready is not None:
+            self._batch_ready.clear()
+        if not batch:
+            return 0
+        by_expire: dict[int | None, dict[str, str | bytes]] = {}
+        for key, (value, expire) in batch.items():
+            by_expire.setdefault(expire, {})[key] = value
+        written = 0
+        for expire, values in by_expire.items():
+            try:
+                await self.key_value_database.set_many(values, expire=expire)
+            except Exception as error:
+                CACHE_WRITES.inc("failed", amount=len(values))
+                logger.warning("Failed to write {} cached values: {}", len(values), error)
+                continue
+            written += len(values)
+        CACHE_WRITES.inc("written", amount=written)
+        return written
+
+    async def close(self) -> None:
+        """Stop background flushes and write what is left."""
+        self._closed = True
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+    def _enqueue(self, key: str, value: str | bytes, expire: int | None) -> None:
+        if key not in self._pending and len(self._pending) >= self.max_pending:
+            CACHE_WRITES.inc("dropped")
+            return
+        self._pending[key] = (value, expire)
+        CACHE_WRITES.inc("queued")
+        if not self._closed:
+            self._ensure_flusher()
+        if len(self._pending) >= self.batch_size and self._batch_ready is not None:
+            self._batch_ready.set()
+
+    def _queued_with_ttl(self, key: str) -> tuple[int, bytes]:
+        value, expire = self._pending[key]
+        return (-1 if expire is None else expire), _to_bytes(value)
+
+    def _ensure_flusher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._flusher is not None and self._flusher.get_loop() is loop:
+            return
+        self._batch_ready = asyncio.Event()
+        self._flusher = loop.create_task(self._flush_forever(self._batch_ready))
+
+    async def _flush_forever(self, batch_ready: asyncio.Event) -> None:
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(batch_ready.wait(), self.flush_interval)
+            await self.flush()
+
+
+def _to_bytes(value: str | bytes) -> bytes:
+    return value.encode() if isinstance(value, str) else value
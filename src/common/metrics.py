@@ -0,0 +1,255 @@
+"""Lightweight in-process metrics rendered in Prometheus text exposition format.
+
+Recording is a dict lookup and an addition, cheap enough to stay on in production.
+Values which are expensive to keep up to date (pool sizes, states) are read only
+at scrape time by collectors.
+"""
+
+import bisect
+import math
+from collections.abc import Callable, Iterable, Sequence
+from typing import NamedTuple, TypeVar
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Sample(NamedTuple):
+    name: str
+    labels: dict[str, str]
+    value: float
+
+
+class MetricFamily(NamedTuple):
+    name: str
+    type: str
+    help: str
+    samples: list[Sample]
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+
+    def collect(self) -> MetricFamily:
+        raise NotImplementedError
+
+    def _labels(self, values: tuple[str, ...]) -> dict[str, str]:
+        return dict(zip(self.label_names, values, strict=True))
+
+
+class Counter(Metric):
+    """Monotonically increasing value, e.g. number of cache hits."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def collect(self) -> MetricFamily:
+        samples = [
+            Sample(f"{self.name}_total", self._labels(labels), value)
+            for labels, value in self._values.items()
+        ]
+        return MetricFamily(self.name, self.type, self.help, samples)
+
+
+class Gauge(Metric):
+    """Value which goes up and down, e.g. state of a circuit breaker."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def collect(self) -> MetricFamily:
+        samples = [
+            Sample(self.name, self._labels(labels), value) for labels, value in self._values.items()
+        ]
+        return MetricFamily(self.name, self.type, self.help, samples)
+
+
+class Histogram(Metric):
+    """Distribution of observed values over cumulative buckets, e.g. latencies."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per labels: counts of buckets (the last one is +Inf), sum of observed values
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def collect(self) -> MetricFamily:
+        samples = []
+        for labels, (counts, total) in self._values.items():
+            label_dict = self._labels(labels)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += count
+                samples.append(
+                    Sample(f"{self.name}_bucket", {**label_dict, "le": _format(bound)}, cumulative)
+                )
+            samples.append(Sample(f"{self.name}_sum", label_dict, total[0]))
+            samples.append(Sample(f"{self.name}_count", label_dict, cumulative))
+        return MetricFamily(self.name, self.type, self.help, samples)
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Collector] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def register_collector(self, collector: Collector) -> Collector:
+        """Add a function producing metric families at scrape time."""
+        self._collectors.append(collector)
+        return collector
+
+    def unregister_collector(self, collector: Collector) -> None:
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def collect(self) -> list[MetricFamily]:
+        families = [metric.collect() for metric in self._metrics.values()]
+        for collector in list(self._collectors):
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format."""
+        lines = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {_escape_help(family.help)}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            lines.extend(
+                f"{sample.name}{_format_labels(sample.labels)} {_format(sample.value)}"
+                for sample in family.samples
+            )
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: M) -> M:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                raise ValueError(f"Metric {metric.name} is already registered differently")
+            return existing  # type: ignore[return-value]
+        self._metrics[metric.name] = metric
+        return metric
+
+
+def _format(value: float) -> str:
+    if math.isinf(value) or math.isnan(value):
+        return {math.inf: "+Inf", -math.inf: "-Inf"}.get(value, "NaN")
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label(str(value))}"' for name, value in labels.items())
+    return f"{{{pairs}}}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+REGISTRY = MetricsRegistry()
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests",
+    "Cache lookups by cache, namespace and result",
+    ["cache", "namespace", "result"],
+)
+CACHE_WRITES = REGISTRY.counter(
+    "cache_writes", "Write-behind cache writes: queued, dropped, written, failed", ["result"]
+)
+SEARCH_ENGINE_LATENCY = REGISTRY.histogram(
+    "search_engine_request_duration_seconds",
+    "Duration of search engine calls, retries included",
+    ["operation", "index"],
+)
+RETRY_ATTEMPTS = REGISTRY.counter(
+    "retry_attempts",
+    "Attempts of retried calls: failed, recovered, given up as exhausted, deadline or budget",
+    ["function", "outcome"],
+)
+HEDGED_REQUESTS = REGISTRY.counter(
+    "hedged_requests",
+    "Hedges of slow calls by operation: sent, won over the primary, throttled by budget",
+    ["operation", "outcome"],
+)
+CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "concurrency_limit", "Current adaptive limit of concurrent calls", ["name"]
+)
+CONCURRENCY_REJECTED = REGISTRY.counter(
+    "concurrency_rejected", "Calls shed by concurrency limiter by reason", ["name", "reason"]
+)
+CIRCUIT_BREAKER_STATE = REGISTRY.gauge(
+    "circuit_breaker_state", "State of circuit breaker: 0 closed, 1 half-open, 2 open", ["name"]
+)
+CIRCUIT_BREAKER_TRANSITIONS = REGISTRY.counter(
+    "circuit_breaker_transitions", "Transitions of circuit breaker states", ["name", "from", "to"]
+)
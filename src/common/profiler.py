@@ -0,0 +1,222 @@
+"""Sampling profiler of requests, aggregating stacks in flame-graph "folded" format.
+
+A fraction of requests is sampled. While any sampled request is in flight, a background
+thread periodically takes the stack of each of their tasks:
+
+* the task running on the event loop contributes its on-CPU stack, marked `[cpu]`;
+* a suspended task contributes its chain of awaiting coroutines, marked `[wait]`,
+  which shows what it waits for (search engine, key value database...).
+
+Stacks are aggregated per route as `route;[cpu];module:function;... count`, ready for
+`flamegraph.pl` or speedscope. Unsampled requests cost one random number.
+"""
+
+import asyncio
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass
+from types import FrameType
+from typing import Any
+
+from loguru import logger
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+MAX_STACK_DEPTH = 128
+TRUNCATED_STACK = "[truncated]"
+
+
+@dataclass
+class RouteProfile:
+    requests: int = 0
+    wall_secs: float = 0.0
+    cpu_samples: int = 0
+    wait_samples: int = 0
+
+
+@dataclass
+class _Sampled:
+    task: asyncio.Task
+    stacks: Counter
+
+
+class SamplingProfiler:
+    """Aggregated stacks and time of sampled requests per route.
+
+    :param sample_rate: fraction of requests to profile, from 0 to 1
+    :param interval: seconds between stack samples
+    :param max_stacks: distinct stacks kept, further ones are counted as truncated
+    """
+
+    def __init__(
+        self, sample_rate: float = 0.01, interval: float = 0.005, max_stacks: int = 10_000
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.stacks: Counter[str] = Counter()
+        self.routes: dict[str, RouteProfile] = {}
+        self._active: dict[int, _Sampled] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate  # noqa: S311
+
+    def start_request(self) -> int:
+        """Register current task as sampled, return its token for `finish_request`."""
+        task = asyncio.current_task()
+        if task is None:
+            raise RuntimeError("Requests are profiled only inside a task")
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._loop_thread_id = loop, threading.get_ident()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        token = id(task)
+        with self._lock:
+            self._active[token] = _Sampled(task=task, stacks=Counter())
+        self._wakeup.set()
+        return token
+
+    def finish_request(self, token: int, route: str, wall_secs: float) -> None:
+        with self._lock:
+            sampled = self._active.pop(token, None)
+            if not self._active:
+                self._wakeup.clear()
+            profile = self.routes.setdefault(route, RouteProfile())
+            profile.requests += 1
+            profile.wall_secs += wall_secs
+            if sampled is None:
+                return
+            for stack, count in sampled.stacks.items():
+                if stack.startswith("[cpu]"):
+                    profile.cpu_samples += count
+                else:
+                    profile.wait_samples += count
+                key = f"{route};{stack}"
+                if key not in self.stacks and len(self.stacks) >= self.max_stacks:
+                    key = f"{route};{TRUNCATED_STACK}"
+                self.stacks[key] += count
+
+    def folded(self) -> str:
+        """Aggregated stacks in folded format, one `frame;frame;... count` per line."""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """Requests, wall time and estimated CPU time of sampled requests per route."""
+        with self._lock:
+            return {
+                route: {
+                    "requests": profile.requests,
+                    "wall_ms": profile.wall_secs * 1000,
+                    "cpu_ms": profile.cpu_samples * self.interval * 1000,
+                    "wait_ms": profile.wait_samples * self.interval * 1000,
+                    "wall_ms_per_request": profile.wall_secs * 1000 / profile.requests,
+                }
+                for route, profile in self.routes.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stacks.clear()
+            self.routes.clear()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            try:
+                self.sample()
+            except Exception as error:  # the profiler must never break the application
+                logger.warning("Profiler sample failed: {}", error)
+
+    def sample(self) -> None:
+        """Take one stack sample of every sampled request in flight."""
+        frame = sys._current_frames().get(self._loop_thread_id)  # noqa: SLF001
+        running = asyncio.current_task(self._loop) if self._loop is not None else None
+        with self._lock:
+            for sampled in self._active.values():
+                if sampled.task is running and frame is not None:
+                    stack = ";".join(("[cpu]", *_running_frames(frame, sampled.task)))
+                else:
+                    stack = ";".join(("[wait]", *_awaiting_frames(sampled.task)))
+                sampled.stacks[stack] += 1
+
+
+class ProfilerMiddleware:
+    """ASGI middleware profiling a fraction of HTTP requests with `SamplingProfiler`."""
+
+    def __init__(self, app: ASGIApp, profiler: SamplingProfiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.profiler.should_sample():
+            await self.app(scope, receive, send)
+            return
+        token = self.profiler.start_request()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.finish_request(token, route_name(scope), time.perf_counter() - start)
+
+
+def route_name(scope: Scope) -> str:
+    """Path template of the matched route, e.g. `GET /v1/films/{film_id}`."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        endpoint = scope.get("endpoint")
+        path = getattr(endpoint, "__qualname__", None) or scope.get("path", "")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+def frame_name(frame: FrameType) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_qualname}"
+
+
+def _running_frames(frame: FrameType, task: asyncio.Task) -> list[str]:
+    """Frames of the running task from its coroutine down to the executing function."""
+    root = getattr(task.get_coro(), "cr_frame", None)
+    frames = []
+    current: FrameType | None = frame
+    while current is not None and len(frames) < MAX_STACK_DEPTH:
+        frames.append(current)
+        if current is root:
+            break
+        current = current.f_back
+    return [frame_name(item) for item in reversed(frames)]
+
+
+def _awaiting_frames(task: asyncio.Task) -> list[str]:
+    """Frames of the chain of coroutines the suspended task awaits on, outermost first."""
+    return [frame_name(frame) for frame in _await_chain(task.get_coro())]
+
+
+def _await_chain(awaitable: Any) -> Iterator[FrameType]:
+    depth = 0
+    while awaitable is not None and depth < MAX_STACK_DEPTH:
+        frame = (
+            getattr(awaitable, "cr_frame", None)
+            or getattr(awaitable, "ag_frame", None)
+            or getattr(awaitable, "gi_frame", None)
+        )
+        if frame is not None:
+            yield frame
+        awaitable = (
+            getattr(awaitable, "cr_await", None)
+            or getattr(awaitable, "ag_await", None)
+            or getattr(awaitable, "gi_yieldfrom", None)
+        )
+        depth += 1
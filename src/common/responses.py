@@ -0,0 +1,86 @@
+import hashlib
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Mapping
+from http import HTTPStatus
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+from src.common.coder import OrjsonCoder
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def compute_etag(content: bytes) -> str:
+    """Strong entity tag of a response body."""
+    return f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether `If-None-Match` header lists the entity tag, compared weakly as RFC 9110 says."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag.removeprefix("W/")
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified_response(etag: str, headers: Mapping[str, str] | None = None) -> Response:
+    """`304 Not Modified` for a client which already has the entity tag."""
+    return Response(status_code=HTTPStatus.NOT_MODIFIED, headers={**(headers or {}), "ETag": etag})
+
+
+def json_bytes_response(
+    content: bytes,
+    if_none_match: str | None = None,
+    etag: str | None = None,
+    headers: Mapping[str, str] | None = None,
+) -> Response:
+    """Response of encoded json with its ETag, `304 Not Modified` when the client has it."""
+    etag = etag or compute_etag(content)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag, headers)
+    return Response(
+        content=content,
+        status_code=HTTPStatus.OK,
+        headers={**(headers or {}), "ETag": etag},
+        media_type=JSON_MEDIA_TYPE,
+    )
+
+
+async def encode_ndjson(batches: AsyncIterable[Iterable[Any]]) -> AsyncIterator[bytes]:
+    """Encode batches of objects into chunks of newline delimited json, one chunk per batch."""
+    async for batch in batches:
+        chunk = b"".join(OrjsonCoder.encode(item) + b"\n" for item in batch)
+        if chunk:
+            yield chunk
+
+
+class TrustedJSONResponse(Response):
+    """JSON response of models built from trusted data, encoded with orjson.
+
+    A route returning it skips validation of the result against its return annotation,
+    which still documents the response schema.
+    """
+
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return OrjsonCoder.encode(content)
+
+
+class NDJSONResponse(StreamingResponse):
+    """Stream batches of objects as newline delimited json.
+
+    Objects are encoded batch by batch as they arrive, so memory stays bounded
+    by the size of one batch regardless of the size of the result.
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    def __init__(self, batches: AsyncIterable[Iterable[Any]], **kwargs: Any) -> None:
+        super().__init__(encode_ndjson(batches), **kwargs)
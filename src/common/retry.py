@@ -1,31 +1,152 @@
 import asyncio
-from collections.abc import Callable, Coroutine
+import random
+import time
+from collections.abc import Awaitable, Callable, Coroutine
+from dataclasses import dataclass
 from functools import wraps
-from typing import Any
+from typing import Any, TypeVar
 
 from loguru import logger
 
+from src.common.metrics import RETRY_ATTEMPTS
+
+T = TypeVar("T")
+
+
+class RetryBudget:
+    """Process-wide cap of extra calls, retries or hedges, to a share of recent calls.
+
+    Over the last `window_secs` seconds extra calls may reach `ratio` of calls plus
+    `min_per_sec` per second, so a failing dependency gets at most `1 + ratio` times
+    its normal load instead of `1 + retries` times.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.1,
+        min_per_sec: float = 1.0,
+        window_secs: float = 10,
+        buckets: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ratio = ratio
+        self.min_retries = min_per_sec * window_secs
+        self.bucket_secs = window_secs / buckets
+        self._clock = clock
+        self._epochs = [-1] * buckets
+        self._calls = [0] * buckets
+        self._retries = [0] * buckets
+
+    def record_call(self) -> None:
+        self._calls[self._bucket()] += 1
+
+    def try_spend(self) -> bool:
+        """Take a retry out of the budget, False when it is exhausted."""
+        calls, retries = self.totals()
+        if retries >= self.min_retries + self.ratio * calls:
+            return False
+        self._retries[self._bucket()] += 1
+        return True
+
+    def totals(self) -> tuple[int, int]:
+        """Calls and retries within the window."""
+        oldest = int(self._clock() / self.bucket_secs) - len(self._epochs)
+        calls = retries = 0
+        for index, epoch in enumerate(self._epochs):
+            if epoch > oldest:
+                calls += self._calls[index]
+                retries += self._retries[index]
+        return calls, retries
+
+    def _bucket(self) -> int:
+        epoch = int(self._clock() / self.bucket_secs)
+        index = epoch % len(self._epochs)
+        if self._epochs[index] != epoch:
+            self._epochs[index] = epoch
+            self._calls[index] = self._retries[index] = 0
+        return index
+
+
+@dataclass
+class RetryPolicy:
+    """When and how long to wait before calling again.
+
+    :param retries: attempts after the first one
+    :param backoff_factor: cap of the first delay, doubled on every retry up to `max_backoff`;
+        the actual delay is uniformly random below the cap ("full jitter")
+    :param deadline: seconds since the first attempt after which no retry is started
+    :param retriable_exceptions: errors worth another attempt
+    :param non_retriable_exceptions: subclasses of retriable errors raised at once,
+        e.g. a malformed query fails the same way every time
+    :param budget: shared budget every retry is taken from
+    """
+
+    retries: int = 3
+    backoff_factor: float = 0.05
+    max_backoff: float = 1.0
+    deadline: float | None = 5.0
+    retriable_exceptions: tuple[type[BaseException], ...] = (Exception,)
+    non_retriable_exceptions: tuple[type[BaseException], ...] = ()
+    budget: RetryBudget | None = None
+
+    def is_retriable(self, error: BaseException) -> bool:
+        return isinstance(error, self.retriable_exceptions) and not isinstance(
+            error, self.non_retriable_exceptions
+        )
+
+    def backoff(self, attempt: int) -> float:
+        cap = min(self.max_backoff, self.backoff_factor * 2**attempt)
+        return random.uniform(0, cap)  # noqa: S311
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """Call `func`, retrying its retriable errors; the last error is raised on give up."""
+        name = func.__qualname__
+        start = time.monotonic()
+        if self.budget is not None:
+            self.budget.record_call()
+        attempt = 0
+        while True:
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as error:
+                if not self.is_retriable(error):
+                    raise
+                RETRY_ATTEMPTS.inc(name, "failed")
+                delay = self.backoff(attempt)
+                outcome = self._give_up(attempt, time.monotonic() - start + delay)
+                if outcome is not None:
+                    RETRY_ATTEMPTS.inc(name, outcome)
+                    logger.warning(f"[{name}] Attempt {attempt + 1} failed: {error}. {outcome}")
+                    raise
+                logger.warning(
+                    f"[{name}] Attempt {attempt + 1} failed: {error}. Retrying in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            if attempt:
+                RETRY_ATTEMPTS.inc(name, "recovered")
+            return result
+
+    def _give_up(self, attempt: int, elapsed: float) -> str | None:
+        """Reason not to retry after the failed `attempt`, None to retry."""
+        if attempt >= self.retries:
+            return "exhausted"
+        if self.deadline is not None and elapsed >= self.deadline:
+            return "deadline"
+        if self.budget is not None and not self.budget.try_spend():
+            return "budget"
+        return None
+
+
+def retry_async(policy: RetryPolicy | None = None, **options: Any) -> Callable:
+    """Retry the decorated coroutine function with `policy` or a policy made of `options`."""
+    policy = policy or RetryPolicy(**options)
 
-def retry_async(
-    retries: int = 5,
-    backoff_factor: float = 0.5,
-    retriable_exceptions: tuple = (Exception,),
-) -> Callable:
     def decorator(func: Coroutine) -> Coroutine:
         @wraps(func)
         async def wrapper(*args: tuple, **kwargs: dict) -> Any:
-            attempt = 0
-            while attempt <= retries:
-                try:
-                    return await func(*args, **kwargs)
-                except retriable_exceptions as e:
-                    delay = backoff_factor * (2**attempt)
-                    logger.warning(
-                        f"[{func.__name__}] Attempt {attempt+1} failed: {e}. Retrying in {delay:.2f}s"
-                    )
-                    await asyncio.sleep(delay)
-                    attempt += 1
-            raise Exception(f"[{func.__name__}] Max retry attempts exceeded")
+            return await policy.call(func, *args, **kwargs)
 
         return wrapper
 
@@ -1,3 +1,3 @@
 from .elastic import ElasticDatabase
 from .elastic_search_engine import ElasticSearchEngine
-from .interfaces import ISearchEngine
+from .interfaces import ISearchEngine, SearchPage
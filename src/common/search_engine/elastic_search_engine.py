@@ -1,56 +1,210 @@
-from collections.abc import Sequence
+import dataclasses
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from functools import wraps
 from typing import Any
 
 from loguru import logger
 
 from src.common.circuit_breaker import AsyncCircuitBreaker, circuit_breaker
-from src.common.exceptions import DocumentNotFoundError, ElasticsearchDriverError
-from src.common.retry import retry_async
+from src.common.concurrency import AdaptiveConcurrencyLimiter, concurrency_limit
+from src.common.exceptions import (
+    DocumentNotFoundError,
+    ElasticsearchDriverError,
+    QuerySyntaxError,
+)
+from src.common.hedging import HedgePolicy
+from src.common.metrics import SEARCH_ENGINE_LATENCY
+from src.common.retry import RetryPolicy
 from src.common.search_engine.elastic import (
     ElasticDatabase,
     async_bulk_index,
     handle_es_exceptions,
 )
-from src.common.search_engine.interfaces import ISearchEngine
+from src.common.search_engine.interfaces import ISearchEngine, SearchPage
+
+
+def observe_latency(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Record duration of search engine call by operation and index, retries included."""
+
+    @wraps(func)
+    async def wrapper(self: "ElasticSearchEngine", callable: Callable, **params: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await func(self, callable, **params)
+        finally:
+            SEARCH_ENGINE_LATENCY.observe(
+                time.perf_counter() - start,
+                getattr(callable, "__name__", "unknown"),
+                str(params.get("index", "")),
+            )
+
+    return wrapper
 
 
 class ElasticSearchEngine(ISearchEngine):
-    def __init__(self, client: ElasticDatabase) -> None:
+    # a malformed query fails the same way on every attempt and says nothing of cluster health
+    failure_exceptions = (ElasticsearchDriverError,)
+    client_exceptions = (QuerySyntaxError,)
+
+    def __init__(
+        self,
+        client: ElasticDatabase,
+        breaker: AsyncCircuitBreaker | None = None,
+        retry_policy: RetryPolicy | None = None,
+        hedging: HedgePolicy | None = None,
+        limiter: AdaptiveConcurrencyLimiter | None = None,
+    ) -> None:
         self._client = client
-        self._cb = AsyncCircuitBreaker(max_failures=2)
+        self._cb = breaker or AsyncCircuitBreaker(name="elasticsearch")
+        self._retry = dataclasses.replace(
+            retry_policy or RetryPolicy(),
+            retriable_exceptions=self.failure_exceptions,
+            non_retriable_exceptions=self.client_exceptions,
+        )
+        self._hedging = hedging
+        self._limiter = limiter
+
+    @property
+    def breaker(self) -> AsyncCircuitBreaker:
+        return self._cb
+
+    @property
+    def limiter(self) -> AdaptiveConcurrencyLimiter | None:
+        return self._limiter
 
     async def index_document(self, index: str, doc_id: str | None, document: dict) -> Any:
         return await self.call_with_params(
             self._client.index, index=index, id=doc_id, document=document
         )
 
-    async def get_document(self, index: str, doc_id: str) -> dict | None:
+    async def get_document(
+        self, index: str, doc_id: str, source_includes: Sequence[str] | None = None
+    ) -> dict | None:
         try:
-            doc = await self.call_with_params(self._client.get, index=index, id=doc_id)
+            doc = await self._hedged_call(
+                "get", self._client.get, index=index, id=doc_id, **_source_params(source_includes)
+            )
             return doc["_source"]
         except DocumentNotFoundError as error:
             logger.info(error)
         return None
 
+    async def get_documents(
+        self, index: str, doc_ids: Sequence[str], source_includes: Sequence[str] | None = None
+    ) -> dict[str, dict]:
+        if not doc_ids:
+            return {}
+        result = await self.call_with_params(
+            self._client.mget, index=index, ids=list(doc_ids), **_source_params(source_includes)
+        )
+        return {doc["_id"]: doc["_source"] for doc in result["docs"] if doc.get("found")}
+
     async def search(self, index: str, params: dict) -> list[dict]:
         """Search for documents in the specified index using the provided query."""
-        if not params.get("query"):
-            params["query"] = {"match_all": {}}
-        results = await self.call_with_params(self._client.search, index=index, **params)
+        results = await self._search(index, params, hedged=True)
         return [obj["_source"] for obj in results["hits"]["hits"]]
 
+    async def search_page(self, index: str, params: dict) -> SearchPage:
+        """Search for a page of documents, along with cursor of the next page.
+
+        When params contain 'pit' without 'id', a point in time is opened first.
+        """
+        return await self._search_page(index, params, hedged=True)
+
+    async def _search_page(self, index: str, params: dict, hedged: bool = False) -> SearchPage:
+        pit = params.get("pit")
+        if pit is not None and "id" not in pit:
+            opened = await self.call_with_params(
+                self._client.open_point_in_time, index=index, keep_alive=pit["keep_alive"]
+            )
+            params = {**params, "pit": {**pit, "id": opened["id"]}}
+        results = await self._search(index, params, hedged=hedged)
+        hits = results["hits"]["hits"]
+        return SearchPage(
+            documents=[obj["_source"] for obj in hits],
+            sort=hits[-1].get("sort") if hits else None,
+            pit_id=results.get("pit_id"),
+        )
+
+    async def iter_search(
+        self, index: str, params: dict, batch_size: int = 500
+    ) -> AsyncIterator[list[dict]]:
+        """Iterate over all documents matching the query in batches.
+
+        Only one batch is held in memory at a time, pages are read with search_after,
+        so the query must be sorted by a total order (e.g. with an 'id' tiebreaker).
+        """
+        if not params.get("sort"):
+            raise ValueError("Sorted query is required to iterate over search results")
+        params = {key: value for key, value in params.items() if key != "from"}
+        params["size"] = batch_size
+        while True:
+            # a stream reads every page anyway, hedges would only double its load
+            page = await self._search_page(index, params)
+            if page.documents:
+                yield page.documents
+            if len(page.documents) < batch_size or page.sort is None:
+                return
+            params["search_after"] = page.sort
+            if page.pit_id:
+                params["pit"] = {**params["pit"], "id": page.pit_id}
+
+    async def _search(self, index: str, params: dict, hedged: bool = False) -> Any:
+        if not params.get("query"):
+            params = {**params, "query": {"match_all": {}}}
+        if "pit" in params:
+            # search over point in time must not target an index
+            return await self.call_with_params(self._client.search, **params)
+        if hedged:
+            return await self._hedged_call("search", self._client.search, index=index, **params)
+        return await self.call_with_params(self._client.search, index=index, **params)
+
+    async def _hedged_call(self, operation: str, callable, **params: Any) -> Any:
+        """Call with parameters, hedged by a second call when the first one is slow."""
+        if self._hedging is None:
+            return await self.call_with_params(callable, **params)
+        hedge_params = params
+        if self._hedging.preference and "preference" not in params:
+            hedge_params = {**params, "preference": self._hedging.preference}
+        return await self._hedging.call(
+            operation,
+            lambda: self.call_with_params(callable, **params),
+            lambda: self.call_with_params(callable, **hedge_params),
+        )
+
     async def delete_document(self, index: str, doc_id: str) -> Any:
         return await self.call_with_params(self._client.delete, index=index, id=doc_id)
 
     async def bulk_index(self, actions: list[dict]) -> Any:
         return await self.call_with_params(async_bulk_index, client=self._client, actions=actions)
 
-    @circuit_breaker(lambda self: self._cb, recorded_exceptions=(ElasticsearchDriverError,))
-    @retry_async(retriable_exceptions=(ElasticsearchDriverError,))
-    @handle_es_exceptions
+    @observe_latency
+    @circuit_breaker(
+        lambda self: self._cb,
+        recorded_exceptions=failure_exceptions,
+        ignored_exceptions=client_exceptions,
+    )
     async def call_with_params(self, callable, **params: dict) -> Any:
         """Call a function with parameters."""
+        return await self._retry.call(self._call_once, callable, **params)
+
+    # the limiter sees single attempts, so backoff sleeps neither hold a slot nor inflate latency
+    @concurrency_limit(
+        lambda self: self._limiter,
+        recorded_exceptions=failure_exceptions,
+        ignored_exceptions=client_exceptions,
+        operation_getter=lambda callable, **_: getattr(callable, "__name__", "unknown"),
+    )
+    @handle_es_exceptions
+    async def _call_once(self, callable, **params: dict) -> Any:
         return await callable(**params)
 
     async def close(self) -> None:
         await self._client.close()
+
+
+def _source_params(source_includes: Sequence[str] | None) -> dict[str, Any]:
+    if source_includes is None:
+        return {}
+    return {"source_includes": list(source_includes)}
@@ -1,9 +1,48 @@
 import abc
+import base64
+import binascii
 from collections.abc import Sequence
 from typing import Any, Literal, NamedTuple
 
+import orjson
 from pydantic import BaseModel
 
+from src.common.exceptions import ValidationServiceError
+
+
+class QueryBuilder:
+    """Collects clauses contributed by filters and emits the final query in one pass.
+
+    Filters append to plain lists instead of rebuilding nested dicts of the query,
+    the 'query.bool' structure is assembled only once in `build`.
+    """
+
+    def __init__(self, query: dict[str, Any] | None = None) -> None:
+        self.fields: dict[str, Any] = dict(query or {})
+        self.bool: dict[str, Any] = {}
+        self._has_query = "query" in self.fields
+        base_query = self.fields.pop("query", None)
+        if base_query and set(base_query) == {"bool"}:
+            self.bool = dict(base_query["bool"])
+        elif base_query:
+            self.bool = {"must": [base_query]}
+        self.must: list[dict[str, Any]] = list(self.bool.pop("must", []))
+        self.must_not: list[dict[str, Any]] = list(self.bool.pop("must_not", []))
+        self.sort: list[dict[str, Any]] = list(self.fields.pop("sort", []))
+
+    def build(self) -> dict[str, Any]:
+        query = dict(self.fields)
+        bool_query = dict(self.bool)
+        if self.must:
+            bool_query["must"] = self.must
+        if self.must_not:
+            bool_query["must_not"] = self.must_not
+        if bool_query or self._has_query:
+            query["query"] = {"bool": bool_query}
+        if self.sort:
+            query["sort"] = self.sort
+        return query
+
 
 class BaseFilter(abc.ABC):
     def __init__(
@@ -14,91 +53,67 @@ class BaseFilter(abc.ABC):
         self.field_name = field_name
 
     @abc.abstractmethod
-    def filter(self, query: dict[str, Any], value: Any, params: dict[str, Any]) -> dict[str, Any]:
+    def apply(self, builder: QueryBuilder, value: Any, params: dict[str, Any]) -> None:
+        """Contribute clauses for the value to the query builder."""
         ...
 
+    def filter(self, query: dict[str, Any], value: Any, params: dict[str, Any]) -> dict[str, Any]:
+        """Apply filter to a single query.
+
+        :param query: query object
+        :param value: value of the filter
+        :param params: all filtration parameters
+
+        :returns: query after the filter has been applied
+        """
+        builder = QueryBuilder(query)
+        self.apply(builder, value, params)
+        return builder.build()
+
 
 class Filter(BaseFilter):
-    def filter(
-        self,
-        query: dict[str, Any],
-        value: Any,
-        _: dict[str, Any],
-    ) -> dict[str, Any]:
+    def apply(self, builder: QueryBuilder, value: Any, _: dict[str, Any]) -> None:
         """Apply filtering by 'must'.
-        :param query: query object
+        :param builder: query builder
         :param value: value for field to have in filtered out objects
-
-        :returns: query after the provided filtering has been applied
         """
-        must_clauses = query.get("query", {}).get("bool", {}).get("must", [])
-        must_clauses.append({"term": {self.field_name: value}})
-        query["query"] = query.get("query", {})
-        query["query"]["bool"] = query["query"].get("bool", {})
-        query["query"]["bool"]["must"] = must_clauses
-        return query
+        builder.must.append({"term": {self.field_name: value}})
 
 
 class InFilter(BaseFilter):
-    def filter(
-        self,
-        query: dict[str, Any],
-        value: Sequence[str],
-        _: dict[str, Any],
-    ) -> dict[str, Any]:
+    def apply(self, builder: QueryBuilder, value: Sequence[str], _: dict[str, Any]) -> None:
         """Apply filtering by 'terms'.
 
-        :param query: query object
+        :param builder: query builder
         :param value: sequence of values for field to have in filtered out objects
-
-        :returns: query after the provided filtering has been applied
         """
-        must_clauses = query.get("query", {}).get("bool", {}).get("must", [])
-        must_clauses.append({"terms": {self.field_name: value}})
-        query["query"] = query.get("query", {})
-        query["query"]["bool"] = query["query"].get("bool", {})
-        query["query"]["bool"]["must"] = must_clauses
-        return query
+        builder.must.append({"terms": {self.field_name: value}})
 
 
 class NotInFilter(BaseFilter):
-    def filter(
-        self,
-        query: dict[str, Any],
-        value: Sequence[str],
-        _: dict[str, Any],
-    ) -> dict[str, Any]:
+    def apply(self, builder: QueryBuilder, value: Sequence[str], _: dict[str, Any]) -> None:
         """Apply exclusion filtering by 'terms'.
 
-        :param query: query object
+        :param builder: query builder
         :param value: sequence of values for field to not have in filtered out objects
-
-        :returns: query after the provided filtering has been applied
         """
-        must_not_clauses = query.get("query", {}).get("bool", {}).get("must_not", [])
-        must_not_clauses.append({"terms": {self.field_name: value}})
-        query["query"] = query.get("query", {})
-        query["query"]["bool"] = query["query"].get("bool", {})
-        query["query"]["bool"]["must_not"] = must_not_clauses
-        return query
+        builder.must_not.append({"terms": {self.field_name: value}})
 
 
 class RangeFilter(BaseFilter):
-    def filter(
+    def apply(
         self,
-        query: dict[str, Any],
+        builder: QueryBuilder,
         value: tuple[Any, Any] | None,
         _: dict[str, Any],
-    ) -> dict[str, Any]:
+    ) -> None:
         """Apply filtering by 'range'.
 
-        :param query: query object
+        :param builder: query builder
         :param value: tuple of lower and upper bounds for inclusive range
-
-        :returns: query after the provided range has been applied
         """
         if not value:
-            return query
+            return
         left_value, right_value = value
 
         filters = {}
@@ -107,34 +122,17 @@ class RangeFilter(BaseFilter):
         if right_value is not None:
             filters.update({"lte": right_value})
         if filters:
-            must_clauses = query.get("query", {}).get("bool", {}).get("must", [])
-            must_clauses.append({"range": {self.field_name: filters}})
-            query["query"] = query.get("query", {})
-            query["query"]["bool"] = query["query"].get("bool", {})
-            query["query"]["bool"]["must"] = must_clauses
-        return query
+            builder.must.append({"range": {self.field_name: filters}})
 
 
 class SearchFilter(BaseFilter):
-    def filter(
-        self,
-        query: dict[str, Any],
-        value: Any,
-        _: dict[str, Any],
-    ) -> dict[str, Any]:
+    def apply(self, builder: QueryBuilder, value: Any, _: dict[str, Any]) -> None:
         """Apply filtering by 'match'.
 
-        :param query: query object
+        :param builder: query builder
         :param value: pattern to be searched for with 'match' query
-
-        :returns: query after the provided search pattern has been applied
         """
-        must_clauses = query.get("query", {}).get("bool", {}).get("must", [])
-        must_clauses.append({"match": {self.field_name: value}})
-        query["query"] = query.get("query", {})
-        query["query"]["bool"] = query["query"].get("bool", {})
-        query["query"]["bool"]["must"] = must_clauses
-        return query
+        builder.must.append({"match": {self.field_name: value}})
 
 
 class OrderingField(NamedTuple):
@@ -157,28 +155,18 @@ class OrderingFilter(BaseFilter):
         super().__init__(field_name=field_name)
         self.fields: dict[str, OrderingField] = fields
 
-    def filter(
-        self, query: dict[str, Any], value: Sequence[str], params: dict[str, Any]
-    ) -> dict[str, Any]:
+    def apply(self, builder: QueryBuilder, value: Sequence[str], params: dict[str, Any]) -> None:
         """Apply ordering to a query instance.
 
-        :param query: query for ordering
+        :param builder: query builder
         :param value:
             A sequence of strings, where each one specify
             which ordering field from available `self.fields` should be applied
             Also specify ordering direction
-
-        :returns: query after the provided ordering has been applied
         """
         if not value:
-            return query
-
-        ordering_fields = self._get_actual_fields(value)
-        if ordering_fields:
-            sort = query.get("sort", [])
-            sort.extend(ordering_fields)
-            query["sort"] = sort
-        return query
+            return
+        builder.sort.extend(self._get_actual_fields(value))
 
     def _get_actual_fields(self, value: Sequence[str]) -> list[dict]:
         """Get ES fields from provided ordering fields.
@@ -202,25 +190,93 @@ class OrderingFilter(BaseFilter):
 
 
 class LimitOffsetFilter(BaseFilter):
-    def filter(
+    def apply(
         self,
-        query: dict[str, Any],
+        builder: QueryBuilder,
         value: tuple[int | None, int | None] | None,
         _: dict[str, Any],
-    ) -> dict[str, Any]:
+    ) -> None:
         """Apply limit offset pagination to a query instance.
 
-        :param query: query for pagination
+        :param builder: query builder
         :param value: A tuple of positive integers (limit, offset)
-
-        :returns: query after the provided pagination has been applied
         """
         if not value:
-            return query
+            return
 
         offset, limit = value
         if limit:
-            query["size"] = limit
+            builder.fields["size"] = limit
         if offset:
-            query["from"] = offset
-        return query
+            builder.fields["from"] = offset
+
+
+class Cursor(NamedTuple):
+    search_after: list[Any]
+    pit_id: str | None = None
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """Pack cursor into an opaque url-safe token."""
+    payload = {"s": cursor.search_after}
+    if cursor.pit_id:
+        payload["p"] = cursor.pit_id
+    return base64.urlsafe_b64encode(orjson.dumps(payload)).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Unpack cursor from token made by `encode_cursor`."""
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return Cursor(search_after=list(payload["s"]), pit_id=payload.get("p"))
+    except (binascii.Error, orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise ValidationServiceError("Invalid pagination cursor")
+
+
+class CursorPaginationFilter(BaseFilter):
+    def __init__(
+        self,
+        field_name: Any | None = None,
+        cursor_param: str = "cursor",
+        tiebreaker: str = "id",
+        pit_keep_alive: str | None = None,
+    ) -> None:
+        """Init.
+        :param cursor_param: name of parameter holding cursor of the next page
+        :param tiebreaker: unique field appended to sort to make it total
+        :param pit_keep_alive: when set, pages are read from a point in time kept alive so long,
+            e.g. "1m", giving a consistent view of the index across pages
+
+        Must be declared after ordering filter, so that sort keys are applied first.
+        """
+        super().__init__(field_name=field_name)
+        self.cursor_param = cursor_param
+        self.tiebreaker = tiebreaker
+        self.pit_keep_alive = pit_keep_alive
+
+    def apply(self, builder: QueryBuilder, value: int, params: dict[str, Any]) -> None:
+        """Apply cursor (search_after) pagination to a query instance.
+
+        Page N costs the same as the first page, unlike 'from'/'size' pagination.
+
+        :param builder: query builder
+        :param value: page size
+        :param params: all parameters, cursor of the next page is taken from them
+        """
+        if not value:
+            return
+
+        builder.fields["size"] = value
+        builder.fields.pop("from", None)
+        if not any(self.tiebreaker in clause for clause in builder.sort):
+            builder.sort.append({self.tiebreaker: {"order": "asc"}})
+
+        token = params.get(self.cursor_param)
+        cursor = decode_cursor(token) if token else None
+        if cursor:
+            builder.fields["search_after"] = cursor.search_after
+        if self.pit_keep_alive:
+            pit = {"keep_alive": self.pit_keep_alive}
+            if cursor and cursor.pit_id:
+                pit["id"] = cursor.pit_id
+            builder.fields["pit"] = pit
@@ -1,10 +1,68 @@
 import abc
 import copy
 from collections import OrderedDict
-from types import MappingProxyType
+from collections.abc import Hashable, Mapping
 from typing import Any
 
-from .filter_fields import BaseFilter, Filter, OrderingField, OrderingFilter
+import orjson
+
+from .filter_fields import BaseFilter, Filter, OrderingField, OrderingFilter, QueryBuilder
+
+
+class QueryPlan:
+    """Declared filters of a filter set compiled once into a reusable query builder.
+
+    Filters are applied in order of declaration in a single pass, and built queries
+    are memoized for identical normalized parameter sets.
+    """
+
+    def __init__(self, filters: Mapping[str, BaseFilter], memo_size: int = 256) -> None:
+        self.steps: tuple[tuple[str, BaseFilter], ...] = tuple(filters.items())
+        self.memo_size = memo_size
+        self._memo: OrderedDict[Hashable, dict[str, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def build(
+        self,
+        params: Mapping[str, Any],
+        base_query: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """Build filtration query.
+
+        Every call returns a fresh query, callers may mutate it freely.
+        Queries with a base query are not memoized.
+        """
+        key = self._memo_key(params) if base_query is None else None
+        if key is not None and key in self._memo:
+            self._memo.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(self._memo[key])
+        self.misses += 1
+
+        builder = QueryBuilder(base_query)
+        for name, filter_ in self.steps:
+            if name in params:
+                filter_.apply(builder, params[name], params)
+        query = builder.build()
+
+        if key is not None:
+            self._memo[key] = copy.deepcopy(query)
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return query
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._memo), "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _memo_key(params: Mapping[str, Any]) -> Hashable | None:
+        # orjson with sorted keys is several times cheaper than building the query itself
+        try:
+            return orjson.dumps(params, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            return None
 
 
 class FilterSetMeta(abc.ABCMeta):
@@ -15,6 +73,7 @@ class FilterSetMeta(abc.ABCMeta):
         attrs: dict[str, Any],
     ) -> "FilterSetMeta":
         attrs["_declared_filters"] = mcs.get_declared_filters(bases, attrs)
+        attrs["_query_plan"] = QueryPlan(attrs["_declared_filters"])
         new_class = super().__new__(mcs, name, bases, attrs)
         return new_class
 
@@ -39,6 +98,7 @@ class FilterSetMeta(abc.ABCMeta):
 
 class BaseFilterSet(metaclass=FilterSetMeta):
     _declared_filters: dict[str, BaseFilter]
+    _query_plan: QueryPlan
 
     def __init__(
         self,
@@ -46,8 +106,6 @@ class BaseFilterSet(metaclass=FilterSetMeta):
     ):
         self.__base_query = query or {}
         self.filters = self.get_filters()
-        for filter_ in self.filters.values():
-            filter_.filter_set = self
 
     def get_base_query(self) -> dict[str, Any]:
         return copy.copy(self.__base_query)
@@ -59,14 +117,18 @@ class BaseFilterSet(metaclass=FilterSetMeta):
         filters.update(cls._declared_filters)
         return filters
 
+    @classmethod
+    def build_query(cls, params: Mapping[str, Any]) -> dict[str, Any]:
+        """Build filtration query with the compiled plan, without instantiating the filter set."""
+        return cls._query_plan.build(params)
+
     def filter_query(self, params: dict[str, Any]) -> dict[str, Any]:
-        """Build filtration query."""
-        query = self.get_base_query()
-        for name, value in params.items():
-            if name not in self.filters:
-                continue
-            query = self.filters[name].filter(query, value, params)
-        return query
+        """Build filtration query on top of the base query of this filter set.
+
+        Filters are applied in order of declaration, so that filters depending on
+        results of others (e.g. cursor pagination on sort) are declared after them.
+        """
+        return self._query_plan.build(params, base_query=self.get_base_query())
 
 
 class AsyncFilterSet(BaseFilterSet):
@@ -1,17 +1,56 @@
 import abc
-from collections.abc import Sequence
-from typing import Any, TypeVar
+from collections.abc import AsyncIterator, Sequence
+from typing import Any, NamedTuple, TypeVar
 
 from pydantic import BaseModel
 
 
+class SearchPage(NamedTuple):
+    documents: list[dict[str, Any]]
+    sort: list[Any] | None = None
+    pit_id: str | None = None
+
+
 class ISearchEngine(abc.ABC):
     @abc.abstractmethod
     async def search(self, index: str, query: dict[str, Any]) -> list[dict[str, Any]]:
-        """Search for documents in the specified index using the provided query."""
+        """Search for documents in the specified index using the provided query.
+
+        Query may contain `source_includes` to fetch only these fields of documents.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def search_page(self, index: str, params: dict[str, Any]) -> SearchPage:
+        """Search for a page of documents, along with sort values of its last document.
+
+        Sort values and point in time ID serve as cursor of the next page.
+        """
+        ...
+
+    @abc.abstractmethod
+    def iter_search(
+        self, index: str, params: dict[str, Any], batch_size: int = 500
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """Iterate over all documents matching the query in batches of `batch_size`.
+
+        Query must be sorted by a total order, pages are read with search_after.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def get_document(
+        self, index: str, doc_id: str, source_includes: Sequence[str] | None = None
+    ) -> dict | None:
+        """Get a document by its ID from the specified index.
+
+        When `source_includes` is given, only these fields of the document are fetched.
+        """
         ...
 
     @abc.abstractmethod
-    async def get_document(self, index: str, doc_id: str) -> dict | None:
-        """Get a document by its ID from the specified index."""
+    async def get_documents(
+        self, index: str, doc_ids: Sequence[str], source_includes: Sequence[str] | None = None
+    ) -> dict[str, dict]:
+        """Get several documents by their IDs in one request, mapped by ID. Missing are omitted."""
         ...
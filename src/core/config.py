@@ -23,6 +23,17 @@ class AppSettings(EnvBaseSettings):
         env_prefix = "app_"
 
 
+class ApiSettings(EnvBaseSettings):
+    batch_max_ids: int = 100
+    page_size_max: int = 1000
+    stream_batch_size: int = 500
+    list_cache_namespace: str = "v1"
+    list_cache_soft_ttl: int = 60 * 60
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "api_"
+
+
 class RedisSettings(EnvBaseSettings):
     scheme: str = "redis"
     user: str = ""
@@ -50,6 +61,90 @@ class RedisSettings(EnvBaseSettings):
         )
 
 
+class LocalCacheSettings(EnvBaseSettings):
+    enabled: bool = True
+    max_entries: int = 2048
+    ttl: int = 30
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "local_cache_"
+
+
+class CacheSettings(EnvBaseSettings):
+    generation_refresh: float = 1.0
+    sweep_interval: int = 0
+    negative_ttl: int = 30
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "cache_"
+
+
+class WriteBehindSettings(EnvBaseSettings):
+    enabled: bool = True
+    flush_interval: float = 0.05
+    batch_size: int = 500
+    max_pending: int = 10_000
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "cache_write_behind_"
+
+
+class CompressionSettings(EnvBaseSettings):
+    enabled: bool = True
+    gzip_level: int = 6
+    brotli_quality: int = 5
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "cache_compression_"
+
+
+class WarmUpSettings(EnvBaseSettings):
+    enabled: bool = True
+    budget_secs: float = 10.0
+    concurrency: int = 2
+    batch_size: int = 500
+    # number of entities per index, None for all of them, 0 to skip the index
+    films: int | None = 1000
+    genres: int | None = None
+    persons: int | None = 0
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "warm_up_"
+
+
+class KnownIdsSettings(EnvBaseSettings):
+    enabled: bool = False
+    refresh_secs: int = 300
+    error_rate: float = 0.01
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "known_ids_"
+
+
+class MetricsSettings(EnvBaseSettings):
+    enabled: bool = True
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "metrics_"
+
+
+class ProfilerSettings(EnvBaseSettings):
+    enabled: bool = False
+    sample_rate: float = 0.01
+    interval: float = 0.005
+    max_stacks: int = 10_000
+    token: str = ""
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "profiler_"
+
+    @validator("sample_rate")
+    def validate_sample_rate(cls, v: float) -> float:
+        if not 0 <= v <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        return v
+
+
 class ElasticsearchDsn(AnyUrl):
     allowed_schemes = {"http", "https"}
     user_required = True
@@ -76,6 +171,67 @@ class ElasticsearchSettings(EnvBaseSettings):
         )
 
 
+class CircuitBreakerSettings(EnvBaseSettings):
+    failure_rate_threshold: float = 0.5
+    slow_call_rate_threshold: float = 0.8
+    slow_call_secs: float | None = 5.0
+    minimum_calls: int = 10
+    window_secs: float = 10
+    reset_timeout: float = 30
+    half_open_max_calls: int = 3
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "es_breaker_"
+
+
+class RetrySettings(EnvBaseSettings):
+    retries: int = 3
+    backoff_factor: float = 0.05
+    max_backoff: float = 1.0
+    deadline: float | None = 5.0
+    budget_ratio: float = 0.1
+    budget_min_per_sec: float = 1.0
+    budget_window_secs: float = 10
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "es_retry_"
+
+
+class HedgingSettings(EnvBaseSettings):
+    enabled: bool = False
+    percentile: float = 95
+    default_delay: float = 0.05
+    min_delay: float = 0.005
+    preference: str = "hedge"
+    budget_ratio: float = 0.05
+    budget_min_per_sec: float = 1.0
+    budget_window_secs: float = 10
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "es_hedge_"
+
+    @validator("percentile")
+    def validate_percentile(cls, v: float) -> float:
+        if not 0 < v <= 100:
+            raise ValueError("percentile must be between 0 and 100")
+        return v
+
+
+class ConcurrencyLimitSettings(EnvBaseSettings):
+    enabled: bool = True
+    initial_limit: int = 20
+    min_limit: int = 2
+    max_limit: int = 200
+    max_queue: int = 100
+    queue_timeout: float = 1.0
+    latency_tolerance: float = 2.0
+    backoff_ratio: float = 0.9
+    retry_after: int = 1
+
+    class Config(EnvBaseSettings.Config):
+        env_prefix = "es_concurrency_"
+
+
 class LoggingSettings(EnvBaseSettings):
     serializer: bool = False
     level: str = "INFO"
@@ -86,7 +242,20 @@ class LoggingSettings(EnvBaseSettings):
 
 class Settings(EnvBaseSettings):
     app: AppSettings = AppSettings()
+    api: ApiSettings = ApiSettings()
     base_dir: Path = BASE_DIR
     redis: RedisSettings = RedisSettings()
+    local_cache: LocalCacheSettings = LocalCacheSettings()
+    cache: CacheSettings = CacheSettings()
+    cache_write_behind: WriteBehindSettings = WriteBehindSettings()
+    cache_compression: CompressionSettings = CompressionSettings()
+    known_ids: KnownIdsSettings = KnownIdsSettings()
+    warm_up: WarmUpSettings = WarmUpSettings()
+    metrics: MetricsSettings = MetricsSettings()
+    profiler: ProfilerSettings = ProfilerSettings()
     es: ElasticsearchSettings = ElasticsearchSettings()
+    es_breaker: CircuitBreakerSettings = CircuitBreakerSettings()
+    es_retry: RetrySettings = RetrySettings()
+    es_hedge: HedgingSettings = HedgingSettings()
+    es_concurrency: ConcurrencyLimitSettings = ConcurrencyLimitSettings()
     logger: LoggingSettings = LoggingSettings()
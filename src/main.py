@@ -1,18 +1,28 @@
+import asyncio
 import logging
+from functools import partial
 
 import uvicorn
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse, ORJSONResponse
+from loguru import logger
 
+from src.api.metrics import router as metrics_router
+from src.api.profiler import router as profiler_router
 from src.api.v1.router import include_routers
 from src.common.exceptions import RepositoryError, ValidationServiceError
-from src.common.key_value_database import RedisDatabase
+from src.common.key_value_database import RedisDatabase, WriteBehindKeyValueDatabase
+from src.common.metrics import REGISTRY
+from src.common.profiler import ProfilerMiddleware
 from src.common.search_engine import ElasticDatabase
 from src.common.uvloop import activate_uvloop
 from src.core.logger import configure_logging
 from src.providers import key_value_database, search_engine
+from src.providers.profiler import get_profiler
 from src.providers.settings import app_settings
+from src.providers.warm_up import get_warm_up_targets
+from src.services.warm_up import warm_up_cache
 
 
 def create_app():
@@ -23,33 +33,85 @@ def create_app():
         default_response_class=ORJSONResponse,
     )
     application.include_router(include_routers())
+    if app_settings.metrics.enabled:
+        application.include_router(metrics_router)
+    if app_settings.profiler.enabled:
+        if not app_settings.profiler.token:
+            logger.warning("PROFILER_TOKEN is not set, profile can not be downloaded")
+        application.add_middleware(ProfilerMiddleware, profiler=get_profiler())
+        application.include_router(profiler_router, prefix="/debug", include_in_schema=False)
+    application.add_event_handler("startup", partial(startup, application))
+    application.add_event_handler("shutdown", partial(shutdown, application))
+    application.add_exception_handler(ValidationServiceError, unicorn_exception_handler)
+    application.add_exception_handler(RepositoryError, repository_exception_handler)
     configure_logging(app_settings.logger.dict())
     return application
 
 
-app = create_app()
-
-
-@app.on_event("startup")
-async def startup():
+async def startup(app: FastAPI):
     """Подключиться к базам при старте сервера."""
     activate_uvloop()
     key_value_database.redis_database = RedisDatabase.build(config=app_settings.redis.dict())
     search_engine.elastic = ElasticDatabase.build(config=app_settings.es.dict())
+    REGISTRY.register_collector(key_value_database.redis_database.collect_metrics)
+    # те же экземпляры провайдеры отдают сервисам в зависимостях
+    app.state.cache_db = key_value_database.get_key_value_database(
+        key_value_database.get_redis_database()
+    )
+    app.state.cache_generations = key_value_database.get_cache_generations(app.state.cache_db)
+    app.state.search_engine = search_engine.get_search_engine(search_engine.get_elastic_database())
+    app.state.known_ids = search_engine.get_known_ids(app.state.search_engine)
+    app.state.cache_sweeper = None
+    if app_settings.cache.sweep_interval:
+        app.state.cache_sweeper = asyncio.create_task(
+            app.state.cache_generations.sweep_forever(app_settings.cache.sweep_interval)
+        )
+    app.state.known_ids_refresher = None
+    if app.state.known_ids is not None:
+        app.state.known_ids_refresher = asyncio.create_task(app.state.known_ids.refresh_forever())
+    app.state.cache_warmer = None
+    if app_settings.warm_up.enabled:
+        app.state.cache_warmer = asyncio.create_task(
+            warm_up_cache(
+                get_warm_up_targets(
+                    app.state.cache_db,
+                    app.state.search_engine,
+                    app.state.cache_generations,
+                    app.state.known_ids,
+                ),
+                concurrency=app_settings.warm_up.concurrency,
+                batch_size=app_settings.warm_up.batch_size,
+            )
+        )
+        # прогрев не задерживает запуск дольше бюджета, остаток доделывается в фоне
+        await asyncio.wait({app.state.cache_warmer}, timeout=app_settings.warm_up.budget_secs)
 
 
-@app.on_event("shutdown")
-async def shutdown():
+async def shutdown(app: FastAPI):
     """Отключиться от баз при выключении сервера."""
+    if app.state.cache_sweeper is not None:
+        app.state.cache_sweeper.cancel()
+    if app.state.known_ids_refresher is not None:
+        app.state.known_ids_refresher.cancel()
+    if app.state.cache_warmer is not None:
+        app.state.cache_warmer.cancel()
+    if isinstance(app.state.cache_db, WriteBehindKeyValueDatabase):
+        await app.state.cache_db.close()
+    REGISTRY.unregister_collector(key_value_database.redis_database.collect_metrics)
     await key_value_database.redis_database.close()
     await search_engine.elastic.close()
 
 
-@app.exception_handler(ValidationServiceError)
 async def unicorn_exception_handler(request: Request, exc: ValidationServiceError) -> JSONResponse:
     return JSONResponse(status_code=exc.status, content={"message": exc.message})
 
 
-@app.exception_handler(RepositoryError)
 async def repository_exception_handler(request: Request, exc: RepositoryError) -> JSONResponse:
-    return JSONResponse(status_code=exc.status, content={"message": exc.message})
+    return JSONResponse(
+        status_code=exc.status,
+        content={"message": exc.message},
+        headers=getattr(exc, "headers", None),
+    )
+
+
+app = create_app()
@@ -3,6 +3,8 @@ import uuid
 import orjson
 from pydantic import BaseModel
 
+from src.common.coder import OrjsonCoder
+
 
 class BaseSchema(BaseModel):
     class Config:
@@ -11,4 +13,31 @@ class BaseSchema(BaseModel):
 
 
 class BaseOutSchema(BaseSchema):
+    """Схема ответа, построенная из сущности.
+
+    Сущности уже проверены при чтении из хранилища, поэтому `from_entity` строит схемы
+    через `construct`, без повторной валидации.
+    """
+
     id: int | uuid.UUID
+
+    @classmethod
+    def source_fields(cls) -> tuple[str, ...]:
+        """Поля документа, необходимые для построения схемы, в формате `_source` includes."""
+        return model_source_fields(cls)
+
+    @classmethod
+    def render(cls, entity: BaseModel) -> bytes:
+        """Тело ответа с сущностью, сериализованное схемой `from_entity`."""
+        return OrjsonCoder.encode(cls.from_entity(entity))
+
+
+def model_source_fields(schema: type[BaseModel], prefix: str = "") -> tuple[str, ...]:
+    fields: list[str] = []
+    for field in schema.__fields__.values():
+        path = f"{prefix}{field.alias}"
+        if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+            fields.extend(model_source_fields(field.type_, prefix=f"{path}."))
+        else:
+            fields.append(path)
+    return tuple(fields)
@@ -17,6 +17,8 @@ class FilmFilterSchema(BaseSchema):
     imdb_rating: tuple[float | None, float | None] | None = Field(default=None)
     pagination: tuple[int, int] | None = Field(default=None)
     order: list[str] | None = Field(default=None)
+    page_size: int | None = Field(default=None)
+    cursor: str | None = Field(default=None)
 
     @validator("id", "ids", "excluded_ids")
     def validate_uuids(cls, value):
@@ -33,9 +35,9 @@ class Film(BaseSchema):
     description: str = Field(description="Описание")
     imdb_rating: float = Field(description="Рейтинг")
     genres: str = Field(description="Жанры")
-    actors_names: str = Field(description="Имена актеров")
-    directors_names: str = Field(description="Имена режиссеров")
-    writers_names: str = Field(description="Имена сценаристов")
+    actors_names: str = Field(description="Имена актеров", default="")
+    directors_names: str = Field(description="Имена режиссеров", default="")
+    writers_names: str = Field(description="Имена сценаристов", default="")
     actors: list[Actor] = Field(description="Актеры")
     directors: list[Director] = Field(description="Режиссеры")
     writers: list[Writer] = Field(description="Сценаристы")
@@ -16,6 +16,8 @@ class GenreFilterSchema(BaseSchema):
     description: str | None = Field(default=None)
     pagination: tuple[int, int] | None = Field(default=None)
     order: list[str] | None = Field(default=None)
+    page_size: int | None = Field(default=None)
+    cursor: str | None = Field(default=None)
 
     @validator("id", "ids", "excluded_ids")
     def validate_uuids(cls, value):
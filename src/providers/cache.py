@@ -1,18 +1,35 @@
+import asyncio
 import hashlib
 from collections.abc import Callable
-from functools import wraps
+from functools import lru_cache, wraps
 from http import HTTPStatus
 from typing import Annotated, ParamSpec
 
-from fastapi import Depends, HTTPException, Response
+from fastapi import Depends, Header, HTTPException, Response
 from loguru import logger
 
-from src.common.coder import NoDecodeJsonCoder
+from src.common.coder import OrjsonCoder
+from src.common.compression import IDENTITY, Compressor
+from src.common.key_value_database.generations import CacheGenerations
 from src.common.key_value_database.interfaces import IKeyValueDatabase
-from src.providers.key_value_database import get_key_value_database
+from src.common.metrics import CACHE_REQUESTS
+from src.common.responses import (
+    compute_etag,
+    etag_matches,
+    json_bytes_response,
+    not_modified_response,
+)
+from src.providers.key_value_database import get_cache_generations, get_key_value_database
+from src.providers.settings import app_settings
 
 P = ParamSpec("P")
 
+CACHE_STATUS_HEADER = "X-Cache-Status"
+REVALIDATION_LOCK_EXPIRE_IN_SECONDS = 30
+
+_revalidating: set[str] = set()
+_background_tasks: set[asyncio.Task] = set()
+
 
 def build_key(
     func: Callable, namespace: str = "", args: tuple | None = None, kwargs: dict | None = None
@@ -31,41 +48,201 @@ def build_key(
     return cache_key
 
 
-def api_cache(ttl: int = 60 * 60 * 24, namespace: str = "") -> Callable:
+@lru_cache
+def get_compressor() -> Compressor | None:
+    """Compressor of cached responses, None when compression is disabled."""
+    settings = app_settings.cache_compression
+    if not settings.enabled:
+        return None
+    return Compressor(gzip_level=settings.gzip_level, brotli_quality=settings.brotli_quality)
+
+
+def etag_key(cache_key: str) -> str:
+    """Key of the entity tag stored next to the cached response."""
+    return f"{cache_key}:etag"
+
+
+def encoded_key(cache_key: str, encoding: str) -> str:
+    """Key of the cached response in the content coding."""
+    return cache_key if encoding == IDENTITY else f"{cache_key}:{encoding}"
+
+
+async def store_response(
+    cache_db: IKeyValueDatabase,
+    cache_key: str,
+    content: bytes,
+    ttl: int,
+    compressor: Compressor | None = None,
+) -> dict[str, tuple[bytes, str]]:
+    """Store response body, its compressed variants and their entity tags in one write.
+
+    :returns: body and entity tag by content coding
+    """
+    bodies = {IDENTITY: content, **(compressor.compress(content) if compressor else {})}
+    variants = {encoding: (body, compute_etag(body)) for encoding, body in bodies.items()}
+    values: dict[str, str | bytes] = {}
+    for encoding, (body, etag) in variants.items():
+        key = encoded_key(cache_key, encoding)
+        values[key] = body
+        values[etag_key(key)] = etag
+    await cache_db.set_many(values, expire=ttl)
+    return variants
+
+
+async def revalidate(
+    func: Callable,
+    cache_db: IKeyValueDatabase,
+    cache_key: str,
+    ttl: int,
+    compressor: Compressor | None,
+    *args: P.args,
+    **kwargs: P.kwargs,
+) -> None:
+    """Recompute cached response and overwrite it.
+
+    Only one revalidation per key runs at a time: in process it is guarded by a set
+    of keys being revalidated, across processes by a short-living lock key.
+    """
+    lock_key = f"{cache_key}:revalidate"
+    try:
+        if not await cache_db.set_if_not_exists(
+            lock_key, "1", expire=REVALIDATION_LOCK_EXPIRE_IN_SECONDS
+        ):
+            return
+        try:
+            result = await func(*args, **kwargs)
+            await store_response(cache_db, cache_key, OrjsonCoder.encode(result), ttl, compressor)
+            logger.debug("CACHE REVALIDATED! key: {}", cache_key)
+        finally:
+            await cache_db.delete(lock_key)
+    except Exception as error:
+        logger.warning("Failed to revalidate cache key {}: {}", cache_key, error)
+    finally:
+        _revalidating.discard(cache_key)
+
+
+def schedule_revalidation(
+    func: Callable,
+    cache_db: IKeyValueDatabase,
+    cache_key: str,
+    ttl: int,
+    compressor: Compressor | None,
+    *args: P.args,
+    **kwargs: P.kwargs,
+) -> None:
+    if cache_key in _revalidating:
+        return
+    _revalidating.add(cache_key)
+    task = asyncio.create_task(
+        revalidate(func, cache_db, cache_key, ttl, compressor, *args, **kwargs)
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def api_cache(
+    ttl: int = 60 * 60 * 24,
+    namespace: str = "",
+    soft_ttl: int | None = None,
+) -> Callable:
     """Caching decorator for FastAPI endpoints.
 
     ttl: Time to live for the cache in seconds.
     namespace: Namespace for cache keys in key value database.
+        Namespace is purged as a whole with `CacheGenerations.purge(namespace)`,
+        function name is used when namespace is empty.
+    soft_ttl: Enables stale-while-revalidate mode. Cached response older than `soft_ttl`
+        seconds is still returned, while a single background task recomputes it.
+        `ttl` stays the hard limit after which response is not served at all.
+
+    Response is serialized once with orjson, stored as bytes and sent as is,
+    both on cache miss and on cache hit.
+    Freshness of response is reported in `X-Cache-Status` header: HIT, STALE or MISS.
+
+    Strong `ETag` of the body is stored next to it and read along with the body, so
+    a hit is never hashed again. A request with matching `If-None-Match` is answered
+    `304 Not Modified` after reading only the tag.
+
+    Compressed variants of the body, with their own tags, are stored along with it
+    when the response is computed, and sent as is to clients accepting their coding.
     """
+    if soft_ttl is not None and not 0 <= soft_ttl < ttl:
+        raise ValueError("soft_ttl must be less than ttl")
 
     def decorator(func: Callable) -> Callable:
         async def wrapper(
             *args: P.args,
             cache_db: Annotated[IKeyValueDatabase, Depends(get_key_value_database)],
+            generations: Annotated[CacheGenerations, Depends(get_cache_generations)],
+            if_none_match: Annotated[str | None, Header()] = None,
+            accept_encoding: Annotated[str | None, Header()] = None,
+            compressor: Annotated[Compressor | None, Depends(get_compressor)] = None,
             **kwargs: P.kwargs,
         ) -> Callable:
             """Wrapper for caching decorator.
 
             cache_db: database dependency for request to be stored in
+            generations: generation counters of cache namespaces
+            if_none_match: entity tags the client already has
+            accept_encoding: content codings the client accepts
+            compressor: compressor of stored variants, None to store the body only
             """
-            coder = NoDecodeJsonCoder()
+            coder = OrjsonCoder()
+            cache_namespace = namespace or func.__name__
 
-            cache_key = build_key(func, namespace, args, kwargs)
-            _, result = await cache_db.get_with_ttl(key=cache_key)
+            cache_key = await generations.build_key(
+                cache_namespace, build_key(func, "", args, kwargs)
+            )
             headers = {"Cache-Control": f"max-age={ttl}"}
+            encoding = IDENTITY
+            if compressor is not None:
+                headers["Vary"] = "Accept-Encoding"
+                encoding = compressor.negotiate(accept_encoding)
+            if encoding != IDENTITY:
+                headers["Content-Encoding"] = encoding
+            key = encoded_key(cache_key, encoding)
+
+            def record_hit(remaining_ttl: int) -> None:
+                age = max(ttl - remaining_ttl, 0)
+                status = "HIT"
+                if soft_ttl is not None and age >= soft_ttl:
+                    logger.debug("CACHE STALE! key: {}", cache_key)
+                    status = "STALE"
+                    schedule_revalidation(
+                        func, cache_db, cache_key, ttl, compressor, *args, **kwargs
+                    )
+                else:
+                    logger.debug("CACHE HIT! key: {}", cache_key)
+                CACHE_REQUESTS.inc("api", cache_namespace, status.lower())
+                headers.update({CACHE_STATUS_HEADER: status, "Age": str(age)})
+
+            if if_none_match:
+                remaining_ttl, etag = await cache_db.get_with_ttl(key=etag_key(key))
+                if etag is not None and etag_matches(if_none_match, etag.decode()):
+                    record_hit(remaining_ttl)
+                    return not_modified_response(etag.decode(), headers)
+                remaining_ttl, result = await cache_db.get_with_ttl(key=key)
+            else:
+                (remaining_ttl, result), (_, etag) = await cache_db.get_many_with_ttl(
+                    [key, etag_key(key)]
+                )
             if result is not None:
-                logger.debug("CACHE HIT! key: {}", cache_key)
-                return Response(
-                    content=coder.decode(result),
-                    status_code=HTTPStatus.OK,
+                record_hit(remaining_ttl)
+                return json_bytes_response(
+                    coder.decode(result),
+                    if_none_match,
+                    etag=etag.decode() if etag else None,
                     headers=headers,
-                    media_type="application/json",
-                    background=None,
                 )
             logger.debug("CACHE MISS! key: {}", cache_key)
+            CACHE_REQUESTS.inc("api", cache_namespace, "miss")
             result = await func(*args, **kwargs)
-            await cache_db.set(key=cache_key, value=coder.encode(result), expire=ttl)
-            return result
+            variants = await store_response(
+                cache_db, cache_key, coder.encode(result), ttl, compressor
+            )
+            content, etag = variants[encoding]
+            headers[CACHE_STATUS_HEADER] = "MISS"
+            return json_bytes_response(content, if_none_match, etag=etag, headers=headers)
 
         import inspect
 
@@ -3,11 +3,16 @@ from typing import Annotated
 
 from fastapi import Depends
 
+from src.common.key_value_database.generations import CacheGenerations
 from src.common.key_value_database.interfaces import IKeyValueDatabase
+from src.common.key_value_database.local import LocalCache
 from src.common.key_value_database.redis_key_value_database import (
     RedisDatabase,
     RedisKeyValueDatabase,
 )
+from src.common.key_value_database.write_behind import WriteBehindKeyValueDatabase
+from src.providers.settings import app_settings
+from src.providers.singleton import singleton
 
 redis_database: RedisDatabase = None
 
@@ -17,8 +22,35 @@ def get_redis_database() -> RedisDatabase:
     return redis_database
 
 
-@lru_cache
+@singleton
 def get_key_value_database(
     redis: Annotated[RedisDatabase, Depends(get_redis_database)],
 ) -> IKeyValueDatabase:
-    return RedisKeyValueDatabase(redis=redis)
+    database = RedisKeyValueDatabase(redis=redis)
+    settings = app_settings.cache_write_behind
+    if not settings.enabled:
+        return database
+    return WriteBehindKeyValueDatabase(
+        database,
+        flush_interval=settings.flush_interval,
+        batch_size=settings.batch_size,
+        max_pending=settings.max_pending,
+    )
+
+
+@singleton
+def get_cache_generations(
+    key_value_database: Annotated[IKeyValueDatabase, Depends(get_key_value_database)],
+) -> CacheGenerations:
+    return CacheGenerations(key_value_database, refresh_secs=app_settings.cache.generation_refresh)
+
+
+@lru_cache
+def get_local_cache() -> LocalCache | None:
+    """In-process cache shared by all entity services of the worker."""
+    if not app_settings.local_cache.enabled:
+        return None
+    return LocalCache(
+        max_entries=app_settings.local_cache.max_entries,
+        ttl=app_settings.local_cache.ttl,
+    )
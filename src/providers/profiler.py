@@ -0,0 +1,13 @@
+from functools import lru_cache
+
+from src.common.profiler import SamplingProfiler
+from src.providers.settings import app_settings
+
+
+@lru_cache
+def get_profiler() -> SamplingProfiler:
+    return SamplingProfiler(
+        sample_rate=app_settings.profiler.sample_rate,
+        interval=app_settings.profiler.interval,
+        max_stacks=app_settings.profiler.max_stacks,
+    )
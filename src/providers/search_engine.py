@@ -3,10 +3,16 @@ from typing import Annotated
 
 from fastapi import Depends
 
+from src.common.bloom_filter import KnownIds
+from src.common.circuit_breaker import AsyncCircuitBreaker
+from src.common.concurrency import AdaptiveConcurrencyLimiter
+from src.common.hedging import HedgePolicy
+from src.common.retry import RetryBudget, RetryPolicy
 from src.common.search_engine import ElasticSearchEngine, ISearchEngine
 from src.common.search_engine.elastic import ElasticDatabase
 from src.core.config import Settings
-from src.providers.settings import get_settings
+from src.providers.settings import app_settings, get_settings
+from src.providers.singleton import singleton
 
 elastic: ElasticDatabase = None
 
@@ -17,7 +23,67 @@ def get_elastic_database() -> ElasticDatabase:
 
 
 @lru_cache
+def get_retry_budget() -> RetryBudget:
+    settings = app_settings.es_retry
+    return RetryBudget(
+        ratio=settings.budget_ratio,
+        min_per_sec=settings.budget_min_per_sec,
+        window_secs=settings.budget_window_secs,
+    )
+
+
+@lru_cache
+def get_hedge_policy() -> HedgePolicy | None:
+    settings = app_settings.es_hedge
+    if not settings.enabled:
+        return None
+    return HedgePolicy(
+        percentile=settings.percentile,
+        default_delay=settings.default_delay,
+        min_delay=settings.min_delay,
+        preference=settings.preference or None,
+        budget=RetryBudget(
+            ratio=settings.budget_ratio,
+            min_per_sec=settings.budget_min_per_sec,
+            window_secs=settings.budget_window_secs,
+        ),
+    )
+
+
+@lru_cache
+def get_concurrency_limiter() -> AdaptiveConcurrencyLimiter | None:
+    settings = app_settings.es_concurrency
+    if not settings.enabled:
+        return None
+    return AdaptiveConcurrencyLimiter(name="elasticsearch", **settings.dict(exclude={"enabled"}))
+
+
+@singleton
 def get_search_engine(
     es_database: Annotated[ElasticDatabase, Depends(get_elastic_database)],
 ) -> ISearchEngine:
-    return ElasticSearchEngine(client=es_database)
+    return ElasticSearchEngine(
+        client=es_database,
+        breaker=AsyncCircuitBreaker(name="elasticsearch", **app_settings.es_breaker.dict()),
+        retry_policy=RetryPolicy(
+            retries=app_settings.es_retry.retries,
+            backoff_factor=app_settings.es_retry.backoff_factor,
+            max_backoff=app_settings.es_retry.max_backoff,
+            deadline=app_settings.es_retry.deadline,
+            budget=get_retry_budget(),
+        ),
+        hedging=get_hedge_policy(),
+        limiter=get_concurrency_limiter(),
+    )
+
+
+@singleton
+def get_known_ids(
+    search_engine: Annotated[ISearchEngine, Depends(get_search_engine)],
+) -> KnownIds | None:
+    settings = app_settings.known_ids
+    if not settings.enabled:
+        return None
+    return KnownIds(
+        search_engine, refresh_secs=settings.refresh_secs, error_rate=settings.error_rate
+    )
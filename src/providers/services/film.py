@@ -1,18 +1,37 @@
-from functools import lru_cache
 from typing import Annotated
 
 from fastapi import Depends
 
-from src.common.key_value_database import IKeyValueDatabase
+from src.api.v1.schemas.film import FilmOutSchema
+from src.common.bloom_filter import KnownIds
+from src.common.key_value_database import CacheGenerations, IKeyValueDatabase, LocalCache
 from src.common.search_engine import ElasticSearchEngine, ISearchEngine
-from src.providers.key_value_database import get_key_value_database
-from src.providers.search_engine import get_search_engine
+from src.providers.key_value_database import (
+    get_cache_generations,
+    get_key_value_database,
+    get_local_cache,
+)
+from src.providers.search_engine import get_known_ids, get_search_engine
+from src.providers.settings import app_settings
+from src.providers.singleton import singleton
 from src.services.film import FilmService
 
 
-@lru_cache
+@singleton
 def get_film_service(
     key_value_database: Annotated[IKeyValueDatabase, Depends(get_key_value_database)],
     search_engine: Annotated[ISearchEngine, Depends(get_search_engine)],
+    local_cache: Annotated[LocalCache | None, Depends(get_local_cache)],
+    generations: Annotated[CacheGenerations, Depends(get_cache_generations)],
+    known_ids: Annotated[KnownIds | None, Depends(get_known_ids)],
 ) -> FilmService:
-    return FilmService(key_value_database, search_engine)
+    return FilmService(
+        key_value_database,
+        search_engine,
+        local_cache=local_cache,
+        generations=generations,
+        projection=FilmOutSchema.source_fields(),
+        negative_expire_secs=app_settings.cache.negative_ttl,
+        known_ids=known_ids,
+        renderer=FilmOutSchema.render,
+    )
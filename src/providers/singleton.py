@@ -0,0 +1,27 @@
+import inspect
+from collections.abc import Callable
+from functools import lru_cache, wraps
+from typing import ParamSpec, TypeVar
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+def singleton(provider: Callable[P, T]) -> Callable[P, T]:
+    """Cache instances built by the provider, like `lru_cache`.
+
+    Arguments are bound to the signature of the provider before the lookup, so FastAPI,
+    which passes dependencies by keyword, and startup code, which passes them
+    positionally, get the very same instance.
+    """
+    signature = inspect.signature(provider)
+    cached = lru_cache(provider)
+
+    @wraps(provider)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return cached(*bound.args)
+
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
@@ -0,0 +1,56 @@
+from src.common.bloom_filter import KnownIds
+from src.common.key_value_database import CacheGenerations, IKeyValueDatabase
+from src.common.search_engine import ISearchEngine
+from src.models.film import FilmFilterSchema
+from src.models.genre import GenreFilterSchema
+from src.models.person import PersonFilterSchema
+from src.providers.key_value_database import get_local_cache
+from src.providers.services.film import get_film_service
+from src.providers.services.genre import get_genre_service
+from src.providers.services.person import get_person_service
+from src.providers.settings import app_settings
+from src.services.warm_up import WarmUpTarget
+
+
+def get_warm_up_targets(
+    key_value_database: IKeyValueDatabase,
+    search_engine: ISearchEngine,
+    generations: CacheGenerations,
+    known_ids: KnownIds | None,
+) -> list[WarmUpTarget]:
+    """Entities to warm up cache with, as configured by `WARM_UP_*` settings.
+
+    Services are built from the instances requests get, so warmed entities land in the
+    same caches and search engine calls share its limiter and budgets.
+    """
+    local_cache = get_local_cache()
+    film_service = get_film_service(
+        key_value_database=key_value_database,
+        search_engine=search_engine,
+        local_cache=local_cache,
+        generations=generations,
+        known_ids=known_ids,
+    )
+    genre_service = get_genre_service(
+        key_value_database=key_value_database,
+        search_engine=search_engine,
+        local_cache=local_cache,
+        generations=generations,
+        known_ids=known_ids,
+    )
+    person_service = get_person_service(
+        key_value_database=key_value_database,
+        search_engine=search_engine,
+        local_cache=local_cache,
+        generations=generations,
+        known_ids=known_ids,
+    )
+    settings = app_settings.warm_up
+    targets = [
+        WarmUpTarget(
+            "films", film_service, FilmFilterSchema(order=["-imdb_rating"]), settings.films
+        ),
+        WarmUpTarget("genres", genre_service, GenreFilterSchema(), settings.genres),
+        WarmUpTarget("persons", person_service, PersonFilterSchema(), settings.persons),
+    ]
+    return [target for target in targets if target.limit != 0]
@@ -0,0 +1,63 @@
+"""Сбросить кэш: перевести пространства имен на новое поколение.
+
+Пространства имен - индексы сущностей и пространство ответов `api_cache`; по умолчанию
+сбрасываются все. Рабочие процессы замечают новое поколение не позже чем через
+`CACHE_GENERATION_REFRESH` секунд, ключи старых поколений удаляются по TTL, фоновой
+очисткой или сразу с флагом `--sweep`.
+
+Usage:
+    python -m src.purge_cache
+    python -m src.purge_cache movies v1 --sweep
+"""
+
+import argparse
+import asyncio
+import sys
+
+from loguru import logger
+
+from src.common.key_value_database import CacheGenerations, RedisDatabase, RedisKeyValueDatabase
+from src.core.logger import configure_logging
+from src.providers.settings import app_settings
+from src.services.film import FILM_INDEX
+from src.services.genre import GENRE_INDEX
+from src.services.person import PERSON_INDEX
+
+NAMESPACES = (FILM_INDEX, GENRE_INDEX, PERSON_INDEX, app_settings.api.list_cache_namespace)
+
+
+async def run(namespaces: list[str], sweep: bool = False) -> dict[str, int]:
+    """Сбросить пространства имен, при `sweep` сразу удалить ключи старых поколений.
+
+    :returns: новое поколение каждого пространства имен
+    """
+    redis = RedisDatabase.build(config=app_settings.redis.dict())
+    generations = CacheGenerations(RedisKeyValueDatabase(redis=redis))
+    try:
+        purged = {namespace: await generations.purge(namespace) for namespace in namespaces}
+        if sweep:
+            for namespace in namespaces:
+                count = await generations.sweep(namespace)
+                logger.info("Swept {} stale keys of namespace '{}'", count, namespace)
+        return purged
+    finally:
+        await redis.close()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("namespaces", nargs="*", default=list(NAMESPACES))
+    parser.add_argument("--sweep", action="store_true", help="delete stale keys right away")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    configure_logging(app_settings.logger.dict())
+    generations = asyncio.run(run(args.namespaces, args.sweep))
+    logger.info("Cache purged, generations: {}", generations)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,40 +1,98 @@
 import abc
+import hashlib
 import uuid
-from collections.abc import AsyncIterator, Sequence
+from collections.abc import AsyncIterator, Callable, Sequence
 from json import JSONDecodeError
-from typing import Generic, Protocol, TypeVar
+from typing import Any, Generic, NamedTuple, Protocol, TypeVar
 
 from loguru import logger
 from pydantic import BaseModel, ValidationError, parse_raw_as
 
+from src.common.bloom_filter import KnownIds
 from src.common.exceptions import ServiceError
-from src.common.key_value_database import IKeyValueDatabase
+from src.common.key_value_database import CacheGenerations, IKeyValueDatabase, LocalCache
+from src.common.metrics import CACHE_REQUESTS
+from src.common.responses import compute_etag
 from src.common.search_engine import ISearchEngine
+from src.common.search_engine.filter_fields import Cursor, encode_cursor
 from src.common.search_engine.filtersets import AsyncFilterSet
+from src.common.single_flight import SingleFlight
 
 T = TypeVar("T", bound=BaseModel)
 FilterSchema = TypeVar("FilterSchema", bound=BaseModel, contravariant=True)  # noqa: PLC0105
 
 
+CURSOR_PAGE_SIZE_PARAM = "page_size"
+
 ERROR_FAILED_TO_PARSE_CACHE_DATA = "Failed to parse Cache data for object_id: {object_id}"
 ERROR_FAILED_TO_WRITE_TO_CACHE = "Failed to write to Cache for object_id: {object_id}"
 
+# cached in place of an entity known to be absent from the search engine
+NOT_FOUND_MARKER = b"\x00"
+NOT_FOUND = object()
+
+
+def projection_fingerprint(projection: Sequence[str] | None) -> str | None:
+    """Short fingerprint of projection fields, folded into cache keys."""
+    if projection is None:
+        return None
+    digest = hashlib.blake2b(",".join(sorted(projection)).encode(), digest_size=4)
+    return digest.hexdigest()
+
+
+class Page(NamedTuple, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+
+
+class Detail(NamedTuple):
+    content: bytes
+    etag: str
+
 
 class IEntityService(abc.ABC, Generic[T, FilterSchema]):
     @abc.abstractmethod
     async def get_by_id(self, entity_id: str) -> T | None:
         ...
 
+    @abc.abstractmethod
+    async def get_detail(self, entity_id: str) -> Detail | None:
+        ...
+
+    @abc.abstractmethod
+    async def get_detail_etag(self, entity_id: str) -> str | None:
+        ...
+
+    @abc.abstractmethod
+    async def get_many(self, entity_ids: Sequence[str]) -> list[T | None]:
+        ...
+
     @abc.abstractmethod
     async def get_multi(self, filters: FilterSchema) -> list[T]:
         ...
 
+    @abc.abstractmethod
+    async def get_page(self, filters: FilterSchema) -> Page[T]:
+        ...
+
+    @abc.abstractmethod
+    def stream_multi(
+        self, filters: FilterSchema, batch_size: int = 500
+    ) -> AsyncIterator[list[T]]:
+        ...
+
+    @abc.abstractmethod
+    async def warm_up(
+        self, filters: FilterSchema, limit: int | None = None, batch_size: int = 500
+    ) -> int:
+        ...
+
 
 class BaseEntityService(IEntityService[T, FilterSchema], Generic[T, FilterSchema]):
     """Base entity service class."""
 
     schema: type[T]
-    filter_set: AsyncFilterSet
+    filter_set: type[AsyncFilterSet]
 
     def __init__(
         self,
@@ -42,50 +100,451 @@ class BaseEntityService(IEntityService[T, FilterSchema], Generic[T, FilterSchema
         search_engine: ISearchEngine,
         index: str,
         cache_expire_secs: int,
+        single_flight: SingleFlight | None = None,
+        local_cache: LocalCache | None = None,
+        generations: CacheGenerations | None = None,
+        projection: Sequence[str] | None = None,
+        negative_expire_secs: int = 0,
+        known_ids: KnownIds | None = None,
+        renderer: Callable[[T], bytes] | None = None,
     ):
+        """Create service.
+
+        :param projection: fields of documents to fetch from search engine (`_source`
+            includes), e.g. `FilmOutSchema.source_fields()`. Full documents by default.
+        :param negative_expire_secs: how long absence of an entity is cached, 0 disables
+        :param known_ids: Bloom filters of existing ids, definitely absent ones are not
+            looked up at all
+        :param renderer: serializes an entity to its response body, e.g.
+            `FilmOutSchema.render`. Bodies are cached next to entities and rebuilt
+            whenever an entity is cached, see `get_detail`.
+        """
         self.key_value_database = key_value_database
         self.search_engine = search_engine
         self.index = index
         self.cache_expire_secs = cache_expire_secs
+        self.single_flight = single_flight or SingleFlight()
+        self.local_cache = local_cache
+        self.generations = generations
+        self.projection = self._validate_projection(projection)
+        self.projection_fingerprint = projection_fingerprint(self.projection)
+        self.negative_expire_secs = negative_expire_secs
+        self.known_ids = known_ids
+        self.renderer = renderer
+        if known_ids is not None:
+            known_ids.track(index)
 
     async def get_by_id(self, entity_id: str) -> T | None:
-        entity = await self._entity_from_cache(entity_id)
-        if entity:
-            logger.debug("CACHE HIT! key: {}", entity_id)
-            return entity
-        logger.debug("CACHE MISS! key: {}", entity_id)
-        entity = await self._get_entity_from_search_engine(entity_id)
-        if not entity:
+        if not self._might_exist(entity_id):
+            CACHE_REQUESTS.inc("entity", self.index, "absent")
             return None
-        await self._put_entity_to_cache(entity, self.cache_expire_secs)
+        entity, _ = await self._get_entity(entity_id, await self._cache_key(entity_id))
         return entity
 
+    async def get_detail(self, entity_id: str) -> Detail | None:
+        """Get response body of entity rendered by `renderer`, along with its entity tag.
+
+        A cached body is returned as is, without parsing the entity or building a schema.
+        On a miss the entity is read as by `get_by_id`, which caches its body as well; the
+        body is only rendered here when the entity is cached without one.
+
+        :returns: rendered entity, None when it is not found
+        """
+        if self.renderer is None:
+            raise ServiceError("Renderer of entities is not configured")
+        if not self._might_exist(entity_id):
+            CACHE_REQUESTS.inc("detail", self.index, "absent")
+            return None
+        cache_key = await self._cache_key(entity_id)
+        detail_key = self._detail_key(cache_key)
+        detail = await self._detail_from_cache(detail_key)
+        if detail is not None:
+            CACHE_REQUESTS.inc("detail", self.index, "hit")
+            return detail
+        CACHE_REQUESTS.inc("detail", self.index, "miss")
+        entity, detail = await self._get_entity(entity_id, cache_key)
+        if entity is None or detail is not None:
+            return detail
+        detail = self._render(entity)
+        try:
+            await self.key_value_database.set_many(
+                self._detail_values(detail_key, detail), expire=self.cache_expire_secs
+            )
+        except Exception:
+            logger.error(ERROR_FAILED_TO_WRITE_TO_CACHE, object_id=entity_id)
+        self._put_detail_to_local_cache(detail_key, detail)
+        return detail
+
+    async def get_detail_etag(self, entity_id: str) -> str | None:
+        """Get entity tag of the cached response body of entity, see `get_detail`.
+
+        The tag is cached next to the body, so a conditional request can be answered
+        without reading the body or the entity.
+
+        :returns: tag of the body, None when the body is not cached
+        """
+        if self.renderer is None or not self._might_exist(entity_id):
+            return None
+        etag_key = self._etag_key(self._detail_key(await self._cache_key(entity_id)))
+        if self.local_cache is not None:
+            etag = self.local_cache.get(self._local_cache_key(etag_key))
+            if etag is not None:
+                return etag
+        raw = await self.key_value_database.get(etag_key)
+        if not raw:
+            return None
+        etag = raw.decode()
+        self._put_to_local_cache(etag_key, etag)
+        return etag
+
+    async def get_many(self, entity_ids: Sequence[str]) -> list[T | None]:
+        """Get several entities by their IDs.
+
+        Cache is read in one round trip, misses are fetched from search engine in one request
+        and written back to cache in one round trip.
+
+        :returns: entities in the order of `entity_ids`, None for not found ones
+        """
+        ids = list(dict.fromkeys(str(entity_id) for entity_id in entity_ids))
+        known = [entity_id for entity_id in ids if self._might_exist(entity_id)]
+        CACHE_REQUESTS.inc("entity", self.index, "absent", amount=len(ids) - len(known))
+        cache_keys = {entity_id: await self._cache_key(entity_id) for entity_id in known}
+        cached = await self._entities_from_cache(list(cache_keys.values()))
+        entities = {
+            entity_id: cached[cache_key]
+            for entity_id, cache_key in cache_keys.items()
+            if cache_key in cached
+        }
+        misses = [entity_id for entity_id in known if entity_id not in entities]
+        absent = [entity_id for entity_id, entity in entities.items() if entity is NOT_FOUND]
+        CACHE_REQUESTS.inc("entity", self.index, "hit", amount=len(entities) - len(absent))
+        CACHE_REQUESTS.inc("entity", self.index, "negative_hit", amount=len(absent))
+        CACHE_REQUESTS.inc("entity", self.index, "miss", amount=len(misses))
+        for entity_id in absent:
+            del entities[entity_id]
+        if misses:
+            logger.debug("CACHE MISS! keys: {}", misses)
+            docs = await self.search_engine.get_documents(
+                index=self.index, doc_ids=misses, **self._source_params()
+            )
+            fetched = {
+                entity_id: self.schema(**docs[entity_id])
+                for entity_id in misses
+                if entity_id in docs
+            }
+            if fetched:
+                await self._put_entities_to_cache(
+                    {cache_keys[entity_id]: entity for entity_id, entity in fetched.items()},
+                    self.cache_expire_secs,
+                )
+            await self._put_absence_to_cache(
+                [cache_keys[entity_id] for entity_id in misses if entity_id not in fetched]
+            )
+            entities.update(fetched)
+        return [entities.get(str(entity_id)) for entity_id in entity_ids]
+
     async def get_multi(self, filters: FilterSchema) -> list[T]:
-        filter_set = self.filter_set()
-        search_query = filter_set.filter_query(filters.dict(exclude_none=True))
+        search_query = self._project(self.filter_set.build_query(filters.dict(exclude_none=True)))
         result = await self.search_engine.search(index=self.index, params=search_query)
         return [self.schema(**doc) for doc in result]
 
+    async def get_page(self, filters: FilterSchema) -> Page[T]:
+        """Get entities along with cursor of the next page.
+
+        Cursor is returned only in cursor pagination mode, when page size is requested
+        and the page is full.
+        """
+        params = filters.dict(exclude_none=True)
+        search_query = self._project(self.filter_set.build_query(params))
+        page = await self.search_engine.search_page(index=self.index, params=search_query)
+        items = [self.schema(**doc) for doc in page.documents]
+        next_cursor = None
+        page_size = params.get(CURSOR_PAGE_SIZE_PARAM)
+        if page_size and len(items) >= page_size and page.sort is not None:
+            next_cursor = encode_cursor(Cursor(search_after=page.sort, pit_id=page.pit_id))
+        return Page(items=items, next_cursor=next_cursor)
+
+    async def stream_multi(
+        self, filters: FilterSchema, batch_size: int = 500
+    ) -> AsyncIterator[list[T]]:
+        """Iterate over all entities matching filters in batches.
+
+        Only one batch is held in memory at a time. Entities are sorted as requested,
+        with a tiebreaker added by cursor pagination filter.
+        """
+        params = {**filters.dict(exclude_none=True), CURSOR_PAGE_SIZE_PARAM: batch_size}
+        search_query = self._project(self.filter_set.build_query(params))
+        batches = self.search_engine.iter_search(
+            index=self.index, params=search_query, batch_size=batch_size
+        )
+        async for batch in batches:
+            yield [self.schema(**doc) for doc in batch]
+
+    async def warm_up(
+        self, filters: FilterSchema, limit: int | None = None, batch_size: int = 500
+    ) -> int:
+        """Put entities matching filters to cache ahead of requests.
+
+        Entities are read from search engine in batches, every batch is written to cache
+        in one round trip.
+
+        :param limit: maximum number of entities, all matching ones by default
+        :returns: number of cached entities
+        """
+        count = 0
+        if limit is not None:
+            if limit <= 0:
+                return count
+            batch_size = min(batch_size, limit)
+        async for batch in self.stream_multi(filters, batch_size=batch_size):
+            if limit is not None:
+                batch = batch[: limit - count]
+            entities = {await self._cache_key(entity.id): entity for entity in batch}
+            await self._put_entities_to_cache(entities, self.cache_expire_secs)
+            if self.known_ids is not None:
+                for entity in batch:
+                    self.known_ids.add(self.index, entity.id)
+            count += len(batch)
+            if limit is not None and count >= limit:
+                break
+        return count
+
+    async def purge_cache(self) -> int:
+        """Invalidate all cached entities of the index at once.
+
+        :returns: new cache generation of the index
+        """
+        if self.generations is None:
+            raise ServiceError("Cache generations are not configured")
+        return await self.generations.purge(self.index)
+
+    async def _get_entity(self, entity_id: str, cache_key: str) -> tuple[T | None, Detail | None]:
+        """Entity from cache or search engine, along with its body when it was just rendered."""
+        entity = await self._entity_from_cache(cache_key)
+        if entity is NOT_FOUND:
+            CACHE_REQUESTS.inc("entity", self.index, "negative_hit")
+            return None, None
+        if entity:
+            logger.debug("CACHE HIT! key: {}", cache_key)
+            CACHE_REQUESTS.inc("entity", self.index, "hit")
+            return entity, None
+        logger.debug("CACHE MISS! key: {}", cache_key)
+        CACHE_REQUESTS.inc("entity", self.index, "miss")
+        return await self.single_flight.do(
+            (self.index, self.projection_fingerprint, str(entity_id)),
+            lambda: self._load_entity(entity_id, cache_key),
+        )
+
+    async def _load_entity(self, entity_id: str, cache_key: str) -> tuple[T | None, Detail | None]:
+        """Fetch entity from search engine and put it to cache, along with its body.
+
+        Called at most once at a time per entity, concurrent misses await its result.
+        """
+        entity = await self._get_entity_from_search_engine(entity_id)
+        if not entity:
+            await self._put_absence_to_cache([cache_key])
+            return None, None
+        detail = await self._put_entity_to_cache(cache_key, entity, self.cache_expire_secs)
+        return entity, detail
+
     async def _get_entity_from_search_engine(self, entity_id: str) -> T | None:
-        doc = await self.search_engine.get_document(index=self.index, doc_id=entity_id)
+        doc = await self.search_engine.get_document(
+            index=self.index, doc_id=entity_id, **self._source_params()
+        )
         if doc:
             return self.schema(**doc)
         return None
 
-    async def _entity_from_cache(self, entity_id: str) -> T | None:
-        raw = await self.key_value_database.get(entity_id)
+    async def _cache_key(self, entity_id: str) -> str:
+        """Build cache key of entity, folding in the cache generation of the index.
+
+        Entities read with a projection are cached apart from full ones.
+        """
+        key = str(entity_id)
+        if self.projection_fingerprint is not None:
+            key = f"{key}:{self.projection_fingerprint}"
+        if self.generations is None:
+            return key
+        return await self.generations.build_key(self.index, key)
+
+    def _validate_projection(self, projection: Sequence[str] | None) -> tuple[str, ...] | None:
+        if projection is None:
+            return None
+        projection = tuple(projection)
+        projected = {field.split(".", 1)[0] for field in projection}
+        missing = [
+            field.alias
+            for field in self.schema.__fields__.values()
+            if field.required and field.alias not in projected
+        ]
+        if missing:
+            raise ValueError(
+                f"Projection misses required fields of {self.schema.__name__}: {missing}"
+            )
+        return projection
+
+    def _source_params(self) -> dict[str, Any]:
+        if self.projection is None:
+            return {}
+        return {"source_includes": list(self.projection)}
+
+    def _project(self, search_query: dict[str, Any]) -> dict[str, Any]:
+        if self.projection is None:
+            return search_query
+        return {**search_query, **self._source_params()}
+
+    def _might_exist(self, entity_id: str) -> bool:
+        return self.known_ids is None or self.known_ids.might_contain(self.index, entity_id)
+
+    async def _entity_from_cache(self, cache_key: str) -> T | object | None:
+        """Cached entity, `NOT_FOUND` when its absence is cached, None on cache miss."""
+        if self.local_cache is not None:
+            entity = self.local_cache.get(self._local_cache_key(cache_key))
+            if entity is not None:
+                return entity
+        raw = await self.key_value_database.get(cache_key)
         if not raw:
             return None
+        if raw == NOT_FOUND_MARKER:
+            return NOT_FOUND
+        entity = self._parse_cached_entity(cache_key, raw)
+        self._put_entity_to_local_cache(cache_key, entity)
+        return entity
+
+    async def _entities_from_cache(self, cache_keys: list[str]) -> dict[str, T | object]:
+        entities: dict[str, T] = {}
+        if self.local_cache is not None:
+            for cache_key in cache_keys:
+                entity = self.local_cache.get(self._local_cache_key(cache_key))
+                if entity is not None:
+                    entities[cache_key] = entity
+        missing = [cache_key for cache_key in cache_keys if cache_key not in entities]
+        if not missing:
+            return entities
+        raws = await self.key_value_database.get_many(missing)
+        for cache_key, raw in zip(missing, raws, strict=True):
+            if not raw:
+                continue
+            if raw == NOT_FOUND_MARKER:
+                entities[cache_key] = NOT_FOUND
+                continue
+            entity = self._parse_cached_entity(cache_key, raw)
+            self._put_entity_to_local_cache(cache_key, entity)
+            entities[cache_key] = entity
+        return entities
+
+    def _parse_cached_entity(self, cache_key: str, raw: str | bytes) -> T:
         try:
             return parse_raw_as(self.schema, raw)
         except (JSONDecodeError, KeyError, TypeError, ValidationError) as error:
-            logger.error(ERROR_FAILED_TO_PARSE_CACHE_DATA, object_id=entity_id)
+            logger.error(ERROR_FAILED_TO_PARSE_CACHE_DATA, object_id=cache_key)
             raise ServiceError from error
+
+    async def _put_entity_to_cache(
+        self, cache_key: str, entity: T, expire_secs: int
+    ) -> Detail | None:
+        """Cache the entity; failures are only logged, the entity is answered anyway.
+
+        :returns: rendered body of the entity, None when there is no renderer
+        """
+        if self.renderer is not None:
+            details = await self._put_entities_to_cache({cache_key: entity}, expire_secs)
+            return details[cache_key]
+        try:
+            await self.key_value_database.set(cache_key, entity.json(), expire=expire_secs)
+        except Exception:
+            logger.error(ERROR_FAILED_TO_WRITE_TO_CACHE, object_id=entity.id)
+        self._put_entity_to_local_cache(cache_key, entity)
         return None
 
-    async def _put_entity_to_cache(self, entity: T, expire_secs: int) -> None:
+    async def _put_entities_to_cache(
+        self, entities: dict[str, T], expire_secs: int
+    ) -> dict[str, Detail]:
+        """Cache entities, along with their rendered bodies when there is a renderer.
+
+        :returns: rendered bodies by cache keys of entities
+        """
+        values: dict[str, bytes | str] = {
+            cache_key: entity.json() for cache_key, entity in entities.items()
+        }
+        details = {}
+        if self.renderer is not None:
+            for cache_key, entity in entities.items():
+                details[cache_key] = detail = self._render(entity)
+                values.update(self._detail_values(self._detail_key(cache_key), detail))
         try:
-            await self.key_value_database.set(entity.id, entity.json(), expire=expire_secs)
+            await self.key_value_database.set_many(values, expire=expire_secs)
+        except Exception:
+            logger.error(ERROR_FAILED_TO_WRITE_TO_CACHE, object_id=list(entities))
+        for cache_key, entity in entities.items():
+            self._put_entity_to_local_cache(cache_key, entity)
+        for cache_key, detail in details.items():
+            self._put_detail_to_local_cache(self._detail_key(cache_key), detail)
+        return details
+
+    async def _put_absence_to_cache(self, cache_keys: list[str]) -> None:
+        """Cache absence of entities for a short time, so repeated lookups skip search engine.
+
+        Failures are only logged: absence is answered anyway.
+        """
+        if not self.negative_expire_secs or not cache_keys:
+            return
+        try:
+            await self.key_value_database.set_many(
+                dict.fromkeys(cache_keys, NOT_FOUND_MARKER), expire=self.negative_expire_secs
+            )
         except Exception as error:
-            logger.error(ERROR_FAILED_TO_WRITE_TO_CACHE, object_id=entity.id)
-            raise ServiceError from error
+            logger.warning("Failed to cache absence of {}: {}", cache_keys, error)
+            return
+        if self.local_cache is not None:
+            for cache_key in cache_keys:
+                self.local_cache.set(
+                    self._local_cache_key(cache_key), NOT_FOUND, self.negative_expire_secs
+                )
+
+    def _put_entity_to_local_cache(self, cache_key: str, entity: T) -> None:
+        self._put_to_local_cache(cache_key, entity)
+
+    def _put_to_local_cache(self, cache_key: str, value: Any) -> None:
+        if self.local_cache is not None:
+            self.local_cache.set(self._local_cache_key(cache_key), value, self.cache_expire_secs)
+
+    @staticmethod
+    def _detail_key(cache_key: str) -> str:
+        return f"{cache_key}:detail"
+
+    @staticmethod
+    def _etag_key(detail_key: str) -> str:
+        return f"{detail_key}:etag"
+
+    def _render(self, entity: T) -> Detail:
+        if self.renderer is None:
+            raise ServiceError("Renderer of entities is not configured")
+        content = self.renderer(entity)
+        return Detail(content, compute_etag(content))
+
+    def _detail_values(self, detail_key: str, detail: Detail) -> dict[str, bytes | str]:
+        """Cached values of a rendered body: the body and its entity tag."""
+        return {detail_key: detail.content, self._etag_key(detail_key): detail.etag}
+
+    async def _detail_from_cache(self, detail_key: str) -> Detail | None:
+        """Cached body along with its tag, both read in one round trip; None on a miss."""
+        etag_key = self._etag_key(detail_key)
+        if self.local_cache is not None:
+            content = self.local_cache.get(self._local_cache_key(detail_key))
+            etag = self.local_cache.get(self._local_cache_key(etag_key))
+            if content is not None and etag is not None:
+                return Detail(content, etag)
+        content, raw_etag = await self.key_value_database.get_many([detail_key, etag_key])
+        if not content:
+            return None
+        detail = Detail(content, raw_etag.decode() if raw_etag else compute_etag(content))
+        self._put_detail_to_local_cache(detail_key, detail)
+        return detail
+
+    def _put_detail_to_local_cache(self, detail_key: str, detail: Detail) -> None:
+        for key, value in self._detail_values(detail_key, detail).items():
+            self._put_to_local_cache(key, value)
+
+    def _local_cache_key(self, cache_key: str) -> tuple[str, str]:
+        return self.index, cache_key
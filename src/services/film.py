@@ -1,8 +1,10 @@
 from functools import lru_cache
+from typing import Any
 
 from src.common.key_value_database import IKeyValueDatabase
 from src.common.search_engine import ISearchEngine
 from src.common.search_engine.filter_fields import (
+    CursorPaginationFilter,
     Filter,
     InFilter,
     LimitOffsetFilter,
@@ -35,15 +37,23 @@ class FilmFilterSet(AsyncFilterSet):
         imdb_rating=OrderingField("imdb_rating"),
         title=OrderingField("title.raw"),
     )
+    page_size = CursorPaginationFilter(cursor_param="cursor", tiebreaker="id")
 
 
 class FilmService(BaseEntityService[Film, FilmFilterSchema]):
     """Cодержит бизнес-логику по работе с фильмами."""
 
     schema: type[BaseSchema] = Film
-    filter_set: AsyncFilterSet = FilmFilterSet
+    filter_set: type[AsyncFilterSet] = FilmFilterSet
     index_name: str = FILM_INDEX
     cache_expire_secs: int = FILM_CACHE_EXPIRE_IN_SECONDS
 
-    def __init__(self, key_value_database: IKeyValueDatabase, search_engine: ISearchEngine) -> None:
-        super().__init__(key_value_database, search_engine, self.index_name, self.cache_expire_secs)
+    def __init__(
+        self,
+        key_value_database: IKeyValueDatabase,
+        search_engine: ISearchEngine,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(
+            key_value_database, search_engine, self.index_name, self.cache_expire_secs, **kwargs
+        )
@@ -1,8 +1,10 @@
 from functools import lru_cache
+from typing import Any
 
 from src.common.key_value_database import IKeyValueDatabase
 from src.common.search_engine import ISearchEngine
 from src.common.search_engine.filter_fields import (
+    CursorPaginationFilter,
     Filter,
     InFilter,
     LimitOffsetFilter,
@@ -31,15 +33,23 @@ class PersonFilterSet(AsyncFilterSet):
         id=OrderingField("id"),
         name=OrderingField("name.raw"),
     )
+    page_size = CursorPaginationFilter(cursor_param="cursor", tiebreaker="id")
 
 
 class PersonService(BaseEntityService[Person, PersonFilterSchema]):
     """Cодержит бизнес-логику по работе с персонами."""
 
     schema: type[BaseSchema] = Person
-    filter_set: AsyncFilterSet = PersonFilterSet
+    filter_set: type[AsyncFilterSet] = PersonFilterSet
     index_name: str = PERSON_INDEX
     cache_expire_secs: int = PERSON_CACHE_EXPIRE_IN_SECONDS
 
-    def __init__(self, key_value_database: IKeyValueDatabase, search_engine: ISearchEngine) -> None:
-        super().__init__(key_value_database, search_engine, self.index_name, self.cache_expire_secs)
+    def __init__(
+        self,
+        key_value_database: IKeyValueDatabase,
+        search_engine: ISearchEngine,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(
+            key_value_database, search_engine, self.index_name, self.cache_expire_secs, **kwargs
+        )
@@ -0,0 +1,58 @@
+"""Cache warm-up: hottest entities are put to cache before requests ask for them."""
+
+import asyncio
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from loguru import logger
+from pydantic import BaseModel
+
+from .base import IEntityService
+
+
+@dataclass
+class WarmUpTarget:
+    """Entities of one service to put to cache.
+
+    :param filters: filters and order of the entities, e.g. the best rated films first
+    :param limit: maximum number of entities, all matching ones by default
+    """
+
+    name: str
+    service: IEntityService
+    filters: BaseModel
+    limit: int | None = None
+
+
+async def warm_up_cache(
+    targets: Sequence[WarmUpTarget], concurrency: int = 2, batch_size: int = 500
+) -> dict[str, int]:
+    """Warm up targets, at most `concurrency` of them at a time.
+
+    A failed target is logged and skipped, the others are warmed up anyway.
+
+    :returns: number of cached entities per target
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    counts: dict[str, int] = {}
+
+    async def warm_up(target: WarmUpTarget) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                counts[target.name] = await target.service.warm_up(
+                    target.filters, limit=target.limit, batch_size=batch_size
+                )
+            except Exception as error:
+                logger.warning("Failed to warm up cache of {}: {}", target.name, error)
+                return
+            logger.info(
+                "Cache of {} warmed up with {} entities in {:.2f}s",
+                target.name,
+                counts[target.name],
+                time.perf_counter() - start,
+            )
+
+    await asyncio.gather(*(warm_up(target) for target in targets))
+    return counts
@@ -0,0 +1,67 @@
+"""Прогреть кэш сущностями из Elasticsearch, например после сбоя Redis.
+
+Usage:
+    python -m src.warm_up
+    python -m src.warm_up --budget 120 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import sys
+
+from loguru import logger
+
+from src.common.key_value_database import RedisDatabase, WriteBehindKeyValueDatabase
+from src.common.search_engine import ElasticDatabase
+from src.core.logger import configure_logging
+from src.providers import key_value_database, search_engine
+from src.providers.settings import app_settings
+from src.providers.warm_up import get_warm_up_targets
+from src.services.warm_up import warm_up_cache
+
+
+async def run(budget: float, concurrency: int, batch_size: int) -> dict[str, int]:
+    """Подключиться к базам, прогреть кэш не дольше `budget` секунд и отключиться."""
+    key_value_database.redis_database = RedisDatabase.build(config=app_settings.redis.dict())
+    search_engine.elastic = ElasticDatabase.build(config=app_settings.es.dict())
+    cache_db = key_value_database.get_key_value_database(key_value_database.get_redis_database())
+    engine = search_engine.get_search_engine(search_engine.get_elastic_database())
+    try:
+        targets = get_warm_up_targets(
+            cache_db,
+            engine,
+            key_value_database.get_cache_generations(cache_db),
+            search_engine.get_known_ids(engine),
+        )
+        async with asyncio.timeout(budget):
+            return await warm_up_cache(targets, concurrency=concurrency, batch_size=batch_size)
+    finally:
+        if isinstance(cache_db, WriteBehindKeyValueDatabase):
+            await cache_db.close()
+        await key_value_database.redis_database.close()
+        await search_engine.elastic.close()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    settings = app_settings.warm_up
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=settings.budget_secs)
+    parser.add_argument("--concurrency", type=int, default=settings.concurrency)
+    parser.add_argument("--batch-size", type=int, default=settings.batch_size)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    configure_logging(app_settings.logger.dict())
+    try:
+        counts = asyncio.run(run(args.budget, args.concurrency, args.batch_size))
+    except TimeoutError:
+        logger.error("Cache warm-up did not finish in {}s", args.budget)
+        return 1
+    logger.info("Cache warmed up: {}", counts)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+from benchmarks.load import Config, parse_mix, percentile, run
+
+
+def test_percentile_nearest_rank() -> None:
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 99) == 0
+
+
+def test_parse_mix() -> None:
+    assert parse_mix("detail=3,list") == {"detail": 3.0, "list": 1.0}
+
+
+async def test_run_reports_routes_and_cache() -> None:
+    report = await run(
+        Config(requests=40, concurrency=4, films=20, cast_size=2, mix={"detail": 1, "list": 1})
+    )
+
+    assert report["total"]["requests"] == 40
+    assert report["total"]["statuses"] == {200: 40}
+    assert set(report["routes"]) == {"detail", "list"}
+    assert report["api_cache_hit_ratio"] > 0
+    assert report["search_engine"]["calls"] > 0
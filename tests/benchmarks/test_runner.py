@@ -0,0 +1,53 @@
+import pytest
+
+from benchmarks import runner
+from benchmarks.data import make_film
+from benchmarks.fakes import Faults, InMemoryKeyValueDatabase, InMemorySearchEngine
+
+
+def test_measure_calibrates_loops() -> None:
+    result = runner.measure("noop", lambda: None, rounds=3, min_round_secs=0.001)
+
+    assert result.loops > 1
+    assert result.median_ns > 0
+
+
+def test_compare_reports_regressions() -> None:
+    results = [
+        runner.Result("fast", 3, 1, 90.0, 90.0, 0.0, 90.0),
+        runner.Result("slow", 3, 1, 150.0, 150.0, 0.0, 150.0),
+        runner.Result("new", 3, 1, 10.0, 10.0, 0.0, 10.0),
+    ]
+    baseline = runner.to_json(
+        [
+            runner.Result("fast", 3, 1, 100.0, 100.0, 0.0, 100.0),
+            runner.Result("slow", 3, 1, 100.0, 100.0, 0.0, 100.0),
+        ]
+    )
+
+    comparisons = runner.compare(results, baseline)
+
+    assert [comparison.name for comparison in comparisons] == ["fast", "slow"]
+    assert [comparison.is_regression(0.1) for comparison in comparisons] == [False, True]
+
+
+async def test_fake_key_value_database_expires_keys() -> None:
+    now = [0.0]
+    kv = InMemoryKeyValueDatabase(clock=lambda: now[0])
+    await kv.set("key", "value", expire=10)
+
+    assert await kv.get_with_ttl("key") == (10, b"value")
+    now[0] = 10
+    assert await kv.get("key") is None
+
+
+async def test_fake_search_engine_projects_and_injects_errors() -> None:
+    film = make_film(cast_size=3)
+    engine = InMemorySearchEngine([film])
+
+    document = await engine.get_document("movies", film["id"], source_includes=["id", "actors.id"])
+
+    assert set(document) == {"id", "actors"}
+    engine.faults = Faults(error_rate=1.0)
+    with pytest.raises(ConnectionError):
+        await engine.search("movies", {})
@@ -0,0 +1,69 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.common.key_value_database import CacheGenerations, IKeyValueDatabase
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def generations(key_value_database_mock: IKeyValueDatabase, clock: FakeClock) -> CacheGenerations:
+    return CacheGenerations(key_value_database_mock, refresh_secs=1, clock=clock)
+
+
+class TestCacheGenerations:
+    @pytest.mark.asyncio
+    async def test_build_key_folds_generation(self, generations, key_value_database_mock):
+        """Generation of namespace is folded into the key"""
+        key_value_database_mock.get.return_value = b"3"
+        assert await generations.build_key("movies", "1") == "movies:3:1"
+        key_value_database_mock.get.assert_awaited_once_with("generation:movies")
+
+    @pytest.mark.asyncio
+    async def test_missing_counter_means_first_generation(self, generations, key_value_database_mock):
+        """Namespace without counter is at generation 0"""
+        key_value_database_mock.get.return_value = None
+        assert await generations.build_key("movies", "1") == "movies:0:1"
+
+    @pytest.mark.asyncio
+    async def test_generation_is_cached_for_refresh_period(
+        self, generations, key_value_database_mock, clock
+    ):
+        """Counter is read again only after refresh period"""
+        key_value_database_mock.get.return_value = "1"
+        await generations.get("movies")
+        await generations.get("movies")
+        assert key_value_database_mock.get.await_count == 1
+        clock.now = 1
+        await generations.get("movies")
+        assert key_value_database_mock.get.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_purge_bumps_counter(self, generations, key_value_database_mock):
+        """Purge is a single counter increment, new generation is used right away"""
+        key_value_database_mock.incr.return_value = 4
+        assert await generations.purge("movies") == 4
+        assert await generations.build_key("movies", "1") == "movies:4:1"
+        key_value_database_mock.incr.assert_awaited_once_with("generation:movies")
+        key_value_database_mock.get.assert_not_awaited()
+        key_value_database_mock.clear.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_sweep_keeps_current_generation(self, generations, key_value_database_mock):
+        """Sweep deletes every key of namespace except current generation"""
+        key_value_database_mock.get.return_value = "2"
+        key_value_database_mock.clear.return_value = 10
+        assert await generations.sweep("movies") == 10
+        key_value_database_mock.clear.assert_awaited_once_with("movies:*", exclude="movies:2:*")
@@ -0,0 +1,55 @@
+import pytest
+
+from src.common.key_value_database import LocalCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+class TestLocalCache:
+    def test_get_returns_stored_object(self, clock):
+        """Stored objects are returned as is, without copying"""
+        cache = LocalCache(clock=clock)
+        value = {"id": "1"}
+        cache.set("key", value)
+        assert cache.get("key") is value
+        assert cache.stats["hits"] == 1
+
+    def test_entry_expires_after_ttl(self, clock):
+        """Entries are not returned after their TTL has passed"""
+        cache = LocalCache(ttl=10, clock=clock)
+        cache.set("key", "value", ttl=5)
+        clock.now = 5
+        assert cache.get("key") is None
+        assert cache.stats["expirations"] == 1
+        assert cache.stats["misses"] == 1
+
+    def test_entry_ttl_is_capped(self, clock):
+        """Per-entry TTL never exceeds cache-wide TTL"""
+        cache = LocalCache(ttl=10, clock=clock)
+        cache.set("key", "value", ttl=300)
+        clock.now = 10
+        assert cache.get("key") is None
+
+    def test_least_recently_used_is_evicted(self, clock):
+        """When full, the least recently used entry is evicted"""
+        cache = LocalCache(max_entries=2, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats["evictions"] == 1
+        assert len(cache) == 2
@@ -0,0 +1,29 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.common.key_value_database import RedisDatabase
+
+
+class TestRedisDatabase:
+    @pytest.mark.asyncio
+    async def test_clear_scans_and_unlinks(self, mocker):
+        """Clear walks keyspace with SCAN and unlinks keys in batches, honoring exclusions"""
+        redis = RedisDatabase(prefix="main")
+        keys = [b"main:movies:1:a", b"main:movies:2:b", b"main:movies:1:c", b"main:movies:1:d"]
+
+        async def scan_iter(match: str, count: int):
+            assert match == "main:movies:*"
+            for key in keys:
+                yield key
+
+        mocker.patch.object(redis, "scan_iter", scan_iter)
+        unlink = mocker.patch.object(redis, "unlink", AsyncMock(side_effect=lambda *k: len(k)))
+
+        count = await redis.clear("movies:*", exclude="movies:2:*", batch_size=2)
+
+        assert count == 3
+        assert unlink.await_args_list == [
+            mocker.call(b"main:movies:1:a", b"main:movies:1:c"),
+            mocker.call(b"main:movies:1:d"),
+        ]
@@ -0,0 +1,100 @@
+import asyncio
+from unittest.mock import AsyncMock, call
+
+import pytest
+
+from src.common.key_value_database import WriteBehindKeyValueDatabase
+
+
+@pytest.fixture
+def backend() -> AsyncMock:
+    backend = AsyncMock()
+    backend.get.return_value = None
+    backend.get_many.side_effect = lambda keys: [b"stored" for _ in keys]
+    backend.get_many_with_ttl.side_effect = lambda keys: [(5, b"stored") for _ in keys]
+    return backend
+
+
+class TestWriteBehindKeyValueDatabase:
+    @pytest.mark.asyncio
+    async def test_set_returns_before_write(self, backend):
+        """Writes are only queued, and reads see queued values"""
+        database = WriteBehindKeyValueDatabase(backend, flush_interval=60)
+
+        await database.set("key", "value", expire=10)
+
+        assert not backend.set_many.called
+        assert await database.get("key") == b"value"
+        assert await database.get_with_ttl("key") == (10, b"value")
+        assert await database.get_many(["key", "other"]) == [b"value", b"stored"]
+        backend.get_many.assert_awaited_once_with(["other"])
+        assert await database.get_many_with_ttl(["key", "other"]) == [(10, b"value"), (5, b"stored")]
+        backend.get_many_with_ttl.assert_awaited_once_with(["other"])
+        await database.close()
+
+    @pytest.mark.asyncio
+    async def test_flush_batches_writes_by_expire(self, backend):
+        """Queued writes are merged per key and written with one set_many per expiration"""
+        database = WriteBehindKeyValueDatabase(backend, flush_interval=60)
+        await database.set("a", "1", expire=10)
+        await database.set("a", "2", expire=10)
+        await database.set_many({"b": "3", "c": "4"}, expire=10)
+        await database.set("d", "5", expire=20)
+
+        assert await database.flush() == 4
+
+        assert backend.set_many.await_args_list == [
+            call({"a": "2", "b": "3", "c": "4"}, expire=10),
+            call({"d": "5"}, expire=20),
+        ]
+        assert database.pending == 0
+        await database.close()
+
+    @pytest.mark.asyncio
+    async def test_background_flush(self, backend):
+        """Queued writes are flushed after the interval, or at once when a batch is full"""
+        database = WriteBehindKeyValueDatabase(backend, flush_interval=0.01, batch_size=2)
+        await database.set("a", "1")
+        await asyncio.sleep(0.05)
+        backend.set_many.assert_awaited_once_with({"a": "1"}, expire=None)
+
+        database.flush_interval = 60
+        await database.set_many({"b": "2", "c": "3"})
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert backend.set_many.await_count == 2
+        await database.close()
+
+    @pytest.mark.asyncio
+    async def test_writes_over_limit_are_dropped(self, backend):
+        """When the queue is full new keys are dropped, queued keys are still updated"""
+        database = WriteBehindKeyValueDatabase(backend, flush_interval=60, max_pending=1)
+        await database.set("a", "1")
+        await database.set("b", "2")
+        await database.set("a", "3")
+
+        await database.close()
+
+        backend.set_many.assert_awaited_once_with({"a": "3"}, expire=None)
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_not_raised(self, backend):
+        """Failed writes are logged and lost, the queue keeps working"""
+        backend.set_many.side_effect = ConnectionError("redis is down")
+        database = WriteBehindKeyValueDatabase(backend, flush_interval=60)
+        await database.set("a", "1")
+
+        assert await database.flush() == 0
+        assert database.pending == 0
+        await database.close()
+
+    @pytest.mark.asyncio
+    async def test_delete_discards_queued_write(self, backend):
+        database = WriteBehindKeyValueDatabase(backend, flush_interval=60)
+        await database.set("a", "1")
+
+        await database.delete("a")
+        await database.close()
+
+        backend.delete.assert_awaited_once_with("a")
+        assert not backend.set_many.called
@@ -0,0 +1,206 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig
+from elasticsearch import exceptions as es_exceptions
+
+from src.common.circuit_breaker import AsyncCircuitBreaker
+from src.common.concurrency import AdaptiveConcurrencyLimiter
+from src.common.exceptions import ElasticsearchDriverError, QuerySyntaxError
+from src.common.hedging import HedgePolicy
+from src.common.retry import RetryPolicy
+from src.common.search_engine import ElasticSearchEngine
+
+
+def hits(*ids: int) -> dict:
+    return {"hits": {"hits": [{"_source": {"id": id_}, "sort": [id_]} for id_ in ids]}}
+
+
+@pytest.fixture
+def client() -> MagicMock:
+    client = MagicMock()
+    client.search = AsyncMock()
+    client.open_point_in_time = AsyncMock()
+    return client
+
+
+@pytest.fixture
+def engine(client: MagicMock) -> ElasticSearchEngine:
+    return ElasticSearchEngine(client)
+
+
+class TestSearchPage:
+    @pytest.mark.asyncio
+    async def test_returns_sort_of_last_hit(self, engine, client):
+        """Sort values of the last hit are returned as cursor"""
+        client.search.return_value = hits(1, 2)
+        page = await engine.search_page("movies", {"size": 2})
+        assert page.documents == [{"id": 1}, {"id": 2}]
+        assert page.sort == [2]
+
+    @pytest.mark.asyncio
+    async def test_opens_point_in_time(self, engine, client):
+        """Point in time is opened when requested without ID, index is not targeted"""
+        client.open_point_in_time.return_value = {"id": "pit-1"}
+        client.search.return_value = {**hits(1), "pit_id": "pit-2"}
+        page = await engine.search_page("movies", {"pit": {"keep_alive": "1m"}})
+        assert page.pit_id == "pit-2"
+        client.open_point_in_time.assert_awaited_once_with(index="movies", keep_alive="1m")
+        assert "index" not in client.search.await_args.kwargs
+        assert client.search.await_args.kwargs["pit"] == {"keep_alive": "1m", "id": "pit-1"}
+
+
+class TestIterSearch:
+    @pytest.mark.asyncio
+    async def test_iterates_with_search_after(self, engine, client):
+        """Batches are read one by one, continuing after the last hit"""
+        client.search.side_effect = [hits(1, 2), hits(3, 4), hits(5)]
+        query = {"sort": [{"id": {"order": "asc"}}], "from": 10}
+
+        batches = [batch async for batch in engine.iter_search("movies", query, batch_size=2)]
+
+        assert batches == [[{"id": 1}, {"id": 2}], [{"id": 3}, {"id": 4}], [{"id": 5}]]
+        calls = [call.kwargs for call in client.search.await_args_list]
+        assert [call.get("search_after") for call in calls] == [None, [2], [4]]
+        assert all(call["size"] == 2 and "from" not in call for call in calls)
+        assert query == {"sort": [{"id": {"order": "asc"}}], "from": 10}
+
+    @pytest.mark.asyncio
+    async def test_requires_sort(self, engine):
+        """Unsorted query can not be iterated with search_after"""
+        with pytest.raises(ValueError):
+            [batch async for batch in engine.iter_search("movies", {})]
+
+
+def api_error(status: int, error_type: type = es_exceptions.ApiError) -> Exception:
+    meta = ApiResponseMeta(
+        status=status,
+        http_version="1.1",
+        headers=HttpHeaders(),
+        duration=0.0,
+        node=NodeConfig("http", "localhost", 9200),
+    )
+    return error_type("error", meta, {"error": "error"})
+
+
+class TestFailureHandling:
+    @pytest.fixture
+    def engine(self, client: MagicMock) -> ElasticSearchEngine:
+        return ElasticSearchEngine(
+            client,
+            breaker=AsyncCircuitBreaker(minimum_calls=1),
+            retry_policy=RetryPolicy(retries=2, backoff_factor=0),
+        )
+
+    @pytest.mark.asyncio
+    async def test_retries_server_errors(self, engine, client):
+        """Server errors are retried"""
+        client.search.side_effect = [api_error(503), hits(1)]
+
+        page = await engine.search_page("movies", {})
+
+        assert page.documents == [{"id": 1}]
+        assert client.search.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_raises_last_error(self, engine, client):
+        """Once retries are exhausted, the driver error is raised"""
+        client.search.side_effect = api_error(503)
+
+        with pytest.raises(ElasticsearchDriverError):
+            await engine.search_page("movies", {})
+
+        assert client.search.await_count == 3
+        assert engine.breaker.state == "OPEN"
+
+    @pytest.mark.asyncio
+    async def test_query_syntax_error_is_neither_retried_nor_recorded(self, engine, client):
+        """Malformed query fails at once and does not open the breaker"""
+        client.search.side_effect = api_error(400, es_exceptions.BadRequestError)
+
+        with pytest.raises(QuerySyntaxError):
+            await engine.search_page("movies", {})
+
+        assert client.search.await_count == 1
+        assert engine.breaker.state == "CLOSED"
+
+    @pytest.mark.asyncio
+    async def test_limiter_sees_each_attempt(self, client, mocker):
+        """Every attempt takes its own slot, released before the backoff"""
+        limiter = AdaptiveConcurrencyLimiter()
+        engine = ElasticSearchEngine(
+            client, retry_policy=RetryPolicy(retries=2, backoff_factor=0), limiter=limiter
+        )
+        release = mocker.spy(limiter, "release")
+        client.search.side_effect = [api_error(503), hits(1)]
+
+        await engine.search_page("movies", {})
+
+        failed = [call.kwargs.get("failed", False) for call in release.call_args_list]
+        assert failed == [True, False]
+        assert limiter.in_flight == 0
+
+
+class TestHedging:
+    @pytest.fixture
+    def engine(self, client: MagicMock) -> ElasticSearchEngine:
+        return ElasticSearchEngine(client, hedging=HedgePolicy(default_delay=0.01, preference="h"))
+
+    @pytest.mark.asyncio
+    async def test_slow_get_is_hedged_with_preference(self, engine, client):
+        """Slow GET is raced against a copy routed with another preference"""
+
+        async def get(**params):
+            if "preference" not in params:
+                await asyncio.sleep(1)
+            return {"_source": {"id": params["preference"]}}
+
+        client.get = AsyncMock(side_effect=get)
+
+        assert await engine.get_document("movies", "1") == {"id": "h"}
+        assert client.get.await_args_list[1].kwargs == {"index": "movies", "id": "1", "preference": "h"}
+
+    @pytest.mark.asyncio
+    async def test_slow_search_page_is_hedged(self, engine, client):
+        """Slow page without a point in time is raced against a copy"""
+
+        async def search(**params):
+            if "preference" not in params:
+                await asyncio.sleep(1)
+            return hits(1)
+
+        client.search = AsyncMock(side_effect=search)
+
+        await engine.search_page("movies", {})
+
+        assert client.search.await_args_list[1].kwargs["preference"] == "h"
+
+    @pytest.mark.asyncio
+    async def test_search_page_over_pit_is_not_hedged(self, engine, client):
+        """Point in time pins the shards, so its pages are never hedged"""
+
+        async def search(**params):
+            await asyncio.sleep(0.02)
+            return hits(1)
+
+        client.search = AsyncMock(side_effect=search)
+
+        await engine.search_page("movies", {"pit": {"id": "p", "keep_alive": "1m"}})
+
+        assert client.search.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_iter_search_is_not_hedged(self, engine, client):
+        """Streams read every page anyway, their pages are never hedged"""
+
+        async def search(**params):
+            await asyncio.sleep(0.02)
+            return hits(1)
+
+        client.search = AsyncMock(side_effect=search)
+
+        async for _ in engine.iter_search("movies", {"sort": ["id"]}):
+            pass
+
+        assert client.search.await_count == 1
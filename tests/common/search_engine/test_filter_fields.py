@@ -2,15 +2,21 @@ from collections import OrderedDict
 
 import pytest
 
+from src.common.exceptions import ValidationServiceError
 from src.common.search_engine.filter_fields import (
+    Cursor,
+    CursorPaginationFilter,
     Filter,
     InFilter,
     LimitOffsetFilter,
     NotInFilter,
     OrderingField,
     OrderingFilter,
+    QueryBuilder,
     RangeFilter,
     SearchFilter,
+    decode_cursor,
+    encode_cursor,
 )
 
 
@@ -100,3 +106,62 @@ class TestLimitOffsetFilter:
         f = LimitOffsetFilter(field_name=None)
         query = {"query": {"bool": {}}}
         assert f.filter(query.copy(), None, {}) == query
+
+
+class TestCursorPaginationFilter:
+    def test_first_page_sorts_by_tiebreaker(self):
+        """First page sets size and appends tiebreaker to sort"""
+        f = CursorPaginationFilter(tiebreaker="id")
+        query = {"sort": [{"rating": {"order": "desc"}}], "from": 20}
+        result = f.filter(query, 10, {"page_size": 10})
+        assert result == {
+            "size": 10,
+            "sort": [{"rating": {"order": "desc"}}, {"id": {"order": "asc"}}],
+        }
+
+    def test_tiebreaker_is_not_duplicated(self):
+        """Tiebreaker already present in sort is not appended again"""
+        f = CursorPaginationFilter(tiebreaker="id")
+        result = f.filter({"sort": [{"id": {"order": "desc"}}]}, 10, {})
+        assert result["sort"] == [{"id": {"order": "desc"}}]
+
+    def test_next_page_searches_after_cursor(self):
+        """Cursor is translated into 'search_after'"""
+        f = CursorPaginationFilter(cursor_param="cursor")
+        token = encode_cursor(Cursor(search_after=[8.5, "abc"]))
+        result = f.filter({}, 10, {"page_size": 10, "cursor": token})
+        assert result["search_after"] == [8.5, "abc"]
+        assert "pit" not in result
+
+    def test_point_in_time(self):
+        """Point in time is requested on first page and reused from cursor on next ones"""
+        f = CursorPaginationFilter(pit_keep_alive="1m")
+        assert f.filter({}, 10, {})["pit"] == {"keep_alive": "1m"}
+        token = encode_cursor(Cursor(search_after=["abc"], pit_id="pit-id"))
+        result = f.filter({}, 10, {"cursor": token})
+        assert result["pit"] == {"keep_alive": "1m", "id": "pit-id"}
+
+    def test_invalid_cursor(self):
+        """Malformed cursor is a validation error"""
+        with pytest.raises(ValidationServiceError):
+            decode_cursor("not a cursor")
+
+
+class TestQueryBuilder:
+    def test_wraps_non_bool_query_into_must(self):
+        builder = QueryBuilder({"query": {"match_all": {}}, "size": 5})
+        builder.must.append({"term": {"status": "active"}})
+        assert builder.build() == {
+            "query": {"bool": {"must": [{"match_all": {}}, {"term": {"status": "active"}}]}},
+            "size": 5,
+        }
+
+    def test_does_not_mutate_base_query(self):
+        base = {"query": {"bool": {"must": [{"term": {"a": 1}}]}}}
+        builder = QueryBuilder(base)
+        builder.must.append({"term": {"b": 2}})
+        builder.build()
+        assert base == {"query": {"bool": {"must": [{"term": {"a": 1}}]}}}
+
+    def test_empty_builder_builds_empty_query(self):
+        assert QueryBuilder().build() == {}
@@ -1,4 +1,5 @@
 from src.common.search_engine.filter_fields import (
+    CursorPaginationFilter,
     Filter,
     InFilter,
     LimitOffsetFilter,
@@ -51,3 +52,47 @@ class TestFilterSet:
         fs = SampleFilterSet()
         result = fs.filter_query({"nonexistent": "x"})
         assert result == {}
+
+
+class CursorFilterSet(BaseFilterSet):
+    order = OrderingFilter(rating=OrderingField("rating"))
+    page_size = CursorPaginationFilter(tiebreaker="id")
+
+
+class TestFilterSetOrder:
+    def test_filters_applied_in_declaration_order(self):
+        """Cursor pagination sees sort of ordering filter regardless of params order"""
+        fs = CursorFilterSet()
+        result = fs.filter_query({"page_size": 5, "order": ["-rating"]})
+        assert result["sort"] == [{"rating": {"order": "desc"}}, {"id": {"order": "asc"}}]
+
+
+class TestQueryPlan:
+    def test_build_query_memoizes_identical_params(self):
+        plan = SampleFilterSet._query_plan
+        first = SampleFilterSet.build_query({"tags": ["t1", "t2"], "status": "active"})
+        second = SampleFilterSet.build_query({"status": "active", "tags": ["t1", "t2"]})
+        assert first == second
+        assert plan.stats["hits"] >= 1
+
+    def test_mutating_built_query_keeps_memoized_one(self):
+        params = {"tags": ["t1"], "status": "active"}
+        expected = SampleFilterSet.build_query(params)
+        query = SampleFilterSet.build_query(params)
+        query["query"]["bool"]["must"].append({"term": {"kind": "movie"}})
+        query["query"]["bool"]["must"][1]["terms"]["tags"].append("t2")
+        query["size"] = 1
+
+        assert SampleFilterSet.build_query(params) == expected
+
+    def test_build_query_matches_filter_query(self):
+        params = {"status": "active", "order": ["-created_at"], "pagination": (0, 10)}
+        assert SampleFilterSet.build_query(params) == SampleFilterSet().filter_query(params)
+
+    def test_filter_query_keeps_base_query(self):
+        fs = SampleFilterSet({"query": {"term": {"kind": "movie"}}})
+        result = fs.filter_query({"status": "active"})
+        assert result["query"]["bool"]["must"] == [
+            {"term": {"kind": "movie"}},
+            {"term": {"status": "active"}},
+        ]
@@ -0,0 +1,66 @@
+import pytest
+
+from src.common.bloom_filter import BloomFilter, KnownIds
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def batches(*batches: list[str]):
+    async def iter_search(index: str, params: dict, batch_size: int):
+        for batch in batches:
+            yield [{"id": doc_id} for doc_id in batch]
+
+    return iter_search
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives() -> None:
+    items = [f"id-{number}" for number in range(5000)]
+    bloom = BloomFilter.from_items(items, error_rate=0.01)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"other-{number}" in bloom for number in range(10000))
+    assert false_positives < 300
+
+
+def test_bloom_filter_validates_error_rate() -> None:
+    with pytest.raises(ValueError):
+        BloomFilter(10, error_rate=1)
+
+
+async def test_known_ids_know_nothing_until_built(search_engine_mock) -> None:
+    known_ids = KnownIds(search_engine_mock)
+
+    assert known_ids.might_contain("movies", "anything")
+
+
+async def test_known_ids_are_rebuilt_from_search_engine(search_engine_mock) -> None:
+    search_engine_mock.iter_search = batches(["1", "2"], ["3"])
+    known_ids = KnownIds(search_engine_mock)
+
+    assert await known_ids.rebuild("movies") == 3
+
+    assert known_ids.might_contain("movies", "3")
+    assert not known_ids.might_contain("movies", "4")
+    known_ids.add("movies", "4")
+    assert known_ids.might_contain("movies", "4")
+
+
+async def test_refresh_rebuilds_tracked_indexes_when_due(search_engine_mock, mocker) -> None:
+    clock = Clock()
+    known_ids = KnownIds(search_engine_mock, refresh_secs=60, clock=clock)
+    known_ids.track("movies")
+    rebuild = mocker.patch.object(known_ids, "rebuild", side_effect=[ConnectionError, 1])
+    sleep = mocker.patch("asyncio.sleep", side_effect=[None, None, StopAsyncIteration])
+
+    with pytest.raises(StopAsyncIteration):
+        await known_ids.refresh_forever(retry_secs=30)
+
+    # failed build is retried later, not on every poll
+    assert rebuild.await_count == 1
+    assert sleep.await_count == 3
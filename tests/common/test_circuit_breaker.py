@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+
+from src.common.circuit_breaker import AsyncCircuitBreaker, SlidingWindow, circuit_breaker
+from src.common.exceptions import CircuitBreakerOpenError
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+
+def make_breaker(clock: Clock, **kwargs) -> AsyncCircuitBreaker:
+    params = {
+        "failure_rate_threshold": 0.5,
+        "minimum_calls": 4,
+        "window_secs": 10,
+        "reset_timeout": 30,
+        "half_open_max_calls": 2,
+        "name": "test",
+        "clock": clock,
+    }
+    return AsyncCircuitBreaker(**{**params, **kwargs})
+
+
+def call(breaker: AsyncCircuitBreaker, failed: bool = False, duration: float = 0.0) -> None:
+    permit = breaker.acquire()
+    assert permit is not None
+    breaker.record(permit, failed=failed, duration=duration)
+
+
+def open_breaker(breaker: AsyncCircuitBreaker) -> None:
+    for _ in range(breaker.minimum_calls):
+        call(breaker, failed=True)
+    assert breaker.state == "OPEN"
+
+
+def test_sliding_window_forgets_old_buckets() -> None:
+    window = SlidingWindow(window_secs=10, buckets=10)
+    window.add(100.0, failed=True, slow=False)
+    window.add(105.0, failed=False, slow=True)
+
+    assert window.totals(105.0) == (2, 1, 1)
+    assert window.totals(111.0) == (1, 0, 1)
+    assert window.totals(116.0) == (0, 0, 0)
+
+
+def test_breaker_opens_on_failure_rate_after_minimum_calls(clock: Clock) -> None:
+    breaker = make_breaker(clock)
+
+    call(breaker, failed=True)
+    call(breaker, failed=True)
+    call(breaker, failed=True)
+    assert breaker.state == "CLOSED"
+    call(breaker)
+
+    assert breaker.state == "OPEN"
+    assert breaker.acquire() is None
+
+
+def test_breaker_stays_closed_below_failure_rate(clock: Clock) -> None:
+    breaker = make_breaker(clock)
+
+    for failed in (True, False, False, False, True, False, False):
+        call(breaker, failed=failed)
+
+    assert breaker.state == "CLOSED"
+
+
+def test_breaker_opens_on_slow_call_rate(clock: Clock) -> None:
+    breaker = make_breaker(clock, slow_call_secs=1.0, slow_call_rate_threshold=0.75)
+
+    for duration in (2.0, 0.1, 3.0, 1.0):
+        call(breaker, duration=duration)
+
+    assert breaker.state == "OPEN"
+
+
+def test_old_failures_leave_the_window(clock: Clock) -> None:
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        call(breaker, failed=True)
+
+    clock.now += 11
+    call(breaker, failed=True)
+
+    assert breaker.state == "CLOSED"
+    assert breaker.window.totals(clock.now) == (1, 1, 0)
+
+
+def test_half_open_admits_limited_probes_and_closes(clock: Clock) -> None:
+    breaker = make_breaker(clock)
+    open_breaker(breaker)
+    clock.now += 30
+
+    first, second = breaker.acquire(), breaker.acquire()
+
+    assert breaker.state == "HALF_OPEN"
+    assert breaker.acquire() is None
+    breaker.record(first, failed=False)
+    assert breaker.state == "HALF_OPEN"
+    breaker.record(second, failed=False)
+    assert breaker.state == "CLOSED"
+    assert breaker.window.totals(clock.now) == (0, 0, 0)
+
+
+def test_failed_probe_reopens(clock: Clock) -> None:
+    breaker = make_breaker(clock)
+    open_breaker(breaker)
+    clock.now += 30
+
+    breaker.record(breaker.acquire(), failed=True)
+
+    assert breaker.state == "OPEN"
+    assert breaker.opened_at == clock.now
+    assert breaker.acquire() is None
+
+
+def test_outcomes_of_stale_permits_are_ignored(clock: Clock) -> None:
+    breaker = make_breaker(clock)
+    stale = breaker.acquire()
+    open_breaker(breaker)
+    clock.now += 30
+    probe = breaker.acquire()
+
+    breaker.record(stale, failed=True)
+
+    assert breaker.state == "HALF_OPEN"
+    breaker.record(probe, failed=False)
+    assert breaker.state == "HALF_OPEN"
+
+
+class Service:
+    def __init__(self, breaker: AsyncCircuitBreaker) -> None:
+        self.breaker = breaker
+
+    @circuit_breaker(lambda self: self.breaker, recorded_exceptions=(ConnectionError,))
+    async def call(self, error: BaseException | None = None) -> str:
+        if error is not None:
+            raise error
+        return "ok"
+
+
+async def test_decorator_records_only_recorded_exceptions(clock: Clock) -> None:
+    service = Service(make_breaker(clock, minimum_calls=2))
+
+    with pytest.raises(KeyError):
+        await service.call(KeyError())
+    with pytest.raises(ConnectionError):
+        await service.call(ConnectionError())
+
+    assert service.breaker.window.totals(clock.now) == (2, 1, 0)
+    assert service.breaker.state == "OPEN"
+    with pytest.raises(CircuitBreakerOpenError):
+        await service.call()
+
+
+async def test_decorator_releases_probe_of_cancelled_call(clock: Clock) -> None:
+    service = Service(make_breaker(clock, half_open_max_calls=1))
+    open_breaker(service.breaker)
+    clock.now += 30
+
+    with pytest.raises(asyncio.CancelledError):
+        await service.call(asyncio.CancelledError())
+
+    assert await service.call() == "ok"
+    assert service.breaker.state == "CLOSED"
@@ -0,0 +1,53 @@
+import datetime
+import decimal
+import uuid
+
+import orjson
+from pydantic import BaseModel, Field
+
+from src.api.v1.schemas.film import FilmOutSchema
+from src.common.coder import OrjsonCoder
+from tests.factories.film import FilmFactory
+
+
+class TestOrjsonCoder:
+    def test_encode_model_matches_pydantic(self):
+        """Models are encoded to the same json as pydantic produces"""
+        film = FilmFactory()
+        encoded = OrjsonCoder.encode(film)
+        assert isinstance(encoded, bytes)
+        assert orjson.loads(encoded) == orjson.loads(film.json())
+
+    def test_encode_trusted_schema_matches_validated(self):
+        """Schemas built without validation are encoded the same as validated ones"""
+        film = FilmFactory()
+        trusted = FilmOutSchema.from_entity(film)
+        validated = FilmOutSchema.parse_obj(trusted.dict())
+        assert OrjsonCoder.encode(trusted) == OrjsonCoder.encode(validated)
+        assert orjson.loads(OrjsonCoder.encode(trusted)) == orjson.loads(validated.json())
+
+    def test_encode_honors_excluded_fields(self):
+        class Secret(BaseModel):
+            name: str
+            token: str = Field(exclude=True)
+
+        assert OrjsonCoder.encode(Secret(name="a", token="b")) == b'{"name":"a"}'
+
+    def test_encode_special_types(self):
+        """Types unsupported by orjson are encoded like fastapi does"""
+        value = {
+            "id": uuid.UUID(int=1),
+            "price": decimal.Decimal("1.50"),
+            "at": datetime.datetime(2024, 1, 2, 3, 4, 5),
+        }
+        assert orjson.loads(OrjsonCoder.encode(value)) == {
+            "id": "00000000-0000-0000-0000-000000000001",
+            "price": "1.50",
+            "at": "2024-01-02T03:04:05",
+        }
+
+    def test_decode_returns_bytes_untouched(self):
+        """Decoding does not parse bytes"""
+        raw = b'{"a":1}'
+        assert OrjsonCoder.decode(raw) is raw
+        assert OrjsonCoder.decode('{"a":1}') == raw
@@ -0,0 +1,38 @@
+import gzip
+
+import brotli
+import pytest
+
+from src.common.compression import IDENTITY, Compressor
+
+
+class TestCompressor:
+    def test_compress_is_stable(self):
+        """Same body is compressed to same bytes, so entity tags of variants are stable"""
+        compressor = Compressor()
+        body = b'{"results": []}' * 100
+
+        variants = compressor.compress(body)
+
+        assert gzip.decompress(variants["gzip"]) == body
+        assert brotli.decompress(variants["br"]) == body
+        assert compressor.compress(body) == variants
+
+    @pytest.mark.parametrize(
+        ("accept_encoding", "encoding"),
+        [
+            (None, IDENTITY),
+            ("", IDENTITY),
+            ("gzip, deflate", "gzip"),
+            ("GZIP;q=0.5", "gzip"),
+            ("gzip;q=0", IDENTITY),
+            ("deflate", IDENTITY),
+            ("gzip, deflate, br", "br"),
+            ("gzip, br;q=0.5", "gzip"),
+            ("*", "br"),
+            ("*, br;q=0", "gzip"),
+            ("*, br;q=0, gzip;q=0", IDENTITY),
+        ],
+    )
+    def test_negotiate(self, accept_encoding, encoding):
+        assert Compressor().negotiate(accept_encoding) == encoding
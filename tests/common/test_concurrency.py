@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from src.common.concurrency import AdaptiveConcurrencyLimiter, concurrency_limit
+from src.common.exceptions import OverloadedError
+from src.main import repository_exception_handler
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(**kwargs) -> AdaptiveConcurrencyLimiter:
+    params = {"initial_limit": 2, "min_limit": 1, "max_queue": 1, "queue_timeout": 1.0}
+    return AdaptiveConcurrencyLimiter(**{**params, **kwargs})
+
+
+async def test_calls_over_limit_wait_for_a_slot() -> None:
+    limiter = make_limiter()
+    first = await limiter.acquire()
+    await limiter.acquire()
+
+    waiting = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queued == 1
+    assert not waiting.done()
+
+    limiter.release(first)
+    await waiting
+    assert limiter.in_flight == 2
+    assert limiter.queued == 0
+
+
+async def test_full_queue_is_rejected_at_once() -> None:
+    limiter = make_limiter(retry_after=3)
+    await limiter.acquire()
+    await limiter.acquire()
+    waiting = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(OverloadedError) as error:
+        await limiter.acquire()
+
+    assert error.value.status == 503
+    assert error.value.retry_after == 3
+    waiting.cancel()
+
+
+async def test_wait_for_slot_times_out() -> None:
+    limiter = make_limiter(initial_limit=1, queue_timeout=0.01)
+    await limiter.acquire()
+
+    with pytest.raises(OverloadedError):
+        await limiter.acquire()
+
+    assert limiter.queued == 0
+    assert limiter.in_flight == 1
+
+
+async def test_cancelled_waiter_leaves_queue() -> None:
+    limiter = make_limiter(initial_limit=1)
+    started_at = await limiter.acquire()
+    waiting = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    waiting.cancel()
+    await asyncio.sleep(0)
+    limiter.release(started_at)
+
+    assert limiter.queued == 0
+    assert limiter.in_flight == 0
+
+
+async def test_limit_grows_with_fast_calls_and_backs_off_on_slow_ones() -> None:
+    clock = Clock()
+    limiter = make_limiter(initial_limit=4, max_queue=10, backoff_ratio=0.5, clock=clock)
+    for _ in range(20):
+        started = [await limiter.acquire() for _ in range(limiter.limit)]
+        clock.now += 0.01
+        for started_at in started:
+            limiter.release(started_at, operation="get")
+    grown = limiter._limit
+    assert limiter.limit > 4
+
+    started = [await limiter.acquire() for _ in range(3)]
+    clock.now += 1
+    for started_at in started:
+        limiter.release(started_at, operation="get")
+
+    # calls of one congestion episode back off once
+    assert limiter.limit == int(grown * 0.5)
+
+
+async def test_slow_operation_is_compared_with_its_own_baseline() -> None:
+    clock = Clock()
+    limiter = make_limiter(initial_limit=4, clock=clock)
+    for operation, latency in (("get", 0.001), ("search", 0.1), ("search", 0.1)):
+        started_at = await limiter.acquire()
+        clock.now += latency
+        limiter.release(started_at, operation=operation)
+
+    assert limiter.limit == 4
+
+
+async def test_failure_backs_off() -> None:
+    limiter = make_limiter(initial_limit=10, backoff_ratio=0.5)
+
+    limiter.release(await limiter.acquire(), failed=True)
+
+    assert limiter.limit == 5
+
+
+class Service:
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter | None) -> None:
+        self.limiter = limiter
+
+    @concurrency_limit(lambda self: self.limiter, recorded_exceptions=(ConnectionError,))
+    async def call(self, error: BaseException | None = None) -> str:
+        if error is not None:
+            raise error
+        return "ok"
+
+
+async def test_decorator_frees_slot_of_every_call() -> None:
+    service = Service(make_limiter(initial_limit=10, backoff_ratio=0.5, clock=Clock()))
+
+    assert await service.call() == "ok"
+    with pytest.raises(KeyError):
+        await service.call(KeyError())
+    assert service.limiter.limit == 10
+    with pytest.raises(ConnectionError):
+        await service.call(ConnectionError())
+    assert service.limiter.limit == 5
+    with pytest.raises(asyncio.CancelledError):
+        await service.call(asyncio.CancelledError())
+
+    assert service.limiter.in_flight == 0
+    assert await Service(None).call() == "ok"
+
+
+async def test_overload_is_answered_with_retry_after() -> None:
+    response = await repository_exception_handler(None, OverloadedError(retry_after=2))
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
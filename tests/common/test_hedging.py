@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from src.common.hedging import HedgePolicy, LatencyTracker
+from src.common.metrics import HEDGED_REQUESTS
+from src.common.retry import RetryBudget
+
+
+class Call:
+    """Coroutine function answering after `delay`, recording its start and cancellation."""
+
+    def __init__(self, delay: float, result: str = "", error: Exception | None = None) -> None:
+        self.delay = delay
+        self.result = result
+        self.error = error
+        self.started = False
+        self.cancelled = False
+
+    async def __call__(self) -> str:
+        self.started = True
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_latency_tracker_percentile() -> None:
+    tracker = LatencyTracker(percentile=90, min_samples=10, refresh_every=10)
+    for value in range(1, 10):
+        tracker.observe(value / 100)
+    assert tracker.value is None
+
+    tracker.observe(0.1)
+
+    assert tracker.value == 0.09
+
+
+async def test_fast_primary_is_not_hedged() -> None:
+    policy = HedgePolicy(default_delay=0.05)
+    hedge = Call(0, "hedge")
+
+    assert await policy.call("fast", Call(0, "primary"), hedge) == "primary"
+    assert not hedge.started
+
+
+async def test_slow_primary_loses_to_hedge_and_is_cancelled() -> None:
+    policy = HedgePolicy(default_delay=0.01)
+    primary = Call(1, "primary")
+
+    assert await policy.call("slow", primary, Call(0, "hedge")) == "hedge"
+    await asyncio.sleep(0)
+    assert primary.cancelled
+    assert HEDGED_REQUESTS.get("slow", "sent") == 1
+    assert HEDGED_REQUESTS.get("slow", "won") == 1
+
+
+async def test_primary_may_still_win_after_hedge_is_sent() -> None:
+    policy = HedgePolicy(default_delay=0.01)
+    hedge = Call(1, "hedge")
+
+    assert await policy.call("race", Call(0.02, "primary"), hedge) == "primary"
+    await asyncio.sleep(0)
+    assert hedge.cancelled
+
+
+async def test_failed_call_waits_for_the_other() -> None:
+    policy = HedgePolicy(default_delay=0.01)
+
+    result = await policy.call("flaky", Call(0.02, error=ValueError()), Call(0.03, "hedge"))
+
+    assert result == "hedge"
+
+
+async def test_error_of_primary_is_raised_when_both_fail() -> None:
+    policy = HedgePolicy(default_delay=0.01)
+
+    with pytest.raises(ValueError):
+        await policy.call("down", Call(0.02, error=ValueError()), Call(0, error=KeyError()))
+
+
+async def test_budget_throttles_hedges() -> None:
+    policy = HedgePolicy(default_delay=0.001, budget=RetryBudget(ratio=0, min_per_sec=0.1))
+    hedges = [Call(0, "hedge") for _ in range(2)]
+
+    results = [await policy.call("budget", Call(0.01, "primary"), hedge) for hedge in hedges]
+
+    assert results == ["hedge", "primary"]
+    assert not hedges[1].started
+    assert HEDGED_REQUESTS.get("budget", "throttled") == 1
+
+
+async def test_delay_follows_observed_latency() -> None:
+    policy = HedgePolicy(percentile=50, default_delay=1, min_delay=0.001)
+    assert policy.delay("get") == 1
+
+    for _ in range(100):
+        await policy.call("get", Call(0, "primary"), Call(0, "hedge"))
+
+    assert policy.delay("get") == 0.001
+
+
+async def test_latency_of_primary_is_observed_when_hedge_wins() -> None:
+    policy = HedgePolicy(default_delay=0.02)
+
+    assert await policy.call("get", Call(1, "primary"), Call(0, "hedge")) == "hedge"
+
+    [latency] = policy._tracker("get")._samples
+    assert latency >= 0.02
+
+
+async def test_latency_of_hedge_is_not_observed() -> None:
+    policy = HedgePolicy(default_delay=0.01)
+
+    assert await policy.call("get", Call(0.03, "primary"), Call(1, "hedge")) == "primary"
+
+    [latency] = policy._tracker("get")._samples
+    assert latency >= 0.03
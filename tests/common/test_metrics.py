@@ -0,0 +1,101 @@
+import pytest
+
+from src.common.circuit_breaker import AsyncCircuitBreaker
+from src.common.metrics import (
+    CIRCUIT_BREAKER_STATE,
+    CIRCUIT_BREAKER_TRANSITIONS,
+    RETRY_ATTEMPTS,
+    MetricFamily,
+    MetricsRegistry,
+    Sample,
+)
+from src.common.retry import retry_async
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    return MetricsRegistry()
+
+
+def test_counter_renders_with_labels(registry: MetricsRegistry) -> None:
+    counter = registry.counter("cache_requests", "Cache lookups", ["namespace", "result"])
+    counter.inc("v1", "hit")
+    counter.inc("v1", "hit")
+    counter.inc("v1", "miss", amount=3)
+
+    text = registry.render()
+
+    assert "# TYPE cache_requests counter" in text
+    assert 'cache_requests_total{namespace="v1",result="hit"} 2' in text
+    assert 'cache_requests_total{namespace="v1",result="miss"} 3' in text
+
+
+def test_histogram_buckets_are_cumulative(registry: MetricsRegistry) -> None:
+    histogram = registry.histogram("latency", "Latency", ["op"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "get")
+
+    text = registry.render()
+
+    assert 'latency_bucket{op="get",le="0.1"} 2' in text
+    assert 'latency_bucket{op="get",le="1"} 3' in text
+    assert 'latency_bucket{op="get",le="+Inf"} 4' in text
+    assert 'latency_count{op="get"} 4' in text
+    assert 'latency_sum{op="get"} 2.65' in text
+
+
+def test_register_same_metric_returns_existing(registry: MetricsRegistry) -> None:
+    counter = registry.counter("requests", "Requests", ["route"])
+
+    assert registry.counter("requests", "Requests", ["route"]) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("requests", "Requests", ["route"])
+
+
+def test_collectors_are_read_at_scrape_time(registry: MetricsRegistry) -> None:
+    pool = {"in_use": 1}
+
+    def collect() -> list[MetricFamily]:
+        return [MetricFamily("pool", "gauge", "Pool", [Sample("pool", {}, pool["in_use"])])]
+
+    registry.register_collector(collect)
+    pool["in_use"] = 5
+
+    assert "pool 5" in registry.render()
+    registry.unregister_collector(collect)
+    assert "pool" not in registry.render()
+
+
+def test_label_values_are_escaped(registry: MetricsRegistry) -> None:
+    registry.counter("errors", "Errors", ["detail"]).inc('say "hi"\n')
+
+    assert 'errors_total{detail="say \\"hi\\"\\n"} 1' in registry.render()
+
+
+async def test_circuit_breaker_records_transitions() -> None:
+    breaker = AsyncCircuitBreaker(
+        minimum_calls=1, reset_timeout=0, half_open_max_calls=1, name="test-breaker"
+    )
+
+    breaker.record(breaker.acquire(), failed=True)
+
+    assert CIRCUIT_BREAKER_STATE.get("test-breaker") == 2
+    assert CIRCUIT_BREAKER_TRANSITIONS.get("test-breaker", "CLOSED", "OPEN") == 1
+    breaker.record(breaker.acquire(), failed=False)
+    assert CIRCUIT_BREAKER_STATE.get("test-breaker") == 0
+
+
+async def test_retry_counts_failed_and_recovered_attempts() -> None:
+    calls = []
+
+    @retry_async(retries=2, backoff_factor=0, retriable_exceptions=(ValueError,))
+    async def flaky() -> str:
+        calls.append(1)
+        if len(calls) < 2:
+            raise ValueError
+        return "ok"
+
+    assert await flaky() == "ok"
+    name = flaky.__wrapped__.__qualname__
+    assert RETRY_ATTEMPTS.get(name, "failed") == 1
+    assert RETRY_ATTEMPTS.get(name, "recovered") == 1
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.common.profiler import ProfilerMiddleware, SamplingProfiler, route_name
+from src.main import create_app
+from src.providers.profiler import get_profiler
+from src.providers.settings import app_settings
+
+
+def busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def waiting(seconds: float) -> None:
+    await asyncio.sleep(seconds)
+
+
+def make_app(profiler: SamplingProfiler) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int) -> dict:
+        busy(0.03)
+        await waiting(0.03)
+        return {"id": item_id}
+
+    app.add_middleware(ProfilerMiddleware, profiler=profiler)
+    return app
+
+
+async def test_sampled_requests_are_attributed_to_route() -> None:
+    profiler = SamplingProfiler(sample_rate=1, interval=0.001)
+    transport = httpx.ASGITransport(app=make_app(profiler))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/items/1")
+
+    assert response.status_code == 200
+    summary = profiler.summary()["GET /items/{item_id}"]
+    assert summary["requests"] == 1
+    assert summary["wall_ms"] >= 60
+    assert summary["cpu_ms"] > 0
+    assert summary["wait_ms"] > 0
+    folded = profiler.folded()
+    assert "GET /items/{item_id};[cpu];" in folded
+    assert "test_profiler:busy" in folded
+    assert "test_profiler:waiting" in folded
+
+
+async def test_unsampled_requests_are_not_profiled() -> None:
+    profiler = SamplingProfiler(sample_rate=0)
+    transport = httpx.ASGITransport(app=make_app(profiler))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.get("/items/1")
+
+    assert profiler.summary() == {}
+    assert profiler.folded() == ""
+
+
+def test_route_name_falls_back_to_path() -> None:
+    assert route_name({"method": "GET", "path": "/unknown"}) == "GET /unknown"
+
+
+@pytest.fixture
+def profiler_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(app_settings.profiler, "enabled", True)
+    monkeypatch.setattr(app_settings.profiler, "token", "secret")
+
+
+async def test_profile_endpoint_requires_token(profiler_settings: None) -> None:
+    get_profiler().reset()
+    transport = httpx.ASGITransport(app=create_app())
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        forbidden = await client.get("/debug/profile")
+        allowed = await client.get("/debug/profile", headers={"X-Profiler-Token": "secret"})
+
+    assert forbidden.status_code == 403
+    assert allowed.status_code == 200
@@ -0,0 +1,65 @@
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from pydantic import BaseModel
+
+from src.common.responses import (
+    TrustedJSONResponse,
+    compute_etag,
+    etag_matches,
+    json_bytes_response,
+)
+
+
+class Item(BaseModel):
+    id: int
+
+
+class TestConditionalResponses:
+    @pytest.mark.parametrize(
+        ("if_none_match", "matches"),
+        [
+            (None, False),
+            ('"abc"', True),
+            ('W/"abc"', True),
+            ('"other", "abc"', True),
+            ("*", True),
+            ('"other"', False),
+        ],
+    )
+    def test_etag_matches(self, if_none_match, matches):
+        assert etag_matches(if_none_match, '"abc"') is matches
+
+    def test_etag_depends_on_content(self):
+        assert compute_etag(b"{}") == compute_etag(b"{}")
+        assert compute_etag(b"{}") != compute_etag(b"[]")
+
+    def test_response_has_etag(self):
+        response = json_bytes_response(b'{"a":1}')
+
+        assert response.status_code == 200
+        assert response.body == b'{"a":1}'
+        assert response.headers["ETag"] == compute_etag(b'{"a":1}')
+
+    def test_known_etag_is_not_modified(self):
+        response = json_bytes_response(b'{"a":1}', if_none_match=compute_etag(b'{"a":1}'))
+
+        assert response.status_code == 304
+        assert response.body == b""
+
+
+@pytest.mark.asyncio
+async def test_trusted_response_skips_response_model_validation():
+    """Route result is sent as built, its return annotation only documents the schema"""
+    app = FastAPI()
+
+    @app.get("/item")
+    async def item() -> Item:
+        return TrustedJSONResponse(Item.construct(id="not validated"))
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/item")
+
+    assert response.status_code == 200
+    assert response.json() == {"id": "not validated"}
+    assert "Item" in app.openapi()["components"]["schemas"]
@@ -0,0 +1,132 @@
+import pytest
+
+from src.common.metrics import RETRY_ATTEMPTS
+from src.common.retry import RetryBudget, RetryPolicy, retry_async
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TransientError(Exception):
+    pass
+
+
+class BadRequest(TransientError):
+    pass
+
+
+def failing(errors: list[Exception], calls: list) -> callable:
+    async def func() -> str:
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    return func
+
+
+def make_policy(**kwargs) -> RetryPolicy:
+    params = {
+        "retries": 3,
+        "backoff_factor": 0,
+        "deadline": None,
+        "retriable_exceptions": (TransientError,),
+        "non_retriable_exceptions": (BadRequest,),
+    }
+    return RetryPolicy(**{**params, **kwargs})
+
+
+async def test_recovers_after_transient_errors() -> None:
+    calls = []
+    func = failing([TransientError(), TransientError()], calls)
+
+    assert await make_policy().call(func) == "ok"
+    assert len(calls) == 3
+
+
+async def test_raises_last_error_when_retries_are_exhausted() -> None:
+    calls = []
+    last = TransientError("last")
+    func = failing([TransientError(), TransientError(), TransientError(), last], calls)
+
+    with pytest.raises(TransientError) as error:
+        await make_policy().call(func)
+
+    assert error.value is last
+    assert len(calls) == 4
+    assert RETRY_ATTEMPTS.get(func.__qualname__, "exhausted") >= 1
+
+
+@pytest.mark.parametrize("error", [BadRequest(), ValueError()])
+async def test_does_not_retry_non_retriable_errors(error: Exception) -> None:
+    calls = []
+
+    with pytest.raises(type(error)):
+        await make_policy().call(failing([error], calls))
+
+    assert len(calls) == 1
+
+
+async def test_does_not_retry_past_deadline() -> None:
+    calls = []
+    policy = make_policy(backoff_factor=10, max_backoff=10, deadline=0.001)
+    policy.backoff = lambda attempt: 1.0
+
+    with pytest.raises(TransientError):
+        await policy.call(failing([TransientError()], calls))
+
+    assert len(calls) == 1
+
+
+def test_backoff_is_full_jitter_below_capped_exponent() -> None:
+    policy = make_policy(backoff_factor=0.1, max_backoff=0.5)
+
+    delays = [policy.backoff(attempt) for attempt in range(6) for _ in range(50)]
+
+    assert all(0 <= delay <= 0.5 for delay in delays)
+    assert all(policy.backoff(0) <= 0.1 for _ in range(50))
+    assert len(set(delays)) > 1
+
+
+def test_budget_caps_retries_to_share_of_calls() -> None:
+    clock = Clock()
+    budget = RetryBudget(ratio=0.1, min_per_sec=0.1, window_secs=10, clock=clock)
+    for _ in range(50):
+        budget.record_call()
+
+    granted = sum(budget.try_spend() for _ in range(20))
+
+    assert granted == 6
+    clock.now += 11
+    assert budget.totals() == (0, 0)
+    assert budget.try_spend()
+
+
+async def test_budget_exhaustion_stops_retries() -> None:
+    budget = RetryBudget(ratio=0, min_per_sec=0.1, window_secs=10, clock=Clock())
+    policy = make_policy(budget=budget)
+    calls = []
+
+    with pytest.raises(TransientError):
+        await policy.call(failing([TransientError()] * 5, calls))
+
+    assert len(calls) == 2
+
+
+async def test_decorator_uses_policy_options() -> None:
+    calls = []
+
+    @retry_async(retries=1, backoff_factor=0, retriable_exceptions=(TransientError,))
+    async def flaky() -> None:
+        calls.append(1)
+        raise TransientError
+
+    with pytest.raises(TransientError):
+        await flaky()
+
+    assert len(calls) == 2
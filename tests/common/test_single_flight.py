@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from src.common.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_are_coalesced(self):
+        """Concurrent callers with the same key share one execution"""
+        single_flight = SingleFlight()
+        executions = 0
+
+        async def fetch() -> str:
+            nonlocal executions
+            executions += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*[single_flight.do("key", fetch) for _ in range(10)])
+
+        assert results == ["value"] * 10
+        assert executions == 1
+        assert single_flight.stats == {"calls": 10, "executions": 1, "coalesced": 9, "in_flight": 0}
+
+    @pytest.mark.asyncio
+    async def test_different_keys_are_not_coalesced(self):
+        """Calls with different keys run independently"""
+        single_flight = SingleFlight()
+
+        async def fetch() -> None:
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(single_flight.do("a", fetch), single_flight.do("b", fetch))
+
+        assert single_flight.executions == 2
+        assert single_flight.coalesced == 0
+
+    @pytest.mark.asyncio
+    async def test_exception_is_shared(self):
+        """Every coalesced caller receives the exception of the shared call"""
+        single_flight = SingleFlight()
+
+        async def fetch() -> None:
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *[single_flight.do("key", fetch) for _ in range(3)], return_exceptions=True
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert single_flight.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_call(self):
+        """Cancelling one caller leaves the shared call running for the others"""
+        single_flight = SingleFlight()
+
+        async def fetch() -> str:
+            await asyncio.sleep(0.01)
+            return "value"
+
+        first = asyncio.create_task(single_flight.do("key", fetch))
+        second = asyncio.create_task(single_flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "value"
@@ -0,0 +1,259 @@
+import asyncio
+import gzip
+
+import pytest
+from pydantic import BaseModel
+
+from src.common.compression import Compressor
+from src.common.key_value_database import CacheGenerations, IKeyValueDatabase
+from src.common import responses
+from src.common.metrics import CACHE_REQUESTS
+from src.common.responses import compute_etag
+from src.providers import cache
+from src.providers.cache import CACHE_STATUS_HEADER, api_cache
+
+
+class DummyResult(BaseModel):
+    value: int
+
+
+@pytest.fixture
+def generations(key_value_database_mock: IKeyValueDatabase) -> CacheGenerations:
+    key_value_database_mock.get.return_value = None
+    return CacheGenerations(key_value_database_mock)
+
+
+def cache_entry(
+    key_value_database_mock: IKeyValueDatabase,
+    body: bytes | None,
+    ttl: int = 95,
+    etag: bytes | None = None,
+) -> None:
+    """Body and its tag, as read by a lookup without `If-None-Match`."""
+    key_value_database_mock.get_many_with_ttl.return_value = [(ttl, body), (ttl, etag)]
+
+
+def result_key(key_value_database_mock: IKeyValueDatabase) -> str:
+    return key_value_database_mock.get_many_with_ttl.await_args.args[0][0]
+
+
+@pytest.fixture
+def endpoint():
+    calls = []
+
+    @api_cache(ttl=100, namespace="test", soft_ttl=10)
+    async def dummy_list(page: int) -> DummyResult:
+        calls.append(page)
+        return DummyResult(value=len(calls))
+
+    dummy_list.calls = calls
+    return dummy_list
+
+
+@pytest.mark.asyncio
+async def test_miss_computes_and_stores(endpoint, key_value_database_mock, generations):
+    cache_entry(key_value_database_mock, None, ttl=-2)
+
+    result = await endpoint(page=1, cache_db=key_value_database_mock, generations=generations)
+
+    assert result.body == b'{"value":1}'
+    assert result.headers[CACHE_STATUS_HEADER] == "MISS"
+    key = result_key(key_value_database_mock)
+    key_value_database_mock.set_many.assert_awaited_once_with(
+        {key: b'{"value":1}', f"{key}:etag": result.headers["ETag"]}, expire=100
+    )
+
+
+@pytest.mark.asyncio
+async def test_fresh_hit_is_served_from_cache(endpoint, key_value_database_mock, generations):
+    cache_entry(key_value_database_mock, b'{"value":0}')
+
+    result = await endpoint(page=1, cache_db=key_value_database_mock, generations=generations)
+
+    assert result.body == b'{"value":0}'
+    assert result.headers[CACHE_STATUS_HEADER] == "HIT"
+    assert result.headers["Age"] == "5"
+    assert endpoint.calls == []
+
+
+@pytest.mark.asyncio
+async def test_stale_hit_is_served_and_revalidated_once(
+    endpoint, key_value_database_mock, generations
+):
+    cache_entry(key_value_database_mock, b'{"value":0}', ttl=50)
+    key_value_database_mock.set_if_not_exists.return_value = True
+
+    results = await asyncio.gather(
+        *[
+            endpoint(page=1, cache_db=key_value_database_mock, generations=generations)
+            for _ in range(3)
+        ]
+    )
+    await asyncio.gather(*cache._background_tasks)
+
+    assert all(result.body == b'{"value":0}' for result in results)
+    assert all(result.headers[CACHE_STATUS_HEADER] == "STALE" for result in results)
+    assert endpoint.calls == [1]
+    key_value_database_mock.set_many.assert_awaited_once()
+    key_value_database_mock.set_if_not_exists.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_revalidation_skipped_when_locked_by_other_process(
+    endpoint, key_value_database_mock, generations
+):
+    cache_entry(key_value_database_mock, b'{"value":0}', ttl=50)
+    key_value_database_mock.set_if_not_exists.return_value = False
+
+    await endpoint(page=1, cache_db=key_value_database_mock, generations=generations)
+    await asyncio.gather(*cache._background_tasks)
+
+    assert endpoint.calls == []
+    key_value_database_mock.set_many.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_hit_body_is_sent_without_reencoding(endpoint, key_value_database_mock, generations):
+    cached = b'{"value":0,"unchanged": true}'
+    cache_entry(key_value_database_mock, cached)
+
+    result = await endpoint(page=1, cache_db=key_value_database_mock, generations=generations)
+
+    assert result.body is cached
+
+
+@pytest.mark.asyncio
+async def test_hits_and_misses_are_counted(endpoint, key_value_database_mock, generations):
+    before = {
+        result: CACHE_REQUESTS.get("api", "test", result) for result in ("hit", "stale", "miss")
+    }
+    cache_entry(key_value_database_mock, None, ttl=-2)
+    await endpoint(page=1, cache_db=key_value_database_mock, generations=generations)
+    cache_entry(key_value_database_mock, b'{"value":0}')
+    await endpoint(page=1, cache_db=key_value_database_mock, generations=generations)
+
+    assert CACHE_REQUESTS.get("api", "test", "miss") == before["miss"] + 1
+    assert CACHE_REQUESTS.get("api", "test", "hit") == before["hit"] + 1
+    assert CACHE_REQUESTS.get("api", "test", "stale") == before["stale"]
+
+
+@pytest.mark.asyncio
+async def test_hit_has_stored_etag(endpoint, key_value_database_mock, generations, mocker):
+    cache_entry(key_value_database_mock, b'{"value":0}', etag=b'"stored"')
+    hashed = mocker.spy(responses, "compute_etag")
+
+    result = await endpoint(page=1, cache_db=key_value_database_mock, generations=generations)
+
+    key = result_key(key_value_database_mock)
+    key_value_database_mock.get_many_with_ttl.assert_awaited_once_with([key, f"{key}:etag"])
+    assert result.headers["ETag"] == '"stored"'
+    hashed.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_hit_without_stored_etag_has_etag_of_body(
+    endpoint, key_value_database_mock, generations
+):
+    cache_entry(key_value_database_mock, b'{"value":0}')
+
+    result = await endpoint(page=1, cache_db=key_value_database_mock, generations=generations)
+
+    assert result.headers["ETag"] == compute_etag(b'{"value":0}')
+
+
+@pytest.mark.asyncio
+async def test_matching_etag_is_answered_without_body(
+    endpoint, key_value_database_mock, generations
+):
+    etag = compute_etag(b'{"value":0}')
+    key_value_database_mock.get_with_ttl.return_value = (95, etag.encode())
+
+    result = await endpoint(
+        page=1,
+        cache_db=key_value_database_mock,
+        generations=generations,
+        if_none_match=f'"other", {etag}',
+    )
+
+    assert result.status_code == 304
+    assert result.body == b""
+    assert result.headers["ETag"] == etag
+    assert result.headers[CACHE_STATUS_HEADER] == "HIT"
+    key_value_database_mock.get_with_ttl.assert_awaited_once()
+    assert key_value_database_mock.get_with_ttl.await_args.kwargs["key"].endswith(":etag")
+
+
+@pytest.mark.asyncio
+async def test_changed_etag_is_answered_with_body(
+    endpoint, key_value_database_mock, generations
+):
+    key_value_database_mock.get_with_ttl.side_effect = [
+        (95, compute_etag(b'{"value":1}').encode()),
+        (95, b'{"value":1}'),
+    ]
+
+    result = await endpoint(
+        page=1,
+        cache_db=key_value_database_mock,
+        generations=generations,
+        if_none_match=compute_etag(b'{"value":0}'),
+    )
+
+    assert result.status_code == 200
+    assert result.body == b'{"value":1}'
+    assert result.headers["ETag"] == compute_etag(b'{"value":1}')
+
+
+@pytest.mark.asyncio
+async def test_miss_stores_compressed_variants(endpoint, key_value_database_mock, generations):
+    cache_entry(key_value_database_mock, None, ttl=-2)
+
+    result = await endpoint(
+        page=1,
+        cache_db=key_value_database_mock,
+        generations=generations,
+        accept_encoding="gzip",
+        compressor=Compressor(),
+    )
+
+    key = result_key(key_value_database_mock)
+    assert key.endswith(":gzip")
+    stored = key_value_database_mock.set_many.await_args.args[0]
+    assert stored[key] == result.body
+    assert stored[f"{key}:etag"] == result.headers["ETag"]
+    assert gzip.decompress(result.body) == b'{"value":1}'
+    assert result.headers["Content-Encoding"] == "gzip"
+    assert result.headers["Vary"] == "Accept-Encoding"
+
+
+@pytest.mark.asyncio
+async def test_hit_sends_stored_variant(endpoint, key_value_database_mock, generations):
+    compressed = gzip.compress(b'{"value":0}')
+    cache_entry(key_value_database_mock, compressed)
+
+    result = await endpoint(
+        page=1,
+        cache_db=key_value_database_mock,
+        generations=generations,
+        accept_encoding="gzip",
+        compressor=Compressor(),
+    )
+
+    assert result.body is compressed
+    assert result.headers["Content-Encoding"] == "gzip"
+    assert result.headers["ETag"] == compute_etag(compressed)
+
+
+@pytest.mark.asyncio
+async def test_identity_is_sent_when_no_coding_is_accepted(
+    endpoint, key_value_database_mock, generations
+):
+    cache_entry(key_value_database_mock, b'{"value":0}')
+
+    result = await endpoint(
+        page=1, cache_db=key_value_database_mock, generations=generations, compressor=Compressor()
+    )
+
+    assert result.body == b'{"value":0}'
+    assert "Content-Encoding" not in result.headers
+    assert not result_key(key_value_database_mock).endswith(":gzip")
@@ -0,0 +1,16 @@
+from src.providers.singleton import singleton
+
+
+def test_positional_and_keyword_calls_share_instance() -> None:
+    @singleton
+    def provider(first: object, second: object = None) -> list:
+        return [first, second]
+
+    dependency = object()
+
+    instance = provider(dependency)
+
+    assert provider(first=dependency) is instance
+    assert provider(dependency, None) is instance
+    assert provider(first=dependency, second=None) is instance
+    assert provider(object()) is not instance
@@ -1,10 +1,24 @@
+import asyncio
 import json
+from unittest.mock import call
+
 import pytest
 from pydantic import BaseModel
 from pytest_mock.plugin import MockerFixture
 
+from src.common.bloom_filter import BloomFilter, KnownIds
 from src.common.exceptions import ServiceError
-from src.services.base import BaseEntityService, IEntityService
+from src.common.key_value_database import CacheGenerations, LocalCache
+from src.common.responses import compute_etag
+from src.common.search_engine import SearchPage
+from src.common.search_engine.filter_fields import Cursor, decode_cursor
+from src.services.base import (
+    NOT_FOUND_MARKER,
+    BaseEntityService,
+    Detail,
+    IEntityService,
+    projection_fingerprint,
+)
 
 
 class DummyModel(BaseModel):
@@ -14,6 +28,7 @@ class DummyModel(BaseModel):
 
 class DummyFilter(BaseModel):
     name: str | None = None
+    page_size: int | None = None
 
 
 class DummyFilterSet:
@@ -21,6 +36,10 @@ class DummyFilterSet:
         # Simulate a filter query
         return {"query": data}
 
+    @classmethod
+    def build_query(cls, data: dict) -> dict:
+        return cls().filter_query(data)
+
 
 @pytest.fixture
 def fake_search_result() -> list[dict]:
@@ -69,6 +88,16 @@ async def test_get_by_id_from_search(dummy_service: IEntityService) -> None:
     )
 
 
+@pytest.mark.asyncio
+async def test_get_by_id_survives_cache_write_failure(dummy_service: IEntityService) -> None:
+    dummy_service.key_value_database.get.return_value = None
+    dummy_service.key_value_database.set.side_effect = ConnectionError("redis is down")
+
+    result = await dummy_service.get_by_id("1")
+
+    assert result.name == "Test"
+
+
 @pytest.mark.asyncio
 async def test_get_by_id_cache_parse_failure(dummy_service: IEntityService) -> None:
     dummy_service.key_value_database.get.return_value = "INVALID"
@@ -83,3 +112,326 @@ async def test_get_multi(dummy_service: IEntityService) -> None:
 
     assert isinstance(result, list)
     assert result[0].id == "1"
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_concurrent_misses_are_coalesced(dummy_service: IEntityService) -> None:
+    dummy_service.key_value_database.get.return_value = None
+
+    async def slow_get_document(index: str, doc_id: str) -> dict:
+        await asyncio.sleep(0.01)
+        return {"id": doc_id, "name": "Test"}
+
+    dummy_service.search_engine.get_document.side_effect = slow_get_document
+
+    results = await asyncio.gather(*[dummy_service.get_by_id("1") for _ in range(5)])
+
+    assert all(result == DummyModel(id="1", name="Test") for result in results)
+    dummy_service.search_engine.get_document.assert_awaited_once_with(index="test-index", doc_id="1")
+    dummy_service.key_value_database.set.assert_awaited_once()
+    assert dummy_service.single_flight.coalesced == 4
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_from_local_cache(dummy_service: IEntityService) -> None:
+    dummy_service.local_cache = LocalCache()
+    dummy_service.key_value_database.get.return_value = b'{"id": "1", "name": "FromCache"}'
+
+    first = await dummy_service.get_by_id("1")
+    second = await dummy_service.get_by_id("1")
+
+    assert second is first
+    dummy_service.key_value_database.get.assert_called_once_with("1")
+    assert dummy_service.local_cache.stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_many_reads_cache_and_fetches_misses(dummy_service: IEntityService) -> None:
+    dummy_service.key_value_database.get_many.return_value = [b'{"id": "1", "name": "FromCache"}', None, None]
+    dummy_service.search_engine.get_documents.return_value = {"2": {"id": "2", "name": "Test"}}
+
+    result = await dummy_service.get_many(["1", "2", "3"])
+
+    assert result == [DummyModel(id="1", name="FromCache"), DummyModel(id="2", name="Test"), None]
+    dummy_service.key_value_database.get_many.assert_awaited_once_with(["1", "2", "3"])
+    dummy_service.search_engine.get_documents.assert_awaited_once_with(
+        index="test-index", doc_ids=["2", "3"]
+    )
+    dummy_service.key_value_database.set_many.assert_awaited_once_with(
+        {"2": json.dumps({"id": "2", "name": "Test"})}, expire=60
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_many_keeps_request_order(dummy_service: IEntityService) -> None:
+    dummy_service.key_value_database.get_many.return_value = [None, None]
+    dummy_service.search_engine.get_documents.return_value = {
+        "2": {"id": "2", "name": "Second"},
+        "1": {"id": "1", "name": "First"},
+    }
+
+    result = await dummy_service.get_many(["1", "2", "1"])
+
+    assert [entity.name for entity in result] == ["First", "Second", "First"]
+    dummy_service.key_value_database.get_many.assert_awaited_once_with(["1", "2"])
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_uses_generational_key(dummy_service: IEntityService) -> None:
+    dummy_service.generations = CacheGenerations(dummy_service.key_value_database)
+    dummy_service.key_value_database.get.side_effect = [b"7", None]
+
+    await dummy_service.get_by_id("1")
+
+    dummy_service.key_value_database.get.assert_awaited_with("test-index:7:1")
+    dummy_service.key_value_database.set.assert_awaited_once_with(
+        "test-index:7:1", json.dumps({"id": "1", "name": "Test"}), expire=60
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_page_returns_next_cursor_for_full_page(dummy_service: IEntityService) -> None:
+    dummy_service.search_engine.search_page.return_value = SearchPage(
+        documents=[{"id": "1", "name": "Test"}], sort=["1"]
+    )
+
+    page = await dummy_service.get_page(DummyFilter(page_size=1))
+
+    assert page.items == [DummyModel(id="1", name="Test")]
+    assert decode_cursor(page.next_cursor) == Cursor(search_after=["1"])
+
+
+@pytest.mark.asyncio
+async def test_get_page_without_cursor_mode(dummy_service: IEntityService) -> None:
+    dummy_service.search_engine.search_page.return_value = SearchPage(
+        documents=[{"id": "1", "name": "Test"}], sort=["1"]
+    )
+
+    page = await dummy_service.get_page(DummyFilter(name="Test"))
+
+    assert page.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_projection_is_passed_to_search_engine_and_cache_key(
+    dummy_service: IEntityService,
+) -> None:
+    service = type(dummy_service)(
+        dummy_service.key_value_database,
+        dummy_service.search_engine,
+        "test-index",
+        60,
+        projection=["id", "name"],
+    )
+    service.key_value_database.get.return_value = None
+
+    await service.get_by_id("1")
+    await service.get_multi(DummyFilter(name="Test"))
+
+    fingerprint = projection_fingerprint(["name", "id"])
+    service.search_engine.get_document.assert_awaited_once_with(
+        index="test-index", doc_id="1", source_includes=["id", "name"]
+    )
+    service.key_value_database.get.assert_awaited_once_with(f"1:{fingerprint}")
+    query = service.search_engine.search.call_args.kwargs["params"]
+    assert query["source_includes"] == ["id", "name"]
+
+
+def test_projection_must_cover_required_fields(dummy_service: IEntityService) -> None:
+    with pytest.raises(ValueError, match="name"):
+        type(dummy_service)(
+            dummy_service.key_value_database,
+            dummy_service.search_engine,
+            "test-index",
+            60,
+            projection=["id"],
+        )
+
+
+def make_service(dummy_service: IEntityService, **kwargs) -> IEntityService:
+    return type(dummy_service)(
+        dummy_service.key_value_database, dummy_service.search_engine, "test-index", 60, **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_caches_absence(dummy_service: IEntityService) -> None:
+    service = make_service(dummy_service, negative_expire_secs=5, local_cache=LocalCache())
+    service.key_value_database.get.return_value = None
+    service.search_engine.get_document.return_value = None
+
+    assert await service.get_by_id("missing") is None
+    assert await service.get_by_id("missing") is None
+
+    service.search_engine.get_document.assert_awaited_once()
+    service.key_value_database.set_many.assert_awaited_once_with(
+        {"missing": NOT_FOUND_MARKER}, expire=5
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_answers_cached_absence(dummy_service: IEntityService) -> None:
+    service = make_service(dummy_service, negative_expire_secs=5)
+    service.key_value_database.get.return_value = NOT_FOUND_MARKER
+
+    assert await service.get_by_id("missing") is None
+    assert not service.search_engine.get_document.called
+
+
+@pytest.mark.asyncio
+async def test_get_many_caches_and_answers_absence(dummy_service: IEntityService) -> None:
+    service = make_service(dummy_service, negative_expire_secs=5)
+    service.key_value_database.get_many.return_value = [NOT_FOUND_MARKER, None, None]
+    service.search_engine.get_documents.return_value = {"2": {"id": "2", "name": "Test"}}
+
+    result = await service.get_many(["1", "2", "3"])
+
+    assert result == [None, DummyModel(id="2", name="Test"), None]
+    service.search_engine.get_documents.assert_awaited_once_with(
+        index="test-index", doc_ids=["2", "3"]
+    )
+    service.key_value_database.set_many.assert_any_await({"3": NOT_FOUND_MARKER}, expire=5)
+
+
+@pytest.mark.asyncio
+async def test_definitely_absent_ids_are_not_looked_up(dummy_service: IEntityService) -> None:
+    known_ids = KnownIds(dummy_service.search_engine)
+    known_ids._filters["test-index"] = BloomFilter(capacity=1000)
+    known_ids.add("test-index", "1")
+    service = make_service(dummy_service, known_ids=known_ids)
+    service.key_value_database.get_many.return_value = [None]
+    service.search_engine.get_documents.return_value = {"1": {"id": "1", "name": "Test"}}
+
+    assert await service.get_by_id("unknown") is None
+    assert await service.get_many(["unknown", "1"]) == [None, DummyModel(id="1", name="Test")]
+
+    assert not service.key_value_database.get.called
+    service.key_value_database.get_many.assert_awaited_once_with(["1"])
+    assert not service.search_engine.get_document.called
+
+
+@pytest.mark.asyncio
+async def test_warm_up_caches_batches_up_to_limit(dummy_service: IEntityService) -> None:
+    service = make_service(dummy_service, local_cache=LocalCache())
+    requested = []
+
+    async def iter_search(index: str, params: dict, batch_size: int):
+        requested.append(batch_size)
+        yield [{"id": "1", "name": "First"}, {"id": "2", "name": "Second"}]
+        yield [{"id": "3", "name": "Third"}, {"id": "4", "name": "Fourth"}]
+
+    service.search_engine.iter_search = iter_search
+
+    count = await service.warm_up(DummyFilter(), limit=3, batch_size=500)
+
+    assert count == 3
+    assert requested == [3]
+    assert service.key_value_database.set_many.await_args_list == [
+        call(
+            {
+                "1": DummyModel(id="1", name="First").json(),
+                "2": DummyModel(id="2", name="Second").json(),
+            },
+            expire=60,
+        ),
+        call({"3": DummyModel(id="3", name="Third").json()}, expire=60),
+    ]
+    assert await service.get_by_id("3") == DummyModel(id="3", name="Third")
+    assert not service.key_value_database.get.called
+
+
+def render(entity: DummyModel) -> bytes:
+    return f"<{entity.name}>".encode()
+
+
+@pytest.mark.asyncio
+async def test_get_detail_returns_cached_body(dummy_service: IEntityService) -> None:
+    service = make_service(dummy_service, renderer=render)
+    service.key_value_database.get_many.return_value = [b"<Cached>", b'"tag"']
+
+    assert await service.get_detail("1") == Detail(b"<Cached>", '"tag"')
+
+    service.key_value_database.get_many.assert_awaited_once_with(["1:detail", "1:detail:etag"])
+    assert not service.key_value_database.get.called
+    assert not service.search_engine.get_document.called
+
+
+@pytest.mark.asyncio
+async def test_get_detail_tags_cached_body_without_tag(dummy_service: IEntityService) -> None:
+    service = make_service(dummy_service, renderer=render)
+    service.key_value_database.get_many.return_value = [b"<Cached>", None]
+
+    assert await service.get_detail("1") == Detail(b"<Cached>", compute_etag(b"<Cached>"))
+
+
+@pytest.mark.asyncio
+async def test_get_detail_renders_and_caches_loaded_entity(dummy_service: IEntityService) -> None:
+    service = make_service(dummy_service, renderer=render, local_cache=LocalCache())
+    service.key_value_database.get_many.return_value = [None, None]
+    service.key_value_database.get.return_value = None
+    expected = Detail(b"<Test>", compute_etag(b"<Test>"))
+
+    assert await service.get_detail("1") == expected
+    assert await service.get_detail("1") == expected
+
+    service.search_engine.get_document.assert_awaited_once()
+    service.key_value_database.set_many.assert_awaited_once_with(
+        {
+            "1": DummyModel(id="1", name="Test").json(),
+            "1:detail": b"<Test>",
+            "1:detail:etag": compute_etag(b"<Test>"),
+        },
+        expire=60,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_detail_renders_cached_entity(dummy_service: IEntityService) -> None:
+    service = make_service(dummy_service, renderer=render)
+    service.key_value_database.get_many.return_value = [None, None]
+    service.key_value_database.get.return_value = b'{"id": "1", "name": "FromCache"}'
+
+    assert await service.get_detail("1") == Detail(b"<FromCache>", compute_etag(b"<FromCache>"))
+
+    service.key_value_database.set_many.assert_awaited_once_with(
+        {"1:detail": b"<FromCache>", "1:detail:etag": compute_etag(b"<FromCache>")}, expire=60
+    )
+
+
+@pytest.mark.asyncio
+async def test_refreshed_entities_are_rendered(dummy_service: IEntityService) -> None:
+    service = make_service(dummy_service, renderer=render)
+    service.key_value_database.get_many.return_value = [None]
+    service.search_engine.get_documents.return_value = {"2": {"id": "2", "name": "New"}}
+
+    await service.get_many(["2"])
+
+    service.key_value_database.set_many.assert_awaited_once_with(
+        {
+            "2": DummyModel(id="2", name="New").json(),
+            "2:detail": b"<New>",
+            "2:detail:etag": compute_etag(b"<New>"),
+        },
+        expire=60,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_detail_etag_reads_only_the_tag(dummy_service: IEntityService) -> None:
+    service = make_service(dummy_service, renderer=render, local_cache=LocalCache())
+    service.key_value_database.get.return_value = b'"tag"'
+
+    assert await service.get_detail_etag("1") == '"tag"'
+    assert await service.get_detail_etag("1") == '"tag"'
+
+    service.key_value_database.get.assert_awaited_once_with("1:detail:etag")
+    assert not service.search_engine.get_document.called
+
+
+@pytest.mark.asyncio
+async def test_get_detail_etag_of_uncached_body_is_none(dummy_service: IEntityService) -> None:
+    service = make_service(dummy_service, renderer=render)
+    service.key_value_database.get.return_value = None
+
+    assert await service.get_detail_etag("1") is None
+    assert not service.search_engine.get_document.called
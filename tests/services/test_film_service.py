@@ -3,6 +3,7 @@ from pydantic import BaseModel
 
 from src.common.exceptions import ServiceError
 from src.common.key_value_database import IKeyValueDatabase
+from src.api.v1.schemas.film import FilmOutSchema
 from src.common.search_engine import ISearchEngine
 from src.models.film import Film, FilmFilterSchema
 from src.services.film import FilmService
@@ -65,3 +66,33 @@ async def test_get_multi_returns_filtered_results(
 
     assert result == [film_entity]
     search_engine_mock.search.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stream_multi_yields_batches(
+    film_service: FilmService,
+    search_engine_mock: ISearchEngine,
+) -> None:
+    films = FilmFactory.build_batch(3)
+
+    async def iter_search(index: str, params: dict, batch_size: int):
+        yield [film.dict() for film in films[:2]]
+        yield [film.dict() for film in films[2:]]
+
+    search_engine_mock.iter_search = iter_search
+
+    batches = [batch async for batch in film_service.stream_multi(FilmFilterSchema(), batch_size=2)]
+
+    assert batches == [films[:2], films[2:]]
+
+
+def test_film_out_schema_projection_skips_names(
+    key_value_database_mock: IKeyValueDatabase,
+    search_engine_mock: ISearchEngine,
+) -> None:
+    projection = FilmOutSchema.source_fields()
+
+    service = FilmService(key_value_database_mock, search_engine_mock, projection=projection)
+
+    assert "actors.name" in service.projection
+    assert not {"actors_names", "directors_names", "writers_names"} & set(service.projection)
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from src.services.warm_up import WarmUpTarget, warm_up_cache
+
+
+class DummyFilter(BaseModel):
+    order: list[str] | None = None
+
+
+class DummyService:
+    def __init__(self, count: int = 0, error: Exception | None = None) -> None:
+        self.count = count
+        self.error = error
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def warm_up(self, filters: BaseModel, limit: int | None = None, batch_size: int = 500):
+        self.calls.append((filters, limit, batch_size))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        if self.error is not None:
+            raise self.error
+        return self.count if limit is None else min(self.count, limit)
+
+
+@pytest.mark.asyncio
+async def test_targets_are_warmed_up_with_their_filters():
+    films, genres = DummyService(count=5), DummyService(count=3)
+    filters = DummyFilter(order=["-rating"])
+
+    counts = await warm_up_cache(
+        [WarmUpTarget("films", films, filters, limit=2), WarmUpTarget("genres", genres, filters)],
+        batch_size=100,
+    )
+
+    assert counts == {"films": 2, "genres": 3}
+    assert films.calls == [(filters, 2, 100)]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    service = DummyService(count=1)
+    targets = [WarmUpTarget(f"index{number}", service, DummyFilter()) for number in range(5)]
+
+    await warm_up_cache(targets, concurrency=2)
+
+    assert service.max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_target_does_not_stop_others():
+    counts = await warm_up_cache(
+        [
+            WarmUpTarget("films", DummyService(error=ConnectionError("es is down")), DummyFilter()),
+            WarmUpTarget("genres", DummyService(count=3), DummyFilter()),
+        ]
+    )
+
+    assert counts == {"genres": 3}
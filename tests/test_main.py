@@ -0,0 +1,160 @@
+import uuid
+from collections.abc import AsyncIterator
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from benchmarks.data import make_films
+from benchmarks.fakes import FakeElasticsearch, InMemoryKeyValueDatabase
+from src import main
+from src.common import responses
+from src.common.key_value_database import RedisDatabase
+from src.common.search_engine import ElasticDatabase
+from src.providers import key_value_database, search_engine
+from src.providers.settings import app_settings
+from src.services.film import FILM_INDEX, FilmService
+
+
+@pytest.fixture
+def documents() -> list[dict]:
+    return make_films(5)
+
+
+@pytest.fixture
+def cache_db() -> InMemoryKeyValueDatabase:
+    return InMemoryKeyValueDatabase()
+
+
+@pytest.fixture
+def es_client(documents: list[dict]) -> FakeElasticsearch:
+    return FakeElasticsearch(documents)
+
+
+@pytest.fixture
+def warm_up_enabled() -> bool:
+    return False
+
+
+@pytest.fixture
+async def app(
+    monkeypatch: pytest.MonkeyPatch,
+    cache_db: InMemoryKeyValueDatabase,
+    es_client: FakeElasticsearch,
+    warm_up_enabled: bool,
+) -> AsyncIterator[FastAPI]:
+    """Real application, started and shut down against in-memory back ends."""
+    monkeypatch.setattr(main, "activate_uvloop", lambda: None)
+    monkeypatch.setattr(RedisDatabase, "build", lambda config: MagicMock(spec=RedisDatabase))
+    monkeypatch.setattr(ElasticDatabase, "build", lambda config: es_client)
+    monkeypatch.setattr(key_value_database, "RedisKeyValueDatabase", lambda redis: cache_db)
+    monkeypatch.setattr(app_settings.warm_up, "enabled", warm_up_enabled)
+    # fake search engine holds films only
+    monkeypatch.setattr(app_settings.warm_up, "genres", 0)
+    monkeypatch.setattr(app_settings.known_ids, "enabled", True)
+    # cache writes stay queued until shutdown
+    monkeypatch.setattr(app_settings.cache_write_behind, "flush_interval", 60)
+    for provider in (
+        key_value_database.get_redis_database,
+        key_value_database.get_local_cache,
+        search_engine.get_elastic_database,
+    ):
+        provider.cache_clear()
+
+    application = main.create_app()
+    await main.startup(application)
+    yield application
+    await main.shutdown(application)
+
+
+async def test_known_ids_refresh_is_seen_by_requests(
+    app: FastAPI, es_client: FakeElasticsearch, documents: list[dict]
+) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(f"/v1/films/{documents[0]['id']}")
+        assert response.status_code == 200
+        calls = es_client.calls
+        response = await client.get(f"/v1/films/{uuid.uuid4()}")
+        assert response.status_code == 404
+        assert es_client.calls == calls + 1
+
+        await app.state.known_ids.rebuild(FILM_INDEX)
+        calls = es_client.calls
+        response = await client.get(f"/v1/films/{uuid.uuid4()}")
+
+    assert response.status_code == 404
+    assert es_client.calls == calls
+
+
+async def test_shutdown_flushes_pending_cache_writes(
+    app: FastAPI, cache_db: InMemoryKeyValueDatabase, documents: list[dict]
+) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(f"/v1/films/{documents[0]['id']}")
+    assert response.status_code == 200
+    assert app.state.cache_db.pending
+
+    await main.shutdown(app)
+
+    assert app.state.cache_db.pending == 0
+    assert len(cache_db)
+
+
+async def test_sweeper_sees_namespaces_used_by_requests(
+    app: FastAPI, documents: list[dict]
+) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(f"/v1/films/{documents[0]['id']}")
+
+    assert response.status_code == 200
+    assert FILM_INDEX in app.state.cache_generations.namespaces
+
+
+@pytest.mark.parametrize("warm_up_enabled", [True])
+async def test_warm_up_fills_caches_read_by_requests(
+    app: FastAPI, es_client: FakeElasticsearch, documents: list[dict]
+) -> None:
+    assert app.state.cache_warmer.done()
+    assert app.state.cache_db.pending
+    calls = es_client.calls
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(f"/v1/films/{documents[1]['id']}")
+
+    assert response.status_code == 200
+    assert es_client.calls == calls
+
+
+async def test_conditional_detail_request_skips_body(
+    app: FastAPI, documents: list[dict], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    url = f"/v1/films/{documents[0]['id']}"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(url)
+        etag = response.headers["ETag"]
+        monkeypatch.setattr(FilmService, "get_detail", AsyncMock(side_effect=AssertionError))
+        response = await client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+async def test_detail_hit_serves_cached_etag(
+    app: FastAPI, documents: list[dict], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    url = f"/v1/films/{documents[0]['id']}"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get(url)
+        monkeypatch.setattr(responses, "compute_etag", MagicMock(side_effect=AssertionError))
+        second = await client.get(url)
+
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
@@ -0,0 +1,38 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from benchmarks.fakes import InMemoryKeyValueDatabase
+from src import purge_cache
+from src.common.key_value_database import RedisDatabase
+
+
+@pytest.fixture
+def cache_db(monkeypatch: pytest.MonkeyPatch) -> InMemoryKeyValueDatabase:
+    cache_db = InMemoryKeyValueDatabase()
+    monkeypatch.setattr(RedisDatabase, "build", lambda config: MagicMock(spec=RedisDatabase))
+    monkeypatch.setattr(purge_cache, "RedisKeyValueDatabase", lambda redis: cache_db)
+    return cache_db
+
+
+async def test_purge_switches_namespaces_to_new_generation(
+    cache_db: InMemoryKeyValueDatabase,
+) -> None:
+    await cache_db.set("movies:0:film", "cached")
+
+    assert await purge_cache.run(["movies", "v1"]) == {"movies": 1, "v1": 1}
+    assert await cache_db.get("movies:0:film") == b"cached"
+
+
+async def test_purge_with_sweep_deletes_stale_keys(cache_db: InMemoryKeyValueDatabase) -> None:
+    await cache_db.set("movies:0:film", "cached")
+    await cache_db.set("genres:0:genre", "cached")
+
+    await purge_cache.run(["movies"], sweep=True)
+
+    assert await cache_db.get("movies:0:film") is None
+    assert await cache_db.get("genres:0:genre") == b"cached"
+
+
+def test_all_namespaces_are_purged_by_default() -> None:
+    assert purge_cache.parse_args([]).namespaces == ["movies", "genres", "persons", "v1"]